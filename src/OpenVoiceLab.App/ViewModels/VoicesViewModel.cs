@@ -100,6 +100,13 @@ public partial class VoicesViewModel : ObservableObject
         }
         var api = await _services.GetApiAsync();
         var response = await api.CreateCloneVoiceAsync(name, modelSize, backend, keepRefAudio, consent, refText, audioStream, filename);
+        Status = "Creating clone voice...";
+        var job = await api.WaitForJobAsync(response.JobId);
+        if (job.Status != "completed")
+        {
+            Status = $"Clone voice {job.Status}: {job.Error}";
+            return null;
+        }
         Status = "Clone voice created";
         await LoadAsync();
         return response.VoiceId;
@@ -114,6 +121,13 @@ public partial class VoicesViewModel : ObservableObject
         }
         var api = await _services.GetApiAsync();
         var response = await api.CreateDesignVoiceAsync(new VoiceDesignRequest(name, description, seedText, modelSize, backend));
+        Status = "Designing voice...";
+        var job = await api.WaitForJobAsync(response.JobId);
+        if (job.Status != "completed")
+        {
+            Status = $"Design voice {job.Status}: {job.Error}";
+            return null;
+        }
         Status = "Design voice created";
         await LoadAsync();
         return response.VoiceId;
@@ -154,6 +154,33 @@ public class ApiClient
         return body ?? throw new InvalidOperationException("No design response");
     }
 
+    public async Task<JobInfo> GetJobAsync(string jobId, CancellationToken cancellationToken = default)
+    {
+        var response = await _http.GetFromJsonAsync<JobInfo>($"/jobs/{jobId}", _jsonOptions, cancellationToken);
+        return response ?? throw new InvalidOperationException("No job response");
+    }
+
+    public async Task<JobInfo> CancelJobAsync(string jobId, CancellationToken cancellationToken = default)
+    {
+        var response = await _http.DeleteAsync($"/jobs/{jobId}", cancellationToken);
+        response.EnsureSuccessStatusCode();
+        var body = await response.Content.ReadFromJsonAsync<JobInfo>(_jsonOptions, cancellationToken);
+        return body ?? throw new InvalidOperationException("No job response");
+    }
+
+    public async Task<JobInfo> WaitForJobAsync(string jobId, CancellationToken cancellationToken = default)
+    {
+        while (true)
+        {
+            var job = await GetJobAsync(jobId, cancellationToken);
+            if (job.Status is "completed" or "failed" or "cancelled")
+            {
+                return job;
+            }
+            await Task.Delay(TimeSpan.FromMilliseconds(500), cancellationToken);
+        }
+    }
+
     public async Task UpdateVoiceAsync(string voiceId, VoicePatchRequest request, CancellationToken cancellationToken = default)
     {
         var response = await _http.PatchAsync($"/voices/{voiceId}", JsonContent.Create(request, options: _jsonOptions), cancellationToken);
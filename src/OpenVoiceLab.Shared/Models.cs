@@ -52,9 +52,23 @@ public record VoiceInfo(
 
 public record VoicesResponse(IReadOnlyList<VoiceInfo> Voices);
 
-public record VoiceCloneResponse(string VoiceId);
+public record VoiceCloneResponse(string VoiceId, string JobId, string Status);
 
-public record VoiceDesignResponse(string VoiceId);
+public record VoiceDesignResponse(string VoiceId, string JobId, string Status);
+
+public record JobVoiceResult(string VoiceId);
+
+public record JobInfo(
+    string JobId,
+    string Kind,
+    string Status,
+    string CreatedAt,
+    string? StartedAt,
+    string? FinishedAt,
+    JobVoiceResult? Result,
+    string? Error,
+    bool CancelRequested
+);
 
 public record TtsRequest(
     string VoiceId,
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from scheduler import BULK, INTERACTIVE, LANES
+
+DEFAULT_CLIENT = "default"
+SAMPLE_WINDOW = 512
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class ClientLimits:
+    concurrency: int = 2
+    queue_limit: int = 8
+
+
+@dataclass
+class AdmissionPolicy:
+    # Cost is characters times model parameters in billions, so 4000 is ~2300 characters on
+    # the 1.7B models or ~6600 on the 0.6B ones running at once.
+    capacity: float = 4000.0
+    # Share of the capacity that bulk work may not use, so previews are admitted while renders
+    # hold the rest.
+    interactive_reserve: float = 0.25
+    # Renders are generated a chunk at a time, so a long text is charged at most this much
+    # rather than taking the whole capacity for itself.
+    max_request_cost: float = 1500.0
+    queue_limit: int = 32
+    queue_timeout_seconds: float = 60.0
+    # Keyed by API key; "default" applies to keys that are not listed. Requests without a key
+    # are only bound by the shared capacity.
+    clients: Dict[str, ClientLimits] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AdmissionPolicy":
+        known = {item.name for item in fields(cls)} - {"clients"}
+        policy = cls(**{key: value for key, value in data.items() if key in known})
+        for client, limits in data.get("clients", {}).items():
+            policy.clients[client] = ClientLimits(**limits)
+        if policy.capacity <= 0 or policy.queue_limit < 0 or policy.queue_timeout_seconds < 0:
+            raise ValueError("Admission capacity must be positive and queue limits non-negative")
+        if not 0 <= policy.interactive_reserve < 1:
+            raise ValueError("Interactive reserve must be a fraction of the capacity below 1")
+        if policy.max_request_cost <= 0:
+            raise ValueError("Maximum request cost must be positive")
+        if any(limits.concurrency < 1 for limits in policy.clients.values()):
+            raise ValueError("Client concurrency must be at least 1")
+        return policy
+
+    def lane_capacity(self, lane: str) -> float:
+        if lane == BULK:
+            return self.capacity * (1 - self.interactive_reserve)
+        return self.capacity
+
+    def limits_for(self, client: Optional[str]) -> Optional[ClientLimits]:
+        if client is None:
+            return None
+        return self.clients.get(client) or self.clients.get(DEFAULT_CLIENT)
+
+
+def load_admission_policy(path: Optional[Path] = None) -> AdmissionPolicy:
+    if path is None or not path.exists():
+        return AdmissionPolicy()
+    return AdmissionPolicy.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+
+def model_size_factor(model_size: str) -> float:
+    try:
+        return float(model_size.lower().rstrip("b"))
+    except ValueError:
+        return 1.0
+
+
+def estimate_cost(characters: int, model_size: str) -> float:
+    return max(1, characters) * model_size_factor(model_size)
+
+
+def client_label(client: str) -> str:
+    # API keys are only reported by digest.
+    return "key:" + hashlib.blake2b(client.encode(), digest_size=4).hexdigest()
+
+
+@dataclass(eq=False)
+class Admission:
+    client: Optional[str]
+    lane: str
+    cost: float
+    queued_at: float
+    future: asyncio.Future
+    admitted_at: float = 0.0
+    released: bool = False
+
+
+class AdmissionController:
+    def __init__(self, policy: Optional[AdmissionPolicy] = None) -> None:
+        self.policy = policy or AdmissionPolicy()
+        self._queues: Dict[str, Deque[Admission]] = {lane: deque() for lane in LANES}
+        self._cost = 0.0
+        self._lane_cost = {lane: 0.0 for lane in LANES}
+        self._lane_running = {lane: 0 for lane in LANES}
+        self._running: Dict[str, int] = {}
+        self._admitted = 0
+        self._shed = 0
+        self._waits: Deque[float] = deque(maxlen=SAMPLE_WINDOW)
+        self._holds: Deque[float] = deque(maxlen=SAMPLE_WINDOW)
+        self._max_wait = 0.0
+
+    def _at_limit(self, client: Optional[str]) -> bool:
+        limits = self.policy.limits_for(client)
+        return limits is not None and self._running.get(client, 0) >= limits.concurrency
+
+    def _queue_full_for(self, client: Optional[str]) -> bool:
+        limits = self.policy.limits_for(client)
+        if limits is None:
+            return False
+        queued = sum(1 for admission in self._queued() if admission.client == client)
+        return queued > limits.queue_limit
+
+    def _queued(self) -> List[Admission]:
+        return [admission for lane in LANES for admission in self._queues[lane]]
+
+    def _dispatch(self) -> None:
+        # Interactive requests go first. Within a lane it is first come, first served: a request
+        # that is over its client's limit is passed over, but one that does not fit the free
+        # capacity holds back everything behind it, so large requests are not starved by a
+        # stream of small ones. Bulk waits while a preview is held back.
+        for lane in LANES:
+            if self._dispatch_lane(lane):
+                return
+
+    def _dispatch_lane(self, lane: str) -> bool:
+        limit = self.policy.lane_capacity(lane)
+        queue = self._queues[lane]
+        for admission in list(queue):
+            if self._at_limit(admission.client):
+                continue
+            if self._cost + admission.cost > limit:
+                return True
+            queue.remove(admission)
+            self._cost += admission.cost
+            self._lane_cost[lane] += admission.cost
+            self._lane_running[lane] += 1
+            if admission.client is not None:
+                self._running[admission.client] = self._running.get(admission.client, 0) + 1
+            self._admitted += 1
+            admission.admitted_at = time.perf_counter()
+            wait = admission.admitted_at - admission.queued_at
+            self._waits.append(wait)
+            self._max_wait = max(self._max_wait, wait)
+            admission.future.set_result(None)
+        return False
+
+    def retry_after(self) -> int:
+        if not self._holds:
+            return 1
+        return max(1, math.ceil(sum(self._holds) / len(self._holds)))
+
+    def _reject(self, admission: Admission, status_code: int, detail: str) -> AdmissionRejected:
+        self._queues[admission.lane].remove(admission)
+        self._shed += 1
+        self._dispatch()
+        return AdmissionRejected(status_code, detail, self.retry_after())
+
+    async def acquire(
+        self, client: Optional[str], cost: float, lane: str = INTERACTIVE
+    ) -> Admission:
+        if lane not in self._queues:
+            raise ValueError(f"Unknown priority: {lane}")
+        admission = Admission(
+            client=client,
+            lane=lane,
+            cost=min(cost, self.policy.max_request_cost, self.policy.lane_capacity(lane)),
+            queued_at=time.perf_counter(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._queues[lane].append(admission)
+        self._dispatch()
+        if admission.future.done():
+            return admission
+        if self._queue_full_for(client):
+            raise self._reject(admission, 429, "Too many queued requests for this client")
+        if len(self._queued()) > self.policy.queue_limit:
+            raise self._reject(admission, 503, "Synthesis queue is full")
+        try:
+            await asyncio.wait_for(admission.future, self.policy.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            raise self._reject(admission, 503, "Timed out waiting for synthesis capacity") from None
+        except asyncio.CancelledError:
+            if admission in self._queues[lane]:
+                self._queues[lane].remove(admission)
+                self._dispatch()
+            elif admission.admitted_at:
+                self.release(admission)
+            raise
+        return admission
+
+    def release(self, admission: Admission) -> None:
+        if admission.released:
+            return
+        admission.released = True
+        self._cost = max(0.0, self._cost - admission.cost)
+        self._lane_cost[admission.lane] = max(0.0, self._lane_cost[admission.lane] - admission.cost)
+        self._lane_running[admission.lane] -= 1
+        if admission.client is not None:
+            running = self._running.get(admission.client, 0) - 1
+            if running > 0:
+                self._running[admission.client] = running
+            else:
+                self._running.pop(admission.client, None)
+        self._holds.append(time.perf_counter() - admission.admitted_at)
+        self._dispatch()
+
+    def stats(self) -> Dict[str, object]:
+        waits: List[float] = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 1)
+
+        clients: Dict[str, Dict[str, int]] = {}
+        for client, running in self._running.items():
+            clients.setdefault(client_label(client), {"running": 0, "queued": 0})["running"] = (
+                running
+            )
+        for admission in self._queued():
+            if admission.client is None:
+                continue
+            entry = clients.setdefault(client_label(admission.client), {"running": 0, "queued": 0})
+            entry["queued"] += 1
+        return {
+            "capacity": self.policy.capacity,
+            "in_flight_cost": round(self._cost, 1),
+            "running": sum(self._lane_running.values()),
+            "queued": len(self._queued()),
+            "admitted": self._admitted,
+            "shed": self._shed,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_max_ms": round(self._max_wait * 1000, 1),
+            "lanes": {
+                lane: {
+                    "capacity": self.policy.lane_capacity(lane),
+                    "in_flight_cost": round(self._lane_cost[lane], 1),
+                    "running": self._lane_running[lane],
+                    "queued": len(self._queues[lane]),
+                }
+                for lane in LANES
+            },
+            "clients": clients,
+        }
@@ -2,42 +2,93 @@ from __future__ import annotations
 
 import asyncio
 import inspect
-import io
 import json
 import logging
 import os
+import re
 import shutil
+import tarfile
 import tempfile
 import uuid
+import zipfile
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
 from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import soundfile as sf
 import torch
-from audio_utils import resample_audio
-from dsp_utils import apply_style_dsp
+from admission import (
+    Admission,
+    AdmissionController,
+    AdmissionRejected,
+    estimate_cost,
+    load_admission_policy,
+)
+from audio_serving import BufferStreamingResponse, audio_file_response
+from audio_utils import (
+    AudioFormat,
+    PcmConverter,
+    PolyphaseResampler,
+    StreamEncoder,
+    resample_audio,
+    resolve_audio_format,
+    resolve_stream_format,
+    write_audio,
+)
+from download_manager import DEFAULT_DOWNLOAD_WORKERS
+from dsp_utils import apply_style_dsp, resolve_dsp_quality, trim_silence
 from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.responses import StreamingResponse
-from model_manager import ModelManager
+from jobs import Job, JobManager
+from loudness import LoudnessNormalizer, normalize_loudness
+from memory_stats import process_memory
+from model_manager import ModelDownloadState, ModelManager
 from prompt_storage import load_clone_prompt_safe, save_clone_prompt_safe
 from pydantic import BaseModel, ConfigDict
-from storage import Database, get_paths, read_json, write_json
+from reference_audio import MAX_REFERENCE_BYTES, ReferenceAudioTooLarge, decode_reference_audio
+from render_pipeline import StreamingRenderWriter
+from retention import OutputJanitor, RetentionPolicy
+from scheduler import BULK, INTERACTIVE, LANES, InferenceScheduler
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from storage import Database, clear_directory, get_paths, read_json, write_json
 from text_pipeline import (
     BreakSegment,
+    ChunkProfile,
+    Segment,
     TextSegment,
     apply_pronunciation,
-    chunk_text,
+    chunk_profile,
     insert_silence,
+    load_chunk_profiles,
     parse_ssml_lite,
     parse_ssml_lite_segments,
+    plan_chunks,
     stitch_audio,
 )
-from tts_engine import TtsEngine
+from tts_engine import CpuProfile, TtsEngine
 
 APP_VERSION = "1.0.0"
 DEFAULT_SAMPLE_RATE = 24000
+DEFAULT_OUTPUT_FORMAT = "wav"
+DEFAULT_STREAM_FORMAT = "pcm"
+DEFAULT_BATCH_SIZE = 8
+MAX_BATCH_SIZE = 64
+MAX_BATCH_ITEMS = 1000
+CLONE_PROMPT_CACHE_SIZE = 32
+LOUDNESS_LOOKAHEAD_SECONDS = 3.0
+DEFAULT_SENTENCE_GAP_MS = 250
+MAX_SENTENCE_GAP_MS = 5000
+STREAM_LOUDNESS_LOOKAHEAD_SECONDS = 1.0
+BATCH_ARCHIVE_KINDS = {"zip", "tar"}
+LOOPBACK_HOSTS = ("127.0.0.1", "::1")
+UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+USER_VOICE_ID = re.compile(r"voice_[0-9a-f]{32}")
+MAX_ARCHIVE_STEM = 100
 
 
 def _to_camel(string: str) -> str:
@@ -60,6 +111,40 @@ class TtsRequest(ApiModel):
     enable_ssml_lite: bool = True
     pronunciation_profile_id: Optional[str] = None
     project_id: Optional[str] = None
+    output_format: Optional[str] = None
+    dsp_quality: Optional[str] = None
+    loudness_lufs: Optional[float] = None
+    true_peak_db: Optional[float] = -1.0
+    trim_silence: bool = True
+    sentence_gap_ms: int = DEFAULT_SENTENCE_GAP_MS
+    priority: str = INTERACTIVE
+
+
+class TtsBatchItem(ApiModel):
+    text: str
+    item_id: Optional[str] = None
+
+
+class TtsBatchRequest(ApiModel):
+    voice_id: str
+    items: List[TtsBatchItem]
+    language: str
+    style: Optional[str] = None
+    model_size: str
+    backend: str
+    sample_rate: int = DEFAULT_SAMPLE_RATE
+    enable_ssml_lite: bool = True
+    pronunciation_profile_id: Optional[str] = None
+    project_id: Optional[str] = None
+    output_format: Optional[str] = None
+    dsp_quality: Optional[str] = None
+    loudness_lufs: Optional[float] = None
+    true_peak_db: Optional[float] = -1.0
+    trim_silence: bool = True
+    sentence_gap_ms: int = DEFAULT_SENTENCE_GAP_MS
+    batch_size: int = DEFAULT_BATCH_SIZE
+    archive: Optional[str] = None
+    priority: str = BULK
 
 
 class VoiceDesignRequest(ApiModel):
@@ -68,12 +153,24 @@ class VoiceDesignRequest(ApiModel):
     seed_text: str
     model_size: str
     backend: str
+    priority: str = BULK
 
 
 class ProjectCreateRequest(ApiModel):
     name: str
 
 
+class ProjectPatchRequest(ApiModel):
+    pinned: Optional[bool] = None
+
+
+class RetentionPolicyUpdate(ApiModel):
+    max_bytes: Optional[int] = None
+    max_age_days: Optional[float] = None
+    keep_pinned_projects: bool = True
+    sweep_interval_seconds: float = 600.0
+
+
 class PronunciationProfileCreate(ApiModel):
     name: str
 
@@ -88,17 +185,59 @@ class VoicePatchRequest(ApiModel):
 
 
 paths = get_paths()
+WORKER_ROLE = os.getenv("OPENVOICELAB_WORKER_ROLE", "primary")
 logger = logging.getLogger("openvoice")
 logger.setLevel(logging.INFO)
 log_handler = logging.FileHandler(paths.logs / "worker.log")
 log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
 logger.addHandler(log_handler)
 
-model_manager = ModelManager(paths.models)
-engine = TtsEngine(model_manager)
+model_manager = ModelManager(
+    paths.models,
+    download_workers=int(os.getenv("OPENVOICELAB_DOWNLOAD_WORKERS", DEFAULT_DOWNLOAD_WORKERS)),
+)
+engine = TtsEngine(
+    model_manager,
+    CpuProfile.from_env(),
+    compile_decoder=os.getenv("OPENVOICELAB_COMPILE") == "1",
+)
 db = Database(paths.db)
-
-app = FastAPI(title="OpenVoiceLab Worker", version=APP_VERSION)
+janitor = OutputJanitor(db, paths.root / "retention.json", paths.outputs / "batches")
+jobs = JobManager()
+scheduler = InferenceScheduler.from_env()
+try:
+    chunk_profiles = load_chunk_profiles(paths.root / "chunk_profiles.json")
+except (OSError, TypeError, ValueError) as exc:
+    logger.warning("Ignoring invalid chunk_profiles.json: %s", exc)
+    chunk_profiles = load_chunk_profiles()
+try:
+    admission_policy = load_admission_policy(paths.root / "admission.json")
+except (OSError, TypeError, ValueError) as exc:
+    logger.warning("Ignoring invalid admission.json: %s", exc)
+    admission_policy = load_admission_policy()
+admission = AdmissionController(admission_policy)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    janitor_task = None
+    # Behind the router only the primary worker owns jobs, staging and retention.
+    if WORKER_ROLE == "primary":
+        # Voices still in staging belong to jobs that died with a previous worker process.
+        shutil.rmtree(paths.voices / "staging", ignore_errors=True)
+        janitor_task = asyncio.create_task(janitor.run())
+    preload = _preload_model_ids(os.getenv("OPENVOICELAB_PRELOAD", ""))
+    if preload:
+        jobs.submit(_job_id(), "model_preload", partial(_preload_models, model_ids=preload))
+    try:
+        yield
+    finally:
+        if janitor_task is not None:
+            janitor_task.cancel()
+        jobs.cancel_all()
+
+
+app = FastAPI(title="OpenVoiceLab Worker", version=APP_VERSION, lifespan=lifespan)
 
 
 def _job_id() -> str:
@@ -109,7 +248,14 @@ def _now() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
+def _is_user_voice_id(voice_id: str) -> bool:
+    return USER_VOICE_ID.fullmatch(voice_id) is not None
+
+
 def _voice_dir(voice_id: str) -> Path:
+    # Voice ids arrive in request bodies and SSML; only generated ids may name a directory.
+    if not _is_user_voice_id(voice_id):
+        raise HTTPException(status_code=404, detail="Voice not found")
     return paths.voices / "user" / voice_id
 
 
@@ -127,9 +273,84 @@ def _load_pronunciation(profile_id: Optional[str]) -> List[Dict[str, str]]:
     return []
 
 
-def _write_wav(path: Path, audio: np.ndarray, sample_rate: int) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    sf.write(str(path), audio, sample_rate, subtype="PCM_16")
+def _resolve_output_format(request: Union[TtsRequest, TtsBatchRequest]) -> AudioFormat:
+    try:
+        return resolve_audio_format(
+            request.output_format or DEFAULT_OUTPUT_FORMAT, request.sample_rate
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _resolve_stream_format(request: TtsRequest) -> Optional[AudioFormat]:
+    try:
+        return resolve_stream_format(
+            request.output_format or DEFAULT_STREAM_FORMAT, request.sample_rate
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _loudness_normalizer(
+    request: Union[TtsRequest, TtsBatchRequest],
+    lookahead_seconds: float,
+) -> Optional[LoudnessNormalizer]:
+    if request.loudness_lufs is None:
+        return None
+    try:
+        return LoudnessNormalizer(
+            request.sample_rate,
+            request.loudness_lufs,
+            request.true_peak_db,
+            lookahead_seconds,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _validate_loudness(request: Union[TtsRequest, TtsBatchRequest]) -> None:
+    _loudness_normalizer(request, 0.0)
+
+
+def _validate_sentence_gap(request: Union[TtsRequest, TtsBatchRequest]) -> None:
+    if not 0 <= request.sentence_gap_ms <= MAX_SENTENCE_GAP_MS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sentenceGapMs must be 0-{MAX_SENTENCE_GAP_MS}",
+        )
+
+
+def _validate_dsp_quality(request: Union[TtsRequest, TtsBatchRequest]) -> None:
+    try:
+        resolve_dsp_quality(request.dsp_quality)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _validate_priority(priority: str) -> None:
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail="priority must be interactive or bulk")
+
+
+def _client_id(http_request: Request) -> Optional[str]:
+    # Per-client limits apply to API keys only; the worker binds to loopback, so peer
+    # addresses cannot tell local callers apart.
+    return http_request.headers.get("x-api-key") or None
+
+
+async def _admit(
+    http_request: Request, characters: int, model_size: str, priority: str
+) -> Admission:
+    try:
+        return await admission.acquire(
+            _client_id(http_request), estimate_cost(characters, model_size), priority
+        )
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail,
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
 
 
 def _camelize_keys(data: Dict[str, object]) -> Dict[str, object]:
@@ -148,20 +369,32 @@ def _apply_text_pipeline(request: TtsRequest) -> Tuple[str, Optional[str]]:
     return text, derived_style
 
 
-def _apply_text_pipeline_segments(
-    request: TtsRequest,
-) -> Tuple[List[Union[TextSegment, BreakSegment]], Optional[str]]:
-    if request.enable_ssml_lite:
-        segments = parse_ssml_lite_segments(request.text)
+def _pronunciation_replacements(profile_id: Optional[str]) -> List[Tuple[str, str]]:
+    entries = _load_pronunciation(profile_id)
+    return [(entry["from"], entry["to"]) for entry in entries]
+
+
+def _text_segments(
+    text: str,
+    enable_ssml_lite: bool,
+    replacements: List[Tuple[str, str]],
+) -> List[Segment]:
+    if enable_ssml_lite:
+        segments = parse_ssml_lite_segments(text)
     else:
-        segments = [TextSegment(text=request.text, rate=None, emphasis=None)]
-    entries = _load_pronunciation(request.pronunciation_profile_id)
-    replacements = [(entry["from"], entry["to"]) for entry in entries]
+        segments = [TextSegment(text=text, rate=None, emphasis=None)]
     if replacements:
         for segment in segments:
             if isinstance(segment, TextSegment):
                 segment.text = apply_pronunciation(segment.text, replacements)
-    return segments, None
+    return segments
+
+
+def _apply_text_pipeline_segments(
+    request: TtsRequest,
+) -> Tuple[List[Union[TextSegment, BreakSegment]], Optional[str]]:
+    replacements = _pronunciation_replacements(request.pronunciation_profile_id)
+    return _text_segments(request.text, request.enable_ssml_lite, replacements), None
 
 
 def _segment_instruct(
@@ -181,11 +414,16 @@ def _segment_instruct(
     return ", ".join(part.strip() for part in parts if part.strip())
 
 
-def _iter_pcm_frames(raw: bytes, sample_rate: int, frame_duration: float = 0.02) -> Iterable[bytes]:
+def _iter_pcm_frames(
+    raw: Union[bytes, memoryview],
+    sample_rate: int,
+    frame_duration: float = 0.02,
+) -> Iterable[memoryview]:
     frame_samples = max(1, int(sample_rate * frame_duration))
     frame_bytes = frame_samples * 2
-    for start in range(0, len(raw), frame_bytes):
-        yield raw[start : start + frame_bytes]
+    view = memoryview(raw)
+    for start in range(0, len(view), frame_bytes):
+        yield view[start : start + frame_bytes]
 
 
 def _resolve_voice_meta(voice_id: str) -> Tuple[str, Optional[Path]]:
@@ -197,12 +435,18 @@ def _resolve_voice_meta(voice_id: str) -> Tuple[str, Optional[Path]]:
     return "user", voice_path
 
 
+# Keyed on the prompt file's mtime, so a re-saved voice is read again.
+@lru_cache(maxsize=CLONE_PROMPT_CACHE_SIZE)
+def _cached_clone_prompt(voice_path: Path, mtime_ns: int):
+    return load_clone_prompt_safe(voice_path)
+
+
 def _load_clone_prompt(voice_path: Path):
     safe_path = voice_path / "clone_prompt.json"
     legacy_path = voice_path / "clone_prompt.pt"
     if safe_path.exists():
         try:
-            return load_clone_prompt_safe(voice_path)
+            return _cached_clone_prompt(voice_path, safe_path.stat().st_mtime_ns)
         except Exception as exc:  # noqa: BLE001
             logger.warning("Failed to load safe clone prompt from %s: %s", voice_path, exc)
             raise HTTPException(status_code=500, detail="Failed to load clone prompt") from exc
@@ -223,178 +467,530 @@ def _load_clone_prompt(voice_path: Path):
     raise HTTPException(status_code=404, detail="Clone prompt not found")
 
 
-async def _ensure_wav_audio(upload: UploadFile) -> Tuple[np.ndarray, int]:
-    suffix = Path(upload.filename or "").suffix.lower()
-    data = await upload.read()
-    if suffix == ".wav":
-        with io.BytesIO(data) as buffer:
-            audio, sr = sf.read(buffer, dtype="float32")
-    else:
-        ffmpeg = shutil.which("ffmpeg")
-        if not ffmpeg:
-            raise HTTPException(status_code=400, detail="Non-wav input requires ffmpeg installed")
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as src:
-            src.write(data)
-            src_path = src.name
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as dst:
-            dst_path = dst.name
-        cmd = [
-            ffmpeg,
-            "-y",
-            "-i",
-            src_path,
-            "-ac",
-            "1",
-            "-ar",
-            str(DEFAULT_SAMPLE_RATE),
-            dst_path,
-        ]
-        try:
-            result = os.spawnv(os.P_WAIT, ffmpeg, cmd)
-            if result != 0:
-                raise HTTPException(status_code=400, detail="ffmpeg failed to decode audio")
-            audio, sr = sf.read(dst_path, dtype="float32")
-        finally:
-            Path(src_path).unlink(missing_ok=True)
-            Path(dst_path).unlink(missing_ok=True)
-    if audio.ndim > 1:
-        audio = np.mean(audio, axis=1)
-    if sr != DEFAULT_SAMPLE_RATE:
-        audio = resample_audio(audio, orig_sr=sr, target_sr=DEFAULT_SAMPLE_RATE)
-        sr = DEFAULT_SAMPLE_RATE
-    return audio.astype(np.float32), sr
-
-
-def _synthesize_chunks(request: TtsRequest) -> Tuple[List[np.ndarray], int, str, Optional[str]]:
-    audio_chunks: List[np.ndarray] = []
-    sample_rate = request.sample_rate
+async def _load_reference_audio(upload: UploadFile) -> Tuple[np.ndarray, int]:
+    if upload.size is not None and upload.size > MAX_REFERENCE_BYTES:
+        raise HTTPException(status_code=413, detail="Reference audio upload is too large")
+    loop = asyncio.get_running_loop()
+    try:
+        audio = await loop.run_in_executor(
+            None,
+            partial(decode_reference_audio, upload.file, upload.filename, DEFAULT_SAMPLE_RATE),
+        )
+    except ReferenceAudioTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return audio, DEFAULT_SAMPLE_RATE
 
-    voice_kind, voice_path = _resolve_voice_meta(request.voice_id)
-    if voice_kind == "preset":
-        voice_name = request.voice_id.split("::", 1)[1]
-        model_id = engine.model_manager.resolve_model_id("custom_voice", request.model_size)
 
-        def _run(model):
-            segments, _ = _apply_text_pipeline_segments(request)
-            audio_chunks_local: List[np.ndarray] = []
-            sample_rate_local = DEFAULT_SAMPLE_RATE
-            for segment in segments:
-                if isinstance(segment, BreakSegment):
-                    audio_chunks_local.append(insert_silence(sample_rate_local, segment.seconds))
-                    continue
-                segment_text = segment.text
-                if not segment_text.strip():
-                    continue
-                segment_style = _segment_instruct(request.style, segment.rate, segment.emphasis)
-                logger.info(
-                    "preset segment rate=%s emphasis=%s style=%s",
-                    segment.rate,
-                    segment.emphasis,
-                    segment_style,
+ChunkIterator = Iterator[Tuple[np.ndarray, int]]
+ChunkSource = Callable[[Any, List[Segment]], ChunkIterator]
+
+
+def _speech_chunk(
+    request: Union[TtsRequest, TtsBatchRequest],
+    audio: np.ndarray,
+    sample_rate: int,
+    after_speech: bool,
+) -> ChunkIterator:
+    # Model chunks carry their own lead-in/out silence; trim it and use a fixed gap instead.
+    if request.trim_silence:
+        audio = trim_silence(audio, sample_rate)
+    if after_speech and request.sentence_gap_ms:
+        yield insert_silence(sample_rate, request.sentence_gap_ms / 1000), sample_rate
+    yield audio, sample_rate
+
+
+def _iter_preset_chunks(
+    model,
+    request: TtsRequest,
+    voice_name: str,
+    profile: ChunkProfile,
+    segments: List[Segment],
+) -> ChunkIterator:
+    sample_rate_local = DEFAULT_SAMPLE_RATE
+    after_speech = False
+    leading = True
+    for segment in segments:
+        if isinstance(segment, BreakSegment):
+            yield insert_silence(sample_rate_local, segment.seconds), sample_rate_local
+            after_speech = False
+            continue
+        segment_text = segment.text
+        if not segment_text.strip():
+            continue
+        segment_style = _segment_instruct(request.style, segment.rate, segment.emphasis)
+        logger.info(
+            "preset segment rate=%s emphasis=%s style=%s",
+            segment.rate,
+            segment.emphasis,
+            segment_style,
+        )
+        # Only the utterance's first chunk gets the profile's short first-chunk budget.
+        chunks = plan_chunks(segment_text, profile, leading)
+        leading = leading and not chunks
+        for chunk in chunks:
+            with scheduler.slot(request.priority):
+                wavs, sample_rate_local = model.generate_custom_voice(
+                    text=chunk,
+                    speaker=voice_name,
+                    language=request.language,
+                    instruct=segment_style,
+                    non_streaming_mode=True,
                 )
-                for chunk in chunk_text(segment_text):
-                    if not chunk.strip():
-                        continue
-                    wavs, sample_rate_local = model.generate_custom_voice(
-                        text=chunk,
-                        speaker=voice_name,
-                        language=request.language,
-                        instruct=segment_style,
-                        non_streaming_mode=True,
-                    )
-                    audio_chunks_local.append(wavs[0])
-            return audio_chunks_local, sample_rate_local
-
-        (audio_chunks, sample_rate), backend_used, warning = engine.run_with_backend(
-            model_id,
-            request.backend,
-            _run,
+            yield from _speech_chunk(request, wavs[0], sample_rate_local, after_speech)
+            after_speech = True
+
+
+def _iter_clone_chunks(
+    model,
+    request: TtsRequest,
+    prompt,
+    profile: ChunkProfile,
+    segments: List[Segment],
+) -> ChunkIterator:
+    sample_rate_local = DEFAULT_SAMPLE_RATE
+    params = inspect.signature(model.generate_voice_clone).parameters
+    supports_instruct = "instruct" in params
+    supports_style = "style" in params
+    after_speech = False
+    leading = True
+    for segment in segments:
+        if isinstance(segment, BreakSegment):
+            yield insert_silence(sample_rate_local, segment.seconds), sample_rate_local
+            after_speech = False
+            continue
+        segment_text = segment.text
+        if not segment_text.strip():
+            continue
+        segment_style = _segment_instruct(request.style, segment.rate, segment.emphasis)
+        logger.info(
+            "clone segment rate=%s emphasis=%s style=%s supports_instruct=%s supports_style=%s",
+            segment.rate,
+            segment.emphasis,
+            segment_style,
+            supports_instruct,
+            supports_style,
         )
-    else:
-        prompt = _load_clone_prompt(voice_path)
-        model_id = engine.model_manager.resolve_model_id("base", request.model_size)
-
-        def _run(model):
-            segments, _ = _apply_text_pipeline_segments(request)
-            audio_chunks_local: List[np.ndarray] = []
-            sample_rate_local = DEFAULT_SAMPLE_RATE
-            params = inspect.signature(model.generate_voice_clone).parameters
-            supports_instruct = "instruct" in params
-            supports_style = "style" in params
-            for segment in segments:
-                if isinstance(segment, BreakSegment):
-                    audio_chunks_local.append(insert_silence(sample_rate_local, segment.seconds))
-                    continue
-                segment_text = segment.text
-                if not segment_text.strip():
-                    continue
-                segment_style = _segment_instruct(request.style, segment.rate, segment.emphasis)
-                logger.info(
-                    "clone segment rate=%s emphasis=%s style=%s supports_instruct=%s "
-                    "supports_style=%s",
+        # Only the utterance's first chunk gets the profile's short first-chunk budget.
+        chunks = plan_chunks(segment_text, profile, leading)
+        leading = leading and not chunks
+        for chunk in chunks:
+            kwargs = {
+                "text": chunk,
+                "language": request.language,
+                "voice_clone_prompt": prompt,
+                "non_streaming_mode": True,
+            }
+            if supports_instruct:
+                kwargs["instruct"] = segment_style
+            elif supports_style:
+                kwargs["style"] = segment_style
+            try:
+                with scheduler.slot(request.priority):
+                    wavs, sample_rate_local = model.generate_voice_clone(**kwargs)
+            except TypeError as exc:
+                if isinstance(prompt, list) and prompt and isinstance(prompt[0], dict):
+                    raise RuntimeError(
+                        f"Voice clone prompt reconstruction failed; type mismatch: {exc}"
+                    ) from exc
+                raise
+            audio = wavs[0]
+            if not (supports_instruct or supports_style):
+                audio = apply_style_dsp(
+                    audio,
+                    sample_rate_local,
                     segment.rate,
                     segment.emphasis,
-                    segment_style,
-                    supports_instruct,
-                    supports_style,
+                    request.dsp_quality,
                 )
-                for chunk in chunk_text(segment_text):
-                    if not chunk.strip():
-                        continue
-                    kwargs = {
-                        "text": chunk,
-                        "language": request.language,
-                        "voice_clone_prompt": prompt,
-                        "non_streaming_mode": True,
-                    }
-                    if supports_instruct:
-                        kwargs["instruct"] = segment_style
-                    elif supports_style:
-                        kwargs["style"] = segment_style
-                    try:
-                        wavs, sample_rate_local = model.generate_voice_clone(**kwargs)
-                    except TypeError as exc:
-                        if isinstance(prompt, list) and prompt and isinstance(prompt[0], dict):
-                            raise RuntimeError(
-                                f"Voice clone prompt reconstruction failed; type mismatch: {exc}"
-                            ) from exc
-                        raise
-                    audio = wavs[0]
-                    if not (supports_instruct or supports_style):
-                        audio = apply_style_dsp(
-                            audio,
-                            sample_rate_local,
-                            segment.rate,
-                            segment.emphasis,
-                        )
-                    audio_chunks_local.append(audio)
-            return audio_chunks_local, sample_rate_local
-
-        (audio_chunks, sample_rate), backend_used, warning = engine.run_with_backend(
-            model_id,
-            request.backend,
-            _run,
+            yield from _speech_chunk(request, audio, sample_rate_local, after_speech)
+            after_speech = True
+
+
+def _plan_synthesis(request: TtsRequest, mode: str = "render") -> Tuple[str, ChunkSource]:
+    voice_kind, voice_path = _resolve_voice_meta(request.voice_id)
+    profile = chunk_profile(chunk_profiles, request.model_size, mode)
+    if voice_kind == "preset":
+        voice_name = request.voice_id.split("::", 1)[1]
+        model_id = engine.model_manager.resolve_model_id("custom_voice", request.model_size)
+        return model_id, partial(
+            _iter_preset_chunks,
+            request=request,
+            voice_name=voice_name,
+            profile=profile,
+        )
+    prompt = _load_clone_prompt(voice_path)
+    model_id = engine.model_manager.resolve_model_id("base", request.model_size)
+    return model_id, partial(_iter_clone_chunks, request=request, prompt=prompt, profile=profile)
+
+
+def _write_chunks(
+    request: TtsRequest,
+    output_path: Path,
+    output_format: AudioFormat,
+    chunks: ChunkIterator,
+) -> int:
+    normalizer = _loudness_normalizer(request, LOUDNESS_LOOKAHEAD_SECONDS)
+    with StreamingRenderWriter(
+        output_path,
+        output_format,
+        request.sample_rate,
+        normalizer=normalizer,
+    ) as writer:
+        for audio, sample_rate in chunks:
+            writer.add(audio, sample_rate)
+    return writer.frames
+
+
+def _render_to_file(
+    request: TtsRequest,
+    output_path: Path,
+    output_format: AudioFormat,
+) -> Tuple[int, Optional[str], Optional[str]]:
+    model_id, iter_chunks = _plan_synthesis(request)
+    segments, _ = _apply_text_pipeline_segments(request)
+    if _has_voice_switches(request, segments):
+        targets: Dict[str, _VoiceTarget] = {}
+        units: List[_BatchUnit] = []
+        profile = chunk_profile(chunk_profiles, request.model_size, "batch")
+        plan = _plan_segment_units(request, segments, profile, targets, units)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=".units-", dir=output_path.parent) as spill_dir:
+            results = _SpilledResults(Path(spill_dir))
+            backend_used, warning = _generate_voice_groups(
+                request, units, targets, DEFAULT_BATCH_SIZE, results
+            )
+            chunks = _iter_planned_chunks(request, plan, results.__getitem__)
+            frames = _write_chunks(request, output_path, output_format, chunks)
+        return frames, backend_used, warning
+
+    return engine.run_with_backend(
+        model_id,
+        request.backend,
+        lambda model: _write_chunks(
+            request, output_path, output_format, iter_chunks(model, segments=segments)
+        ),
+    )
+
+
+@dataclass
+class _BatchUnit:
+    text: str
+    style: str
+    rate: Optional[str]
+    emphasis: Optional[str]
+    voice_id: str
+
+
+@dataclass
+class _VoiceTarget:
+    model_id: str
+    voice_name: Optional[str] = None
+    prompt: Any = None
+
+
+UnitResult = Union[Tuple[np.ndarray, int], Exception]
+UnitPlan = List[Union[float, int]]
+
+
+class _SpilledResults:
+    # Voice groups finish out of document order; keeping their audio on disk until it is
+    # written bounds a long multi-voice render to one batch in memory.
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._sample_rates: Dict[int, int] = {}
+        self._errors: Dict[int, Exception] = {}
+
+    def __setitem__(self, index: int, result: UnitResult) -> None:
+        if isinstance(result, Exception):
+            self._errors[index] = result
+            return
+        audio, sample_rate = result
+        np.asarray(audio, dtype=np.float32).tofile(self.directory / f"{index}.f32")
+        self._sample_rates[index] = sample_rate
+
+    def __getitem__(self, index: int) -> UnitResult:
+        if index in self._errors:
+            return self._errors[index]
+        path = self.directory / f"{index}.f32"
+        audio = np.fromfile(path, dtype=np.float32)
+        path.unlink()
+        return audio, self._sample_rates[index]
+
+
+def _voice_target(voice_id: str, model_size: str) -> _VoiceTarget:
+    voice_kind, voice_path = _resolve_voice_meta(voice_id)
+    if voice_kind == "preset":
+        model_id = engine.model_manager.resolve_model_id("custom_voice", model_size)
+        return _VoiceTarget(model_id, voice_name=voice_id.split("::", 1)[1])
+    model_id = engine.model_manager.resolve_model_id("base", model_size)
+    return _VoiceTarget(model_id, prompt=_load_clone_prompt(voice_path))
+
+
+def _tag_voice_id(name: str) -> str:
+    # <voice name> takes a voice id; bare names that are not user voices mean preset speakers.
+    if name.startswith("preset::") or (_is_user_voice_id(name) and _voice_dir(name).exists()):
+        return name
+    return f"preset::{name}"
+
+
+def _has_voice_switches(request: TtsRequest, segments: List[Segment]) -> bool:
+    return any(
+        isinstance(segment, TextSegment)
+        and segment.voice
+        and _tag_voice_id(segment.voice) != request.voice_id
+        for segment in segments
+    )
+
+
+def _plan_segment_units(
+    request: Union[TtsRequest, TtsBatchRequest],
+    segments: List[Segment],
+    profile: ChunkProfile,
+    targets: Dict[str, _VoiceTarget],
+    units: List[_BatchUnit],
+) -> UnitPlan:
+    plan: UnitPlan = []
+    leading = True
+    for segment in segments:
+        if isinstance(segment, BreakSegment):
+            plan.append(float(segment.seconds))
+            continue
+        voice_id = _tag_voice_id(segment.voice) if segment.voice else request.voice_id
+        if voice_id not in targets:
+            targets[voice_id] = _voice_target(voice_id, request.model_size)
+        style = _segment_instruct(request.style, segment.rate, segment.emphasis)
+        chunks = plan_chunks(segment.text, profile, leading)
+        leading = leading and not chunks
+        for chunk in chunks:
+            plan.append(len(units))
+            units.append(_BatchUnit(chunk, style, segment.rate, segment.emphasis, voice_id))
+    return plan
+
+
+def _plan_batch_items(
+    request: TtsBatchRequest,
+    replacements: List[Tuple[str, str]],
+    targets: Dict[str, _VoiceTarget],
+) -> Tuple[List[_BatchUnit], List[Union[UnitPlan, Exception]]]:
+    units: List[_BatchUnit] = []
+    plans: List[Union[UnitPlan, Exception]] = []
+    profile = chunk_profile(chunk_profiles, request.model_size, "batch")
+    for item in request.items:
+        first_unit = len(units)
+        try:
+            segments = _text_segments(item.text, request.enable_ssml_lite, replacements)
+            plan = _plan_segment_units(request, segments, profile, targets, units)
+        except HTTPException as exc:
+            del units[first_unit:]
+            plans.append(ValueError(exc.detail))
+            continue
+        except ValueError as exc:
+            del units[first_unit:]
+            plans.append(exc)
+            continue
+        plans.append(plan)
+    return units, plans
+
+
+def _generate_voice_groups(
+    request: Union[TtsRequest, TtsBatchRequest],
+    units: List[_BatchUnit],
+    targets: Dict[str, _VoiceTarget],
+    batch_size: int,
+    results: Union[List[UnitResult], _SpilledResults],
+) -> Tuple[Optional[str], Optional[str]]:
+    # Units are grouped per voice, and voices sharing a model run back to back, so each
+    # model and clone prompt is used for whole batches instead of per chunk.
+    groups: Dict[str, List[int]] = {}
+    for index, unit in enumerate(units):
+        groups.setdefault(unit.voice_id, []).append(index)
+    backend_used: Optional[str] = None
+    warning: Optional[str] = None
+    for voice_id in sorted(groups, key=lambda key: targets[key].model_id):
+        target = targets[voice_id]
+        indices = groups[voice_id]
+        group = [units[index] for index in indices]
+
+        def run(model) -> None:
+            batches = _generate_batch_units(
+                model, request, target.voice_name, target.prompt, group, batch_size
+            )
+            for position, output in batches:
+                results[indices[position]] = output
+
+        _, backend_used, group_warning = engine.run_with_backend(
+            target.model_id, request.backend, run
         )
-    return audio_chunks, sample_rate, backend_used, warning
+        warning = warning or group_warning
+    return backend_used, warning
 
 
-def _synthesize(request: TtsRequest) -> Tuple[np.ndarray, int, str, Optional[str]]:
-    audio_chunks, sample_rate, backend_used, warning = _synthesize_chunks(request)
-    stitched = stitch_audio(audio_chunks, sample_rate)
+def _iter_planned_chunks(
+    request: TtsRequest,
+    plan: UnitPlan,
+    unit_result: Callable[[int], UnitResult],
+) -> ChunkIterator:
+    sample_rate = DEFAULT_SAMPLE_RATE
+    after_speech = False
+    for part in plan:
+        if isinstance(part, float):
+            yield insert_silence(sample_rate, part), sample_rate
+            after_speech = False
+            continue
+        result = unit_result(part)
+        if isinstance(result, Exception):
+            raise result
+        audio, sample_rate = result
+        yield from _speech_chunk(request, audio, sample_rate, after_speech)
+        after_speech = True
+
+
+def _voice_switching_chunks(request: TtsRequest, segments: List[Segment]) -> ChunkSource:
+    # Streaming keeps document order: each chunk runs on its voice's model when reached.
+    targets: Dict[str, _VoiceTarget] = {}
+    units: List[_BatchUnit] = []
+    profile = chunk_profile(chunk_profiles, request.model_size, "stream")
+    plan = _plan_segment_units(request, segments, profile, targets, units)
+
+    def generate(index: int) -> UnitResult:
+        unit = units[index]
+        target = targets[unit.voice_id]
+        model, _, _ = engine.get_model_for_backend(target.model_id, request.backend)
+        return _generate_unit_batch(model, request, target.voice_name, target.prompt, [unit])[0]
+
+    return lambda _model, segments: _iter_planned_chunks(request, plan, generate)
+
+
+def _generate_unit_batch(
+    model,
+    request: Union[TtsRequest, TtsBatchRequest],
+    voice_name: Optional[str],
+    prompt,
+    batch: List[_BatchUnit],
+) -> List[Tuple[np.ndarray, int]]:
+    texts = [unit.text for unit in batch]
+    styles = [unit.style for unit in batch]
+    if voice_name is not None:
+        with scheduler.slot(request.priority):
+            wavs, sample_rate = model.generate_custom_voice(
+                text=texts,
+                speaker=voice_name,
+                language=request.language,
+                instruct=styles,
+                non_streaming_mode=True,
+            )
+        return [(wav, sample_rate) for wav in wavs]
+    params = inspect.signature(model.generate_voice_clone).parameters
+    kwargs = {
+        "text": texts,
+        "language": request.language,
+        "voice_clone_prompt": prompt,
+        "non_streaming_mode": True,
+    }
+    if "instruct" in params:
+        kwargs["instruct"] = styles
+    elif "style" in params:
+        kwargs["style"] = styles
+    with scheduler.slot(request.priority):
+        wavs, sample_rate = model.generate_voice_clone(**kwargs)
+    results = []
+    for unit, wav in zip(batch, wavs):
+        if "instruct" not in params and "style" not in params:
+            wav = apply_style_dsp(
+                wav,
+                sample_rate,
+                unit.rate,
+                unit.emphasis,
+                request.dsp_quality,
+            )
+        results.append((wav, sample_rate))
+    return results
+
+
+def _generate_batch_units(
+    model,
+    request: Union[TtsRequest, TtsBatchRequest],
+    voice_name: Optional[str],
+    prompt,
+    units: List[_BatchUnit],
+    batch_size: int,
+) -> Iterator[Tuple[int, UnitResult]]:
+    # Similar lengths batch together so short utterances do not pad out to the longest one.
+    order = sorted(range(len(units)), key=lambda index: len(units[index].text))
+    for start in range(0, len(order), batch_size):
+        indices = order[start : start + batch_size]
+        batch = [units[index] for index in indices]
+        try:
+            outputs = _generate_unit_batch(model, request, voice_name, prompt, batch)
+        except Exception as exc:  # noqa: BLE001
+            if engine.is_cuda_failure(exc):
+                raise
+            logger.warning("Batch generation failed, retrying items individually: %s", exc)
+            outputs = []
+            for unit in batch:
+                try:
+                    outputs.extend(_generate_unit_batch(model, request, voice_name, prompt, [unit]))
+                except Exception as unit_exc:  # noqa: BLE001
+                    if engine.is_cuda_failure(unit_exc):
+                        raise
+                    outputs.append(unit_exc)
+        yield from zip(indices, outputs)
+
+
+def _assemble_batch_item(
+    request: TtsBatchRequest,
+    plan: UnitPlan,
+    results: List[UnitResult],
+) -> np.ndarray:
+    unit_results = [results[part] for part in plan if isinstance(part, int)]
+    for result in unit_results:
+        if isinstance(result, Exception):
+            raise result
+    sample_rate = unit_results[0][1] if unit_results else DEFAULT_SAMPLE_RATE
+    chunks: List[np.ndarray] = []
+    after_speech = False
+    for part in plan:
+        if isinstance(part, float):
+            chunks.append(insert_silence(sample_rate, part))
+            after_speech = False
+        else:
+            speech = _speech_chunk(request, results[part][0], sample_rate, after_speech)
+            chunks.extend(audio for audio, _ in speech)
+            after_speech = True
+    audio = stitch_audio(chunks, sample_rate)
     if sample_rate != request.sample_rate:
-        stitched = resample_audio(stitched, orig_sr=sample_rate, target_sr=request.sample_rate)
-        sample_rate = request.sample_rate
-    return stitched, sample_rate, backend_used, warning
+        audio = resample_audio(audio, orig_sr=sample_rate, target_sr=request.sample_rate)
+    return audio
+
+
+def _archive_stem(item_id: Optional[str], fallback: str) -> str:
+    # Item ids come from the client; keep them to one plain path component.
+    stem = UNSAFE_NAME_CHARS.sub("_", item_id or "").strip("._")
+    return stem[:MAX_ARCHIVE_STEM] or fallback
+
+
+def _write_batch_archive(path: Path, kind: str, members: List[Tuple[Path, str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if kind == "zip":
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for source, name in members:
+                archive.write(source, arcname=name)
+    else:
+        with tarfile.open(path, "w") as archive:
+            for source, name in members:
+                archive.add(str(source), arcname=name)
 
 
 @app.get("/health")
-async def health() -> Dict[str, str]:
+async def health() -> Dict[str, object]:
     return {"ok": True, "version": APP_VERSION}
 
 
 @app.post("/shutdown")
 async def shutdown(request: Request, background_tasks: BackgroundTasks) -> Dict[str, bool]:
-    if request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+    if request.client is None or request.client.host not in LOOPBACK_HOSTS:
         raise HTTPException(status_code=403, detail="Forbidden")
 
     shutdown_event = getattr(app.state, "shutdown_event", None)
@@ -407,6 +1003,32 @@ async def shutdown(request: Request, background_tasks: BackgroundTasks) -> Dict[
     return {"ok": True}
 
 
+@app.get("/memory")
+async def memory() -> Dict[str, object]:
+    models = [
+        _camelize_keys(
+            {"model_id": model_id, "device": device, "mapped_bytes": timings.mapped_bytes}
+        )
+        for (model_id, device), timings in engine.load_timings.items()
+    ]
+    return {**_camelize_keys(process_memory()), "models": models}
+
+
+@app.get("/scheduler")
+async def scheduler_stats() -> Dict[str, object]:
+    lanes = {lane: _camelize_keys(stats) for lane, stats in scheduler.stats().items()}
+    return {"lanes": lanes}
+
+
+@app.get("/admission")
+async def admission_stats() -> Dict[str, object]:
+    stats = _camelize_keys(admission.stats())
+    stats["lanes"] = {
+        lane: _camelize_keys(lane_stats) for lane, lane_stats in stats["lanes"].items()
+    }
+    return stats
+
+
 @app.get("/system")
 async def system_info() -> Dict[str, object]:
     cuda_available = torch.cuda.is_available()
@@ -447,6 +1069,11 @@ async def models_status() -> Dict[str, object]:
                     "progress": pct,
                     "path": str(state.local_dir),
                     "error": state.error,
+                    "loads": [
+                        _camelize_keys(timings.to_dict())
+                        for (loaded_id, _), timings in engine.load_timings.items()
+                        if loaded_id == model_id
+                    ],
                 }
             )
         )
@@ -454,7 +1081,7 @@ async def models_status() -> Dict[str, object]:
 
 
 @app.post("/models/download")
-async def models_download(payload: Dict[str, str]) -> Dict[str, str]:
+async def models_download(payload: Dict[str, str]) -> Dict[str, object]:
     model_id = payload.get("model_id")
     if not model_id:
         raise HTTPException(status_code=400, detail="model_id required")
@@ -467,6 +1094,66 @@ async def models_download(payload: Dict[str, str]) -> Dict[str, str]:
     return {"ok": True, "path": str(state.local_dir)}
 
 
+@app.post("/models/refresh", status_code=202)
+async def models_refresh() -> Dict[str, str]:
+    job = jobs.submit(_job_id(), "model_refresh", lambda _: model_manager.refresh_remote_metadata())
+    return {"jobId": job.job_id, "status": job.status}
+
+
+def _preload_model_ids(spec: str) -> List[str]:
+    # Accepts model ids or kind:size pairs, e.g. "custom_voice:0.6b,base:1.7b".
+    model_ids = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, size = entry.partition(":")
+        try:
+            model_ids.append(model_manager.resolve_model_id(kind, size) if size else entry)
+        except ValueError as exc:
+            logger.warning("Ignoring preload entry %r: %s", entry, exc)
+    return model_ids
+
+
+def _preload_models(job: Job, model_ids: List[str], backend: str = "auto") -> Dict[str, object]:
+    loaded: Dict[str, object] = {}
+    for model_id in model_ids:
+        job.raise_if_cancelled()
+        if not model_manager.is_downloaded(model_id):
+            logger.warning("Skipping preload of %s: not downloaded", model_id)
+            continue
+        _, device, _ = engine.get_model_for_backend(model_id, backend)
+        loaded[model_id] = _camelize_keys(engine.load_timings[(model_id, device)].to_dict())
+    return {"models": loaded}
+
+
+@app.post("/models/preload", status_code=202)
+async def models_preload(payload: Dict[str, str]) -> Dict[str, str]:
+    model_id = payload.get("model_id")
+    if not model_id:
+        raise HTTPException(status_code=400, detail="model_id required")
+    if not model_manager.is_downloaded(model_id):
+        raise HTTPException(status_code=409, detail=f"Model {model_id} is not downloaded")
+    job = jobs.submit(
+        _job_id(),
+        "model_preload",
+        partial(_preload_models, model_ids=[model_id], backend=payload.get("backend", "auto")),
+    )
+    return {"jobId": job.job_id, "status": job.status}
+
+
+def _download_event(state: ModelDownloadState, pct: int) -> str:
+    payload = _camelize_keys(
+        {
+            "pct": pct,
+            "stage": state.status,
+            "downloaded_bytes": state.downloaded_bytes,
+            "total_bytes": state.total_bytes,
+            "bytes_per_second": round(state.bytes_per_second),
+            "files": [_camelize_keys(file.to_dict()) for file in state.files.values()],
+            "error": state.error,
+        }
+    )
+    return f"data: {json.dumps(payload)}\n\n"
+
+
 @app.get("/models/download/events")
 async def models_download_events(model_id: str):
     async def event_stream():
@@ -476,29 +1163,10 @@ async def models_download_events(model_id: str):
             pct = 0
             if state.total_bytes:
                 pct = min(100, int(state.downloaded_bytes / state.total_bytes * 100))
-            payload = _camelize_keys(
-                {
-                    "pct": pct,
-                    "stage": state.status,
-                    "downloaded_bytes": state.downloaded_bytes,
-                    "total_bytes": state.total_bytes,
-                    "error": state.error,
-                }
-            )
-            yield f"data: {json.dumps(payload)}\n\n"
+            yield _download_event(state, pct)
             await asyncio.sleep(0.5)
         model_manager.update_progress(model_id)
-        pct = 100 if state.status == "completed" else 0
-        payload = _camelize_keys(
-            {
-                "pct": pct,
-                "stage": state.status,
-                "downloaded_bytes": state.downloaded_bytes,
-                "total_bytes": state.total_bytes,
-                "error": state.error,
-            }
-        )
-        yield f"data: {json.dumps(payload)}\n\n"
+        yield _download_event(state, 100 if state.status == "completed" else 0)
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
@@ -514,7 +1182,96 @@ async def voices_list() -> Dict[str, object]:
     return {"voices": voices}
 
 
-@app.post("/voices/clone")
+def _voice_staging_dir(voice_id: str) -> Path:
+    return paths.voices / "staging" / voice_id
+
+
+def _discard_staged_voice(voice_id: str) -> None:
+    shutil.rmtree(_voice_staging_dir(voice_id), ignore_errors=True)
+
+
+def _publish_voice(voice_id: str, meta: Dict[str, object]) -> None:
+    staging = _voice_staging_dir(voice_id)
+    # /voices lists folders by meta.json, so it is written last and the folder moved in one rename.
+    write_json(staging / "meta.json", meta)
+    target = _voice_dir(voice_id)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(staging, target)
+
+
+def _build_clone_voice(
+    job: Job,
+    meta: Dict[str, object],
+    audio: np.ndarray,
+    sample_rate: int,
+    keep_ref_audio: bool,
+    priority: str,
+) -> Dict[str, object]:
+    voice_id = meta["voice_id"]
+    staging = _voice_staging_dir(voice_id)
+    staging.mkdir(parents=True, exist_ok=True)
+    with scheduler.slot(priority):
+        prompt = engine.create_clone_prompt(
+            (audio, sample_rate),
+            meta["ref_text"],
+            meta["model_size"],
+            meta["backend"],
+        )
+    job.raise_if_cancelled()
+    save_clone_prompt_safe(staging, prompt)
+    if keep_ref_audio:
+        sf.write(str(staging / "ref_audio.wav"), audio, sample_rate, subtype="PCM_16")
+    job.raise_if_cancelled()
+    _publish_voice(voice_id, meta)
+    return {"voice_id": voice_id}
+
+
+def _build_design_voice(
+    job: Job,
+    meta: Dict[str, object],
+    payload: VoiceDesignRequest,
+) -> Dict[str, object]:
+    voice_id = meta["voice_id"]
+    staging = _voice_staging_dir(voice_id)
+    staging.mkdir(parents=True, exist_ok=True)
+    with scheduler.slot(payload.priority):
+        design = engine.synthesize_voice_design(
+            payload.description, payload.seed_text, payload.backend
+        )
+    job.raise_if_cancelled()
+    sf.write(str(staging / "preview.wav"), design.audio, design.sample_rate, subtype="PCM_16")
+    with scheduler.slot(payload.priority):
+        prompt = engine.create_clone_prompt(
+            (design.audio, design.sample_rate),
+            payload.seed_text,
+            payload.model_size,
+            payload.backend,
+        )
+    job.raise_if_cancelled()
+    save_clone_prompt_safe(staging, prompt)
+    _publish_voice(voice_id, meta)
+    return {"voice_id": voice_id}
+
+
+def _submit_voice_job(kind: str, job_id: str, meta: Dict[str, object], fn) -> Dict[str, str]:
+    voice_id = meta["voice_id"]
+    job = jobs.submit(
+        job_id,
+        kind,
+        partial(fn, meta=meta),
+        cleanup=lambda _: _discard_staged_voice(voice_id),
+    )
+    return {"voiceId": voice_id, "jobId": job.job_id, "status": job.status}
+
+
+def _job_payload(job: Job) -> Dict[str, object]:
+    data = job.to_dict()
+    if data["result"] is not None:
+        data["result"] = _camelize_keys(data["result"])
+    return _camelize_keys(data)
+
+
+@app.post("/voices/clone", status_code=202)
 async def voices_clone(
     name: str = Form(...),
     model_size: str = Form("0.6b"),
@@ -522,15 +1279,17 @@ async def voices_clone(
     keep_ref_audio: bool = Form(False),
     consent: bool = Form(False),
     ref_text: Optional[str] = Form(None),
+    priority: str = Form(BULK),
     audio: UploadFile = File(...),
 ) -> Dict[str, str]:
     if not consent:
         raise HTTPException(status_code=400, detail="consent flag required")
-    voice_id = f"voice_{_job_id()}"
-    voice_path = _voice_dir(voice_id)
-    voice_path.mkdir(parents=True, exist_ok=True)
+    _validate_priority(priority)
+    # The upload is closed once the request ends, so decoding happens before the job is queued.
+    audio_np, sr = await _load_reference_audio(audio)
+    job_id = _job_id()
     meta = {
-        "voice_id": voice_id,
+        "voice_id": f"voice_{job_id}",
         "name": name,
         "type": "clone",
         "tags": [],
@@ -539,25 +1298,22 @@ async def voices_clone(
         "model_size": model_size,
         "backend": backend,
     }
-    write_json(voice_path / "meta.json", meta)
-
-    audio_np, sr = await _ensure_wav_audio(audio)
-    prompt = engine.create_clone_prompt((audio_np, sr), ref_text, model_size, backend)
-    save_clone_prompt_safe(voice_path, prompt)
-
-    if keep_ref_audio:
-        ref_path = voice_path / "ref_audio.wav"
-        sf.write(str(ref_path), audio_np, sr, subtype="PCM_16")
-    return {"voiceId": voice_id}
+    build = partial(
+        _build_clone_voice,
+        audio=audio_np,
+        sample_rate=sr,
+        keep_ref_audio=keep_ref_audio,
+        priority=priority,
+    )
+    return _submit_voice_job("voice_clone", job_id, meta, build)
 
 
-@app.post("/voices/design")
+@app.post("/voices/design", status_code=202)
 async def voices_design(payload: VoiceDesignRequest) -> Dict[str, str]:
-    voice_id = f"voice_{_job_id()}"
-    voice_path = _voice_dir(voice_id)
-    voice_path.mkdir(parents=True, exist_ok=True)
+    _validate_priority(payload.priority)
+    job_id = _job_id()
     meta = {
-        "voice_id": voice_id,
+        "voice_id": f"voice_{job_id}",
         "name": payload.name,
         "type": "design",
         "tags": [],
@@ -566,18 +1322,29 @@ async def voices_design(payload: VoiceDesignRequest) -> Dict[str, str]:
         "model_size": payload.model_size,
         "backend": payload.backend,
     }
-    write_json(voice_path / "meta.json", meta)
-    design = engine.synthesize_voice_design(payload.description, payload.seed_text, payload.backend)
-    preview_path = voice_path / "preview.wav"
-    sf.write(str(preview_path), design.audio, design.sample_rate, subtype="PCM_16")
-    prompt = engine.create_clone_prompt(
-        (design.audio, design.sample_rate),
-        payload.seed_text,
-        payload.model_size,
-        payload.backend,
-    )
-    save_clone_prompt_safe(voice_path, prompt)
-    return {"voiceId": voice_id}
+    build = partial(_build_design_voice, payload=payload)
+    return _submit_voice_job("voice_design", job_id, meta, build)
+
+
+@app.get("/jobs")
+async def jobs_list(kind: Optional[str] = None) -> Dict[str, object]:
+    return {"jobs": [_job_payload(job) for job in jobs.list(kind)]}
+
+
+@app.get("/jobs/{job_id}")
+async def jobs_get(job_id: str) -> Dict[str, object]:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_payload(job)
+
+
+@app.delete("/jobs/{job_id}")
+async def jobs_cancel(job_id: str) -> Dict[str, object]:
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_payload(job)
 
 
 @app.patch("/voices/{voice_id}")
@@ -607,12 +1374,28 @@ async def voices_delete(voice_id: str) -> Dict[str, str]:
 
 
 @app.post("/tts")
-async def tts(request: TtsRequest, background_tasks: BackgroundTasks):
+async def tts(request: TtsRequest, background_tasks: BackgroundTasks, http_request: Request):
     job_id = _job_id()
-    audio, sample_rate, backend_used, warning = _synthesize(request)
-    output_path = paths.outputs / f"{job_id}.wav"
-    _write_wav(output_path, audio, sample_rate)
-    duration_ms = int(len(audio) / sample_rate * 1000)
+    output_format = _resolve_output_format(request)
+    _validate_dsp_quality(request)
+    _validate_sentence_gap(request)
+    _validate_loudness(request)
+    _validate_priority(request.priority)
+    output_path = paths.outputs / f"{job_id}{output_format.extension}"
+    ticket = await _admit(http_request, len(request.text), request.model_size, request.priority)
+    # Off the event loop, so other requests are accepted and scheduled while this one renders.
+    loop = asyncio.get_running_loop()
+    try:
+        frames, backend_used, warning = await loop.run_in_executor(
+            scheduler.executor(request.priority),
+            _render_to_file,
+            request,
+            output_path,
+            output_format,
+        )
+    finally:
+        admission.release(ticket)
+    duration_ms = int(frames / request.sample_rate * 1000)
     entry = {
         "job_id": job_id,
         "text": request.text,
@@ -632,141 +1415,242 @@ async def tts(request: TtsRequest, background_tasks: BackgroundTasks):
     }
 
 
+def _write_batch_items(
+    request: TtsBatchRequest,
+    plans: List[Union[UnitPlan, Exception]],
+    results: List[UnitResult],
+    output_format: AudioFormat,
+    batch_id: str,
+) -> Tuple[List[Dict[str, object]], List[Dict[str, str]], Optional[Path]]:
+    created_at = _now()
+    item_results: List[Dict[str, object]] = []
+    history_entries: List[Dict[str, str]] = []
+    archive_members: List[Tuple[Path, str]] = []
+    for index, (item, plan) in enumerate(zip(request.items, plans)):
+        outcome: Dict[str, object] = {"index": index, "item_id": item.item_id, "ok": False}
+        try:
+            if isinstance(plan, Exception):
+                raise plan
+            audio = _assemble_batch_item(request, plan, results)
+            if request.loudness_lufs is not None:
+                audio = normalize_loudness(
+                    audio,
+                    request.sample_rate,
+                    request.loudness_lufs,
+                    request.true_peak_db,
+                )
+            job_id = _job_id()
+            output_path = paths.outputs / f"{job_id}{output_format.extension}"
+            write_audio(output_path, audio, request.sample_rate, output_format)
+        except Exception as exc:  # noqa: BLE001
+            outcome["error"] = str(exc) or exc.__class__.__name__
+            item_results.append(_camelize_keys(outcome))
+            continue
+        outcome.update(
+            {
+                "ok": True,
+                "job_id": job_id,
+                "output_path": str(output_path),
+                "duration_ms": int(len(audio) / request.sample_rate * 1000),
+            }
+        )
+        item_results.append(_camelize_keys(outcome))
+        history_entries.append(
+            {
+                "job_id": job_id,
+                "text": item.text,
+                "voice_id": request.voice_id,
+                "output_path": str(output_path),
+                "created_at": created_at,
+                "project_id": request.project_id,
+                "pronunciation_profile_id": request.pronunciation_profile_id,
+            }
+        )
+        archive_name = f"{index:05d}_{_archive_stem(item.item_id, job_id)}{output_format.extension}"
+        archive_members.append((output_path, archive_name))
+
+    archive_path: Optional[Path] = None
+    if request.archive and archive_members:
+        archive_path = paths.outputs / "batches" / f"{batch_id}.{request.archive}"
+        _write_batch_archive(archive_path, request.archive, archive_members)
+    return item_results, history_entries, archive_path
+
+
+@app.post("/tts/batch")
+async def tts_batch(
+    request: TtsBatchRequest,
+    background_tasks: BackgroundTasks,
+    http_request: Request,
+):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    if not 1 <= request.batch_size <= MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"batchSize must be 1-{MAX_BATCH_SIZE}")
+    if request.archive is not None and request.archive not in BATCH_ARCHIVE_KINDS:
+        raise HTTPException(status_code=400, detail="archive must be zip or tar")
+    output_format = _resolve_output_format(request)
+    _validate_dsp_quality(request)
+    _validate_sentence_gap(request)
+    _validate_loudness(request)
+    _validate_priority(request.priority)
+
+    targets = {request.voice_id: _voice_target(request.voice_id, request.model_size)}
+    replacements = _pronunciation_replacements(request.pronunciation_profile_id)
+    units, plans = _plan_batch_items(request, replacements, targets)
+    characters = sum(len(item.text) for item in request.items)
+    ticket = await _admit(http_request, characters, request.model_size, request.priority)
+    loop = asyncio.get_running_loop()
+    try:
+        results: List[UnitResult] = [None] * len(units)
+        backend_used, warning = await loop.run_in_executor(
+            scheduler.executor(request.priority),
+            _generate_voice_groups,
+            request,
+            units,
+            targets,
+            request.batch_size,
+            results,
+        )
+    finally:
+        admission.release(ticket)
+
+    batch_id = _job_id()
+    # Assembling, encoding and archiving up to MAX_BATCH_ITEMS files stays off the event loop.
+    item_results, history_entries, archive_path = await loop.run_in_executor(
+        scheduler.executor(request.priority),
+        _write_batch_items,
+        request,
+        plans,
+        results,
+        output_format,
+        batch_id,
+    )
+    if history_entries:
+        background_tasks.add_task(db.add_history_many, history_entries)
+    return {
+        "batchId": batch_id,
+        "results": item_results,
+        "succeeded": len(history_entries),
+        "failed": len(item_results) - len(history_entries),
+        "archivePath": str(archive_path) if archive_path else None,
+        "backendUsed": backend_used,
+        "warning": warning,
+    }
+
+
 @app.post("/tts/stream")
-async def tts_stream(request: TtsRequest):
-    voice_kind, voice_path = _resolve_voice_meta(request.voice_id)
+async def tts_stream(request: TtsRequest, http_request: Request):
+    model_id, iter_chunks = _plan_synthesis(request, "stream")
     target_sample_rate = request.sample_rate
+    stream_format = _resolve_stream_format(request)
+    _validate_dsp_quality(request)
+    _validate_sentence_gap(request)
+    _validate_priority(request.priority)
+    normalizer = _loudness_normalizer(request, STREAM_LOUDNESS_LOOKAHEAD_SECONDS)
+    encoder = StreamEncoder(stream_format, target_sample_rate) if stream_format else None
+    pcm = PcmConverter()
     segments, _ = _apply_text_pipeline_segments(request)
+    if _has_voice_switches(request, segments):
+        iter_chunks = _voice_switching_chunks(request, segments)
+
+    async def emit(audio: np.ndarray):
+        if normalizer is not None:
+            audio = normalizer.process(audio)
+        async for data in send(audio):
+            yield data
+
+    async def send(audio: np.ndarray):
+        if encoder is None:
+            async for frame in _stream_frames(pcm.convert(audio), target_sample_rate):
+                yield frame
+        else:
+            async for data in _stream_encoded(encoder, audio, target_sample_rate):
+                yield data
 
     async def generator():
-        if voice_kind == "preset":
-            voice_name = request.voice_id.split("::", 1)[1]
-            model_id = engine.model_manager.resolve_model_id("custom_voice", request.model_size)
-            model, _, _ = engine.get_model_for_backend(model_id, request.backend)
-            sample_rate_local = DEFAULT_SAMPLE_RATE
-            for segment in segments:
-                if isinstance(segment, BreakSegment):
-                    silence = insert_silence(target_sample_rate, segment.seconds)
-                    raw = _to_pcm_bytes(silence)
-                    async for frame in _stream_frames(raw, target_sample_rate):
-                        yield frame
-                    continue
-                if not segment.text.strip():
-                    continue
-                segment_style = _segment_instruct(request.style, segment.rate, segment.emphasis)
-                logger.info(
-                    "preset stream segment rate=%s emphasis=%s style=%s",
-                    segment.rate,
-                    segment.emphasis,
-                    segment_style,
-                )
-                for chunk in chunk_text(segment.text):
-                    if not chunk.strip():
-                        continue
-                    wavs, sample_rate_local = model.generate_custom_voice(
-                        text=chunk,
-                        speaker=voice_name,
-                        language=request.language,
-                        instruct=segment_style,
-                        non_streaming_mode=True,
-                    )
-                    audio = wavs[0]
-                    if sample_rate_local != target_sample_rate:
-                        audio = resample_audio(
-                            audio,
-                            orig_sr=sample_rate_local,
-                            target_sr=target_sample_rate,
-                        )
-                    raw = _to_pcm_bytes(audio)
-                    async for frame in _stream_frames(raw, target_sample_rate):
-                        yield frame
-        else:
-            prompt = _load_clone_prompt(voice_path)
-            model_id = engine.model_manager.resolve_model_id("base", request.model_size)
-            model, _, _ = engine.get_model_for_backend(model_id, request.backend)
-            params = inspect.signature(model.generate_voice_clone).parameters
-            supports_instruct = "instruct" in params
-            supports_style = "style" in params
-            sample_rate_local = DEFAULT_SAMPLE_RATE
-            for segment in segments:
-                if isinstance(segment, BreakSegment):
-                    silence = insert_silence(target_sample_rate, segment.seconds)
-                    raw = _to_pcm_bytes(silence)
-                    async for frame in _stream_frames(raw, target_sample_rate):
-                        yield frame
-                    continue
-                if not segment.text.strip():
-                    continue
-                segment_style = _segment_instruct(request.style, segment.rate, segment.emphasis)
-                logger.info(
-                    "clone stream segment rate=%s emphasis=%s style=%s supports_instruct=%s "
-                    "supports_style=%s",
-                    segment.rate,
-                    segment.emphasis,
-                    segment_style,
-                    supports_instruct,
-                    supports_style,
-                )
-                for chunk in chunk_text(segment.text):
-                    if not chunk.strip():
-                        continue
-                    kwargs = {
-                        "text": chunk,
-                        "language": request.language,
-                        "voice_clone_prompt": prompt,
-                        "non_streaming_mode": True,
-                    }
-                    if supports_instruct:
-                        kwargs["instruct"] = segment_style
-                    elif supports_style:
-                        kwargs["style"] = segment_style
-                    try:
-                        wavs, sample_rate_local = model.generate_voice_clone(**kwargs)
-                    except TypeError as exc:
-                        if isinstance(prompt, list) and prompt and isinstance(prompt[0], dict):
-                            raise RuntimeError(
-                                f"Voice clone prompt reconstruction failed; type mismatch: {exc}"
-                            ) from exc
-                        raise
-                    audio = wavs[0]
-                    if not (supports_instruct or supports_style):
-                        audio = apply_style_dsp(
-                            audio,
-                            sample_rate_local,
-                            segment.rate,
-                            segment.emphasis,
-                        )
-                    if sample_rate_local != target_sample_rate:
-                        audio = resample_audio(
-                            audio,
-                            orig_sr=sample_rate_local,
-                            target_sr=target_sample_rate,
-                        )
-                    raw = _to_pcm_bytes(audio)
-                    async for frame in _stream_frames(raw, target_sample_rate):
-                        yield frame
+        async for data in synthesize():
+            yield data
+        if encoder is not None:
+            tail = encoder.close()
+            if tail:
+                yield tail
+
+    async def synthesize():
+        # Chunks are generated on the lane's threads; the loop keeps pacing other streams.
+        loop = asyncio.get_running_loop()
+        executor = scheduler.executor(request.priority)
+        model, _, _ = await loop.run_in_executor(
+            executor, engine.get_model_for_backend, model_id, request.backend
+        )
+        chunks = iter_chunks(model, segments=segments)
+        resampler: Optional[PolyphaseResampler] = None
+        while True:
+            item = await loop.run_in_executor(executor, next, chunks, None)
+            if item is None:
+                break
+            audio, sample_rate_local = item
+            if resampler is not None and resampler.orig_sr != sample_rate_local:
+                async for data in emit(resampler.flush()):
+                    yield data
+                resampler = None
+            if sample_rate_local != target_sample_rate:
+                if resampler is None:
+                    resampler = PolyphaseResampler(sample_rate_local, target_sample_rate)
+                audio = resampler.process(audio)
+            async for data in emit(audio):
+                yield data
+        if resampler is not None:
+            async for data in emit(resampler.flush()):
+                yield data
+        if normalizer is not None:
+            async for data in send(normalizer.flush()):
+                yield data
 
     headers = {
         "X-Sample-Rate": str(request.sample_rate),
-        "X-PCM-Format": "s16le",
         "X-Channels": "1",
     }
-    return StreamingResponse(generator(), media_type="application/octet-stream", headers=headers)
-
-
-def _to_pcm_bytes(audio: np.ndarray) -> bytes:
-    audio_int16 = np.clip(audio, -1.0, 1.0)
-    audio_int16 = (audio_int16 * 32767).astype(np.int16)
-    return audio_int16.tobytes()
+    if stream_format is None:
+        media_type = "application/octet-stream"
+        headers["X-Audio-Format"] = "pcm_s16le"
+        headers["X-PCM-Format"] = "s16le"
+    else:
+        media_type = stream_format.media_type
+        headers["X-Audio-Format"] = stream_format.name
+    # The admission is held until the response ends or the client goes away.
+    ticket = await _admit(http_request, len(request.text), request.model_size, request.priority)
+    return BufferStreamingResponse(
+        generator(),
+        media_type=media_type,
+        headers=headers,
+        on_close=lambda: admission.release(ticket),
+    )
 
 
-async def _stream_frames(raw: bytes, sample_rate: int) -> Iterable[bytes]:
+async def _stream_frames(raw: memoryview, sample_rate: int) -> Iterable[memoryview]:
     for frame in _iter_pcm_frames(raw, sample_rate):
         yield frame
         actual_samples = max(1, len(frame) // 2)
         await asyncio.sleep(actual_samples / sample_rate)
 
 
+async def _stream_encoded(
+    encoder: StreamEncoder,
+    audio: np.ndarray,
+    sample_rate: int,
+    frame_duration: float = 0.02,
+) -> Iterable[bytes]:
+    frame_samples = max(1, int(sample_rate * frame_duration))
+    for start in range(0, len(audio), frame_samples):
+        frame = audio[start : start + frame_samples]
+        data = encoder.encode(frame)
+        if data:
+            yield data
+        await asyncio.sleep(len(frame) / sample_rate)
+
+
 @app.get("/projects")
 async def projects_list() -> Dict[str, object]:
     projects = [_camelize_keys(project) for project in db.list_projects()]
@@ -781,6 +1665,13 @@ async def projects_create(payload: ProjectCreateRequest) -> Dict[str, str]:
     return {"projectId": project_id}
 
 
+@app.patch("/projects/{project_id}")
+async def projects_patch(project_id: str, payload: ProjectPatchRequest) -> Dict[str, bool]:
+    if payload.pinned is not None and not db.set_project_pinned(project_id, payload.pinned):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {"ok": True}
+
+
 @app.get("/history")
 async def history_list(limit: int = 50, project_id: Optional[str] = None, q: Optional[str] = None):
     entries = [_camelize_keys(entry) for entry in db.list_history(limit, project_id, q)]
@@ -795,6 +1686,19 @@ async def history_get(job_id: str) -> Dict[str, object]:
     return _camelize_keys(entry)
 
 
+@app.api_route("/history/{job_id}/audio", methods=["GET", "HEAD"])
+async def history_audio(job_id: str, request: Request):
+    entry = db.get_history(job_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="History not found")
+    if entry.get("evicted_at"):
+        raise HTTPException(status_code=410, detail="Audio was removed by output retention")
+    try:
+        return await audio_file_response(Path(entry["output_path"]), request.headers)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Audio file not found") from exc
+
+
 @app.get("/pronunciation/profiles")
 async def pronunciation_profiles():
     profiles = []
@@ -835,20 +1739,71 @@ async def pronunciation_delete(profile_id: str):
     return {"ok": True}
 
 
-@app.delete("/data")
-async def delete_all_data():
+def _retention_status() -> Dict[str, object]:
+    return {
+        "policy": _camelize_keys(janitor.policy.to_dict()),
+        "lastSweep": _camelize_keys(asdict(janitor.last_result)),
+    }
+
+
+@app.get("/outputs/retention")
+async def retention_get() -> Dict[str, object]:
+    return _retention_status()
+
+
+@app.put("/outputs/retention")
+async def retention_update(payload: RetentionPolicyUpdate) -> Dict[str, object]:
+    if payload.max_bytes is not None and payload.max_bytes < 0:
+        raise HTTPException(status_code=400, detail="maxBytes must be non-negative")
+    if payload.max_age_days is not None and payload.max_age_days < 0:
+        raise HTTPException(status_code=400, detail="maxAgeDays must be non-negative")
+    janitor.update_policy(RetentionPolicy(**payload.model_dump()))
+    return _retention_status()
+
+
+@app.post("/outputs/retention/sweep")
+async def retention_sweep() -> Dict[str, object]:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, janitor.sweep)
+    return _retention_status()
+
+
+def _delete_user_data() -> None:
+    jobs.cancel_all()
     for folder in [paths.voices, paths.outputs]:
-        for item in folder.glob("**/*"):
-            if item.is_file():
-                item.unlink()
+        clear_directory(folder)
+    (paths.voices / "user").mkdir(parents=True, exist_ok=True)
     db.delete_all()
+
+
+@app.delete("/data")
+async def delete_all_data():
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _delete_user_data)
     return {"ok": True}
 
 
-@app.middleware("http")
-async def add_request_id(request, call_next):
-    request_id = uuid.uuid4().hex
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-    logger.info("request=%s path=%s status=%s", request_id, request.url.path, response.status_code)
-    return response
+class RequestIdMiddleware:
+    # Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware re-streams every body
+    # chunk through a memory channel as bytes and hides server extensions like zerocopysend.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+                logger.info(
+                    "request=%s path=%s status=%s", request_id, scope["path"], message["status"]
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+app.add_middleware(RequestIdMiddleware)
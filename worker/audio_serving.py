@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import os
+import re
+from email.utils import parsedate_to_datetime
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+import anyio
+from audio_utils import AUDIO_FORMATS
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class PartialFileResponse(FileResponse):
+    def __init__(
+        self,
+        path: Path,
+        start: int,
+        end: int,
+        stat_result: os.stat_result,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ) -> None:
+        super().__init__(
+            path,
+            status_code=206,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        self.start = start
+        self.end = end
+        self.headers["content-length"] = str(end - start + 1)
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        count = self.end - self.start + 1
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped.fileno(),
+                        "offset": self.start,
+                        "count": count,
+                    }
+                )
+                return
+            await file.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class BufferStreamingResponse(StreamingResponse):
+    # Passes bytes-like chunks (e.g. memoryview frames over a reused PCM buffer) straight to the
+    # server instead of requiring bytes; uvicorn copies the body into its transport on send.
+    def __init__(self, *args: Any, on_close: Optional[Callable[[], None]] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # on_close runs however the response ends, including when the client goes away before
+        # the body is iterated, which a finally inside the body generator would miss.
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+    async def stream_response(self, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        async for chunk in self.body_iterator:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(self.charset)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    # Only single ranges are honoured; anything else falls back to the full body (RFC 9110).
+    match = _RANGE_RE.match(header.strip().replace(" ", ""))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def _media_type_for(path: Path) -> str:
+    for fmt in AUDIO_FORMATS.values():
+        if fmt.extension == path.suffix.lower():
+            return fmt.media_type
+    return guess_type(str(path))[0] or "application/octet-stream"
+
+
+def _not_modified(request_headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(if_range: str, etag: str, last_modified: str) -> bool:
+    return if_range.strip() in (etag, last_modified)
+
+
+async def audio_file_response(path: Path, request_headers: Mapping[str, str]) -> Response:
+    stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    media_type = _media_type_for(path)
+    headers = {"accept-ranges": "bytes", "cache-control": "private, max-age=0, must-revalidate"}
+    full = FileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result)
+    etag = full.headers["etag"]
+    last_modified = full.headers["last-modified"]
+
+    if _not_modified(request_headers, etag, stat_result.st_mtime):
+        return Response(
+            status_code=304,
+            headers={**headers, "etag": etag, "last-modified": last_modified},
+        )
+
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if not range_header or (if_range and not _if_range_matches(if_range, etag, last_modified)):
+        return full
+    try:
+        byte_range = parse_range(range_header, stat_result.st_size)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=416,
+            headers={**headers, "content-range": f"bytes */{stat_result.st_size}"},
+        )
+    if byte_range is None:
+        return full
+    start, end = byte_range
+    return PartialFileResponse(
+        path,
+        start,
+        end,
+        stat_result=stat_result,
+        headers=headers,
+        media_type=media_type,
+    )
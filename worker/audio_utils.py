@@ -1,19 +1,249 @@
 from __future__ import annotations
 
-from typing import cast
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
 
 import numpy as np
+import soundfile as sf
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    container: str
+    subtype: str
+    extension: str
+    media_type: str
+
+
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    "wav": AudioFormat("wav", "WAV", "PCM_16", ".wav", "audio/wav"),
+    "flac": AudioFormat("flac", "FLAC", "PCM_16", ".flac", "audio/flac"),
+    "ogg": AudioFormat("ogg", "OGG", "VORBIS", ".ogg", "audio/ogg"),
+    "opus": AudioFormat("opus", "OGG", "OPUS", ".opus", "audio/ogg; codecs=opus"),
+    "mp3": AudioFormat("mp3", "MP3", "MPEG_LAYER_III", ".mp3", "audio/mpeg"),
+}
+PCM_STREAM_FORMAT = "pcm"
+# Formats whose encoders only append, so they can be sent before the file is closed.
+STREAMABLE_FORMATS = {"flac", "opus"}
+OPUS_SAMPLE_RATES = {8000, 12000, 16000, 24000, 48000}
+
+
+def resolve_audio_format(name: str, sample_rate: int) -> AudioFormat:
+    fmt = AUDIO_FORMATS.get(name.lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported output format {name}")
+    if fmt.subtype not in sf.available_subtypes(fmt.container):
+        raise ValueError(f"Output format {name} is not supported by this libsndfile build")
+    if fmt.subtype == "OPUS" and sample_rate not in OPUS_SAMPLE_RATES:
+        raise ValueError(f"Opus output requires one of {sorted(OPUS_SAMPLE_RATES)} Hz")
+    return fmt
+
+
+def resolve_stream_format(name: str, sample_rate: int) -> Optional[AudioFormat]:
+    if name.lower() == PCM_STREAM_FORMAT:
+        return None
+    if name.lower() not in STREAMABLE_FORMATS:
+        raise ValueError(f"Unsupported stream format {name}")
+    return resolve_audio_format(name, sample_rate)
+
+
+def write_audio(path: Path, audio: np.ndarray, sample_rate: int, fmt: AudioFormat) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sf.write(str(path), audio, sample_rate, format=fmt.container, subtype=fmt.subtype)
+
+
+class _AppendOnlySink:
+    # libsndfile seeks back at close to patch headers (e.g. FLAC STREAMINFO totals). Those
+    # bytes have already been sent, so rewrites are dropped and only new bytes are emitted.
+    def __init__(self) -> None:
+        self._pending = bytearray()
+        self._pos = 0
+        self._size = 0
+
+    def write(self, data: bytes) -> int:
+        count = len(data)
+        end = self._pos + count
+        if end > self._size:
+            skip = max(0, self._size - self._pos)
+            self._pending += memoryview(data)[skip:]
+            self._size = end
+        self._pos = end
+        return count
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 0:
+            self._pos = offset
+        elif whence == 1:
+            self._pos += offset
+        else:
+            self._pos = self._size + offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def drain(self) -> bytes:
+        data = bytes(self._pending)
+        self._pending.clear()
+        return data
+
+
+class StreamEncoder:
+    def __init__(self, fmt: AudioFormat, sample_rate: int) -> None:
+        self.format = fmt
+        self._sink = _AppendOnlySink()
+        self._file = sf.SoundFile(
+            self._sink,
+            mode="w",
+            samplerate=sample_rate,
+            channels=1,
+            format=fmt.container,
+            subtype=fmt.subtype,
+        )
+
+    def encode(self, audio: np.ndarray) -> bytes:
+        if audio.size:
+            self._file.write(audio.astype(np.float32, copy=False))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        if not self._file.closed:
+            self._file.close()
+        return self._sink.drain()
+
+
+class PcmConverter:
+    # Converts float audio to 16-bit PCM in buffers reused across calls. The returned view is only
+    # valid until the next convert(); ASGI servers copy body chunks on send.
+    def __init__(self) -> None:
+        self._scaled = np.empty(0, dtype=np.float32)
+        self._pcm = np.empty(0, dtype=np.int16)
+
+    def convert(self, audio: np.ndarray) -> memoryview:
+        count = audio.size
+        if self._pcm.size < count:
+            self._scaled = np.empty(max(count, self._pcm.size * 2), dtype=np.float32)
+            self._pcm = np.empty(self._scaled.size, dtype=np.int16)
+        scaled = self._scaled[:count]
+        pcm = self._pcm[:count]
+        np.clip(audio.reshape(-1), -1.0, 1.0, out=scaled)
+        np.multiply(scaled, 32767, out=scaled)
+        np.copyto(pcm, scaled, casting="unsafe")
+        return memoryview(pcm).cast("B")
+
+
+@dataclass(frozen=True)
+class _PolyphaseFilter:
+    up: int
+    down: int
+    taps: np.ndarray
+    pre_remove: int
+
+
+@lru_cache(maxsize=32)
+def _design_polyphase_filter(up: int, down: int) -> _PolyphaseFilter:
+    from scipy.signal import firwin
+
+    # Same design as scipy.signal.resample_poly so one-shot output matches it exactly.
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * up
+    pre_pad = down - half_len % down
+    taps = np.concatenate([np.zeros(pre_pad), taps]).astype(np.float32)
+    taps.setflags(write=False)
+    return _PolyphaseFilter(up, down, taps, (half_len + pre_pad) // down)
+
+
+class PolyphaseResampler:
+    def __init__(self, orig_sr: int, target_sr: int) -> None:
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        divisor = math.gcd(orig_sr, target_sr)
+        self.up = target_sr // divisor
+        self.down = orig_sr // divisor
+        self._filter = _design_polyphase_filter(self.up, self.down)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self) -> None:
+        self._history_len = 0
+        self._history_start = 0
+        self._consumed = 0
+        self._next_output = self._filter.pre_remove
+
+    def resample(self, audio: np.ndarray) -> np.ndarray:
+        self.reset()
+        head = self.process(audio)
+        tail = self.flush()
+        if not tail.size:
+            return head.copy()
+        return np.concatenate([head, tail])
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if self.up == self.down:
+            return audio.copy()
+        return self._process(audio)
+
+    def flush(self) -> np.ndarray:
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        total = -(-self._consumed * self.up // self.down)
+        end = self._filter.pre_remove + total
+        remaining = end - self._next_output
+        if remaining <= 0:
+            self.reset()
+            return np.zeros(0, dtype=np.float32)
+        last_input_needed = ((end - 1) * self.down) // self.up + 1
+        padding = np.zeros(max(0, last_input_needed - self._consumed), dtype=np.float32)
+        output = self._process(padding)[:remaining].copy()
+        self.reset()
+        return output
+
+    def _process(self, audio: np.ndarray) -> np.ndarray:
+        up, down = self.up, self.down
+        history = self._history_len
+        needed = history + audio.size
+        if self._buffer.size < needed:
+            grown = np.zeros(max(needed, self._buffer.size * 2), dtype=np.float32)
+            grown[:history] = self._buffer[:history]
+            self._buffer = grown
+        buffer = self._buffer
+        buffer[history:needed] = audio
+        self._consumed += audio.size
+
+        end_output = (self._consumed * up - 1) // down + 1 if self._consumed else 0
+        if end_output <= self._next_output:
+            output = np.zeros(0, dtype=np.float32)
+        else:
+            from scipy.signal import upfirdn
+
+            base_output = self._history_start * up // down
+            filtered = upfirdn(self._filter.taps, buffer[:needed], up, down)
+            output = filtered[self._next_output - base_output : end_output - base_output]
+            output = output.astype(np.float32, copy=False)
+            self._next_output = end_output
+
+        # Keep just enough input for the next output's filter support, starting on a multiple of
+        # ``down`` so the next upfirdn call lines up with the global output grid.
+        earliest = max(0, (self._next_output * down - self._filter.taps.size + 1) // up)
+        keep_from = max(self._history_start, earliest - earliest % down)
+        shift = keep_from - self._history_start
+        if shift:
+            buffer[: needed - shift] = buffer[shift:needed]
+        self._history_start = keep_from
+        self._history_len = needed - shift
+        return output
 
 
 def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
     if orig_sr == target_sr:
         return audio.astype(np.float32)
-    try:
-        from scipy.signal import resample_poly
-
-        audio_resampled = resample_poly(audio, target_sr, orig_sr)
-    except Exception:
-        import librosa
-
-        audio_resampled = librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr)
-    return cast(np.ndarray, audio_resampled).astype(np.float32)
+    return PolyphaseResampler(orig_sr, target_sr).resample(audio)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from model_manager import ModelManager  # noqa: E402
+from storage import get_paths  # noqa: E402
+from text_pipeline import chunk_text  # noqa: E402
+from tts_engine import TtsEngine  # noqa: E402
+
+SAMPLE_TEXT = (
+    "The lighthouse keeper climbed the stairs every evening, counting each step out loud. "
+    "Some nights the wind was so strong that the whole tower seemed to hum, and he would stop "
+    "halfway, listening, before carrying on. Ships passed far out at sea; most never knew his "
+    "name. Still, he polished the lens, trimmed the wick and wrote the weather in his log: "
+    "clear, then cloudy, then rain again. When the relief boat finally came in spring, he "
+    "found he did not want to leave. "
+)
+
+
+def _time_chunks(model, chunks: List[str], voice: str, batch_size: int) -> Tuple[float, float]:
+    # Returns (seconds per call for the first call, audio seconds produced per wall second).
+    first = None
+    audio_seconds = 0.0
+    start = time.perf_counter()
+    for index in range(0, len(chunks), batch_size):
+        call_start = time.perf_counter()
+        batch = chunks[index : index + batch_size]
+        wavs, sample_rate = model.generate_custom_voice(
+            text=batch if batch_size > 1 else batch[0],
+            speaker=voice,
+            language="Auto",
+            instruct=None,
+            non_streaming_mode=True,
+        )
+        if first is None:
+            first = time.perf_counter() - call_start
+        audio_seconds += sum(len(wav) for wav in wavs) / sample_rate
+    return first or 0.0, audio_seconds / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tune chunk planner profiles for one model size")
+    parser.add_argument("--model-size", default="0.6b")
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--voice", default=None, help="preset speaker, defaults to the first")
+    parser.add_argument("--sizes", default="60,80,120,160,240,320,400")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--first-chunk-ms", type=float, default=800.0)
+    parser.add_argument("--repeat-text", type=int, default=4)
+    parser.add_argument("--write", action="store_true", help="save to chunk_profiles.json")
+    args = parser.parse_args()
+
+    paths = get_paths()
+    engine = TtsEngine(ModelManager(paths.models))
+    model_id = engine.model_manager.resolve_model_id("custom_voice", args.model_size)
+    model, device, _ = engine.get_model_for_backend(model_id, args.backend)
+    voice = args.voice or model.model.get_supported_speakers()[0]
+    text = SAMPLE_TEXT * args.repeat_text
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    _time_chunks(model, chunk_text(SAMPLE_TEXT, 80), voice, 1)
+
+    print(f"{model_id} on {device}, {len(text)} chars")
+    print(f"{'chars':>6} {'first ms':>9} {'seq x rt':>9} {'batch x rt':>11}")
+    results: Dict[int, Tuple[float, float, float]] = {}
+    for size in sizes:
+        chunks = chunk_text(text, size, size)
+        first, sequential = _time_chunks(model, chunks, voice, 1)
+        _, batched = _time_chunks(model, chunks, voice, args.batch_size)
+        results[size] = (first, sequential, batched)
+        print(f"{size:>6} {first * 1000:>9.0f} {sequential:>9.2f} {batched:>11.2f}")
+
+    render = max(sizes, key=lambda size: results[size][1])
+    batch = max(sizes, key=lambda size: results[size][2])
+    fast_enough = [size for size in sizes if results[size][0] * 1000 <= args.first_chunk_ms]
+    first_chunk = max(fast_enough) if fast_enough else sizes[0]
+    # Later stream chunks only need to finish before the previous one has played out.
+    realtime = [size for size in sizes if results[size][1] >= 1.0]
+    stream = min(render, max(realtime)) if realtime else render
+    tuned = {
+        "render": {"max_chars": render * 4 // 3, "target_chars": render},
+        "stream": {
+            "max_chars": stream * 4 // 3,
+            "target_chars": stream,
+            "first_chunk_chars": first_chunk,
+        },
+        "batch": {"max_chars": batch * 4 // 3, "target_chars": batch},
+    }
+    print(json.dumps({args.model_size: tuned}, indent=2))
+
+    if args.write:
+        path = paths.root / "chunk_profiles.json"
+        data = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        data[args.model_size.lower()] = tuned
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        print(f"wrote {path}; restart the worker to apply")
+
+
+if __name__ == "__main__":
+    main()
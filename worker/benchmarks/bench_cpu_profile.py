@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from model_manager import ModelManager  # noqa: E402
+from storage import get_paths  # noqa: E402
+from tts_engine import CpuProfile, TtsEngine, cpu_supports_bf16  # noqa: E402
+
+SAMPLE_TEXT = (
+    "The lighthouse keeper climbed the stairs every evening, counting each step out loud. "
+    "Some nights the wind was so strong that the whole tower seemed to hum."
+)
+
+
+def _mean_log_spectrum(audio: np.ndarray, frame: int = 1024) -> np.ndarray:
+    frames = len(audio) // frame
+    if frames == 0:
+        return np.zeros(frame // 2 + 1)
+    blocks = audio[: frames * frame].reshape(frames, frame) * np.hanning(frame)
+    power = np.mean(np.abs(np.fft.rfft(blocks, axis=1)) ** 2, axis=0)
+    return 10 * np.log10(power + 1e-10)
+
+
+def _spectral_distance_db(audio: np.ndarray, reference: np.ndarray) -> float:
+    # Greedy decoding can still drift by a few frames, so compare average spectra rather
+    # than samples.
+    diff = _mean_log_spectrum(audio) - _mean_log_spectrum(reference)
+    return float(np.sqrt(np.mean(diff**2)))
+
+
+def _run(engine: TtsEngine, model_id: str, voice: Optional[str], text: str, repeats: int):
+    model, _, _ = engine.get_model_for_backend(model_id, "cpu")
+    voice = voice or model.model.get_supported_speakers()[0]
+
+    def generate() -> Tuple[np.ndarray, int]:
+        wavs, sample_rate = model.generate_custom_voice(
+            text=text,
+            speaker=voice,
+            language="Auto",
+            instruct=None,
+            non_streaming_mode=True,
+            do_sample=False,
+        )
+        return wavs[0], sample_rate
+
+    generate()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        audio, sample_rate = generate()
+    elapsed = (time.perf_counter() - start) / repeats
+    return audio, sample_rate, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare CPU precision and thread settings")
+    parser.add_argument("--model-size", default="0.6b")
+    parser.add_argument("--voice", default=None, help="preset speaker, defaults to the first")
+    parser.add_argument("--precisions", default="float32,bfloat16,int8")
+    parser.add_argument("--threads", default="", help="comma list, defaults to all cores")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = get_paths()
+    manager = ModelManager(paths.models)
+    model_id = manager.resolve_model_id("custom_voice", args.model_size)
+    precisions = [name.strip() for name in args.precisions.split(",")]
+    if "bfloat16" in precisions and not cpu_supports_bf16():
+        print("skipping bfloat16: no native support on this CPU")
+        precisions.remove("bfloat16")
+    thread_counts = [int(count) for count in args.threads.split(",") if count] or [None]
+
+    print(f"{model_id}, {len(SAMPLE_TEXT)} chars, {args.repeats} runs each")
+    print(
+        f"{'precision':>9} {'threads':>7} {'load s':>7} {'cache':>6} "
+        f"{'synth s':>8} {'x rt':>6} {'len ratio':>9} {'spec dB':>8}"
+    )
+    reference: Optional[np.ndarray] = None
+    for precision in precisions:
+        for threads in thread_counts:
+            engine = TtsEngine(manager, CpuProfile(precision=precision, threads=threads))
+            audio, sample_rate, elapsed = _run(
+                engine, model_id, args.voice, SAMPLE_TEXT, args.repeats
+            )
+            timings = engine.load_timings[(model_id, "cpu")]
+            if reference is None:
+                reference = audio
+            cache = timings.quantized or timings.cache
+            print(
+                f"{precision:>9} {threads or 'all':>7} {timings.total_seconds:>7.1f} "
+                f"{cache:>6} {elapsed:>8.2f} {len(audio) / sample_rate / elapsed:>6.2f} "
+                f"{len(audio) / len(reference):>9.2f} "
+                f"{_spectral_distance_db(audio, reference):>8.2f}"
+            )
+            del engine
+            gc.collect()
+    print("len ratio and spec dB compare against the first row; run it twice to time cache hits")
+
+
+if __name__ == "__main__":
+    main()
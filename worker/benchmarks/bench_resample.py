@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.signal import resample_poly
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from audio_utils import PolyphaseResampler  # noqa: E402
+
+
+def _bench(label: str, fn, seconds_of_audio: float, repeats: int) -> None:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:8.2f} ms  {seconds_of_audio / best:8.1f}x realtime")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-chunk resampling strategies")
+    parser.add_argument("--orig-sr", type=int, default=24000)
+    parser.add_argument("--target-sr", type=int, default=44100)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--chunk-ms", type=float, default=200.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, int(args.orig_sr * args.seconds)).astype(np.float32)
+    chunk = max(1, int(args.orig_sr * args.chunk_ms / 1000))
+    chunks = [audio[start : start + chunk] for start in range(0, audio.size, chunk)]
+    print(
+        f"{args.orig_sr} -> {args.target_sr} Hz, {args.seconds:.0f}s audio, "
+        f"{len(chunks)} chunks of {args.chunk_ms:.0f} ms"
+    )
+
+    def stateless_per_chunk() -> None:
+        for block in chunks:
+            resample_poly(block, args.target_sr, args.orig_sr).astype(np.float32)
+
+    def streaming_per_chunk() -> None:
+        resampler = PolyphaseResampler(args.orig_sr, args.target_sr)
+        for block in chunks:
+            resampler.process(block)
+        resampler.flush()
+
+    def one_shot() -> None:
+        PolyphaseResampler(args.orig_sr, args.target_sr).resample(audio)
+
+    _bench("resample_poly per chunk (stateless)", stateless_per_chunk, args.seconds, args.repeats)
+    _bench("PolyphaseResampler per chunk", streaming_per_chunk, args.seconds, args.repeats)
+    _bench("PolyphaseResampler one-shot", one_shot, args.seconds, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from memory_stats import process_memory  # noqa: E402
+
+
+def _load(model_size: str, threads: int, ready, done, results) -> None:
+    from model_manager import ModelManager
+    from storage import get_paths
+    from tts_engine import CpuProfile, TtsEngine
+
+    engine = TtsEngine(ModelManager(get_paths().models), CpuProfile(threads=threads))
+    model_id = engine.model_manager.resolve_model_id("custom_voice", model_size)
+    engine.get_model_for_backend(model_id, "cpu")
+    timings = engine.load_timings[(model_id, "cpu")]
+    # Sample once every worker has loaded, so PSS reflects the sharing.
+    ready.wait()
+    results.put({**process_memory(), "mapped_bytes": timings.mapped_bytes})
+    done.wait()
+
+
+def _mb(value) -> str:
+    return "n/a" if value is None else f"{value / 1e6:.0f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure memory of N workers sharing weights")
+    parser.add_argument("--model-size", default="0.6b")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(args.processes + 1)
+    done = context.Event()
+    results = context.Queue()
+    threads = max(1, (multiprocessing.cpu_count() or 1) // args.processes)
+    workers = [
+        context.Process(target=_load, args=(args.model_size, threads, ready, done, results))
+        for _ in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    ready.wait()
+    stats = [results.get() for _ in workers]
+    print(f"{'worker':>6} {'rss MB':>8} {'pss MB':>8} {'private MB':>11} {'mapped MB':>10}")
+    for index, entry in enumerate(stats):
+        print(
+            f"{index:>6} {_mb(entry['rss_bytes']):>8} {_mb(entry['pss_bytes']):>8} "
+            f"{_mb(entry['private_bytes']):>11} {_mb(entry['mapped_bytes']):>10}"
+        )
+    done.set()
+    for worker in workers:
+        worker.join()
+    rss = sum(entry["rss_bytes"] or 0 for entry in stats)
+    pss = [entry["pss_bytes"] for entry in stats]
+    private = sum(entry["private_bytes"] or 0 for entry in stats)
+    print(f"sum of RSS {_mb(rss)} MB (shared weights counted once per worker)")
+    print(f"sum of PSS {_mb(None if None in pss else sum(pss))} MB (actual combined footprint)")
+    print(f"private total {_mb(private)} MB")
+
+
+if __name__ == "__main__":
+    main()
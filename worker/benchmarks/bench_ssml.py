@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from text_pipeline import parse_ssml_lite, parse_ssml_lite_segments  # noqa: E402
+
+PARAGRAPH = (
+    'Chapter one. <prosody rate="slow">It was a quiet night,</prosody> and the '
+    '<emphasis level="strong">phone</emphasis> rang at <say-as interpret-as="digits">3</say-as> '
+    'a.m. <break time="300ms"/> The caller read out <say-as interpret-as="telephone">'
+    '555-0134</say-as> from the <sub alias="World Health Organization">WHO</sub> page. '
+    '<voice name="Ryan">"Who is this?" he asked.</voice> <unknown>Nobody answered.</unknown> '
+)
+
+
+def _bench(label: str, fn, size: int, repeats: int) -> None:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:9.2f} ms  {size / best / 1e6:7.1f} MB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the SSML-lite parsers on large documents")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="document sizes in bytes")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        document = (PARAGRAPH * (size // len(PARAGRAPH) + 1))[:size]
+        segments = parse_ssml_lite_segments(document)
+        print(f"{len(document)} chars, {len(segments)} segments")
+        _bench(
+            "parse_ssml_lite_segments",
+            lambda: parse_ssml_lite_segments(document),
+            size,
+            args.repeats,
+        )
+        _bench("parse_ssml_lite", lambda: parse_ssml_lite(document), size, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dsp_utils import DSP_QUALITIES, apply_style_dsp  # noqa: E402
+
+
+def _bench(label: str, fn, seconds_of_audio: float, repeats: int) -> None:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:8.2f} ms  {seconds_of_audio / best:8.1f}x realtime")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare style DSP engines on one chunk")
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--librosa", action="store_true", help="include the STFT baseline")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, int(args.sample_rate * args.seconds)).astype(np.float32)
+    print(f"{args.sample_rate} Hz, {args.seconds:.1f}s chunk, rate=slow emphasis=strong")
+
+    for name in DSP_QUALITIES:
+        apply_style_dsp(audio, args.sample_rate, "slow", "strong", name)
+        _bench(
+            f"wsola ({name})",
+            lambda name=name: apply_style_dsp(audio, args.sample_rate, "slow", "strong", name),
+            args.seconds,
+            args.repeats,
+        )
+
+    if args.librosa:
+        import librosa
+
+        def phase_vocoder() -> None:
+            shifted = librosa.effects.pitch_shift(audio, sr=args.sample_rate, n_steps=1.0)
+            librosa.effects.time_stretch(shifted, rate=1.0 / (1.15 * 1.10))
+
+        _bench("librosa pitch_shift + time_stretch", phase_vocoder, args.seconds, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
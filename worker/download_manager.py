@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+CHUNK_BYTES = 1 << 20
+DEFAULT_DOWNLOAD_WORKERS = 4
+PART_SUFFIX = ".part"
+
+
+class DownloadVerificationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class RemoteFile:
+    name: str
+    url: str
+    size: int
+    sha256: Optional[str] = None
+
+
+@dataclass
+class FileProgress:
+    name: str
+    size: int
+    downloaded: int = 0
+    resumed_from: int = 0
+    status: str = "pending"
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return (self.downloaded - self.resumed_from) / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "size": self.size,
+            "downloaded": self.downloaded,
+            "status": self.status,
+            "bytes_per_second": round(self.bytes_per_second),
+            "error": self.error,
+        }
+
+
+ByteCallback = Callable[[int, bool], None]
+
+
+class DownloadManager:
+    def __init__(
+        self,
+        workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+    ) -> None:
+        self.workers = workers
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def download(
+        self,
+        files: List[RemoteFile],
+        local_dir: Path,
+        progress: Dict[str, FileProgress],
+        on_bytes: ByteCallback,
+    ) -> Dict[str, str]:
+        # Fetches every file concurrently and returns each one's SHA-256. ``on_bytes`` gets
+        # (count, resumed) for every block written, so callers can keep running totals.
+        digests: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {
+                pool.submit(self._fetch, remote, local_dir, progress[remote.name], on_bytes): remote
+                for remote in files
+            }
+            errors = []
+            for future in as_completed(futures):
+                try:
+                    digests[futures[future].name] = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(exc)
+        if errors:
+            raise errors[0]
+        return digests
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _fetch(
+        self,
+        remote: RemoteFile,
+        local_dir: Path,
+        progress: FileProgress,
+        on_bytes: ByteCallback,
+    ) -> str:
+        try:
+            return self._fetch_file(remote, local_dir, progress, on_bytes)
+        except Exception as exc:
+            progress.status = "error"
+            progress.error = str(exc) or exc.__class__.__name__
+            raise
+
+    def _fetch_file(
+        self,
+        remote: RemoteFile,
+        local_dir: Path,
+        progress: FileProgress,
+        on_bytes: ByteCallback,
+    ) -> str:
+        path = local_dir / remote.name
+        progress.started_at = time.monotonic()
+        if path.is_file() and path.stat().st_size == remote.size:
+            progress.status = "verifying"
+            digest = sha256_file(path)
+            if remote.sha256 is None or digest == remote.sha256:
+                progress.downloaded = progress.resumed_from = remote.size
+                progress.status = "completed"
+                progress.finished_at = time.monotonic()
+                on_bytes(remote.size, True)
+                return digest
+            path.unlink()
+
+        part = path.with_name(path.name + PART_SUFFIX)
+        part.parent.mkdir(parents=True, exist_ok=True)
+        offset = part.stat().st_size if part.exists() else 0
+        if offset > remote.size:
+            part.unlink()
+            offset = 0
+        digest = hashlib.sha256()
+        if offset:
+            _hash_into(digest, part)
+            on_bytes(offset, True)
+        progress.downloaded = progress.resumed_from = offset
+
+        if offset < remote.size or not part.exists():
+            progress.status = "downloading"
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            with self._session().get(
+                remote.url,
+                headers=headers,
+                stream=True,
+                timeout=self.timeout,
+            ) as response:
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # The server ignored the range; start the file over.
+                    on_bytes(-offset, True)
+                    offset = progress.downloaded = progress.resumed_from = 0
+                    digest = hashlib.sha256()
+                with part.open("ab" if offset else "wb") as handle:
+                    for block in response.iter_content(CHUNK_BYTES):
+                        handle.write(block)
+                        digest.update(block)
+                        progress.downloaded += len(block)
+                        on_bytes(len(block), False)
+
+        progress.status = "verifying"
+        size = part.stat().st_size
+        if size != remote.size:
+            raise DownloadVerificationError(
+                f"{remote.name}: expected {remote.size} bytes, got {size}"
+            )
+        if remote.sha256 is not None and digest.hexdigest() != remote.sha256:
+            # A corrupt partial file must not be resumed from.
+            part.unlink()
+            raise DownloadVerificationError(f"{remote.name}: SHA-256 mismatch")
+        os.replace(part, path)
+        progress.status = "completed"
+        progress.finished_at = time.monotonic()
+        return digest.hexdigest()
+
+
+def _hash_into(digest, path: Path) -> None:
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(CHUNK_BYTES), b""):
+            digest.update(block)
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    _hash_into(digest, path)
+    return digest.hexdigest()
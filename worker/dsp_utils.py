@@ -1,8 +1,37 @@
 from __future__ import annotations
 
-from typing import Optional
+import math
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, Optional
 
 import numpy as np
+from audio_utils import PolyphaseResampler
+
+
+@dataclass(frozen=True)
+class DspQuality:
+    frame_ms: float
+    overlap: int
+    search_ms: float
+    # 0 falls back to linear interpolation for the pitch-shift resampling step.
+    max_ratio_denominator: int
+
+
+DSP_QUALITIES: Dict[str, DspQuality] = {
+    "fast": DspQuality(frame_ms=20.0, overlap=2, search_ms=4.0, max_ratio_denominator=0),
+    "balanced": DspQuality(frame_ms=30.0, overlap=2, search_ms=8.0, max_ratio_denominator=64),
+    "high": DspQuality(frame_ms=40.0, overlap=4, search_ms=12.0, max_ratio_denominator=256),
+}
+DEFAULT_DSP_QUALITY = "balanced"
+
+
+def resolve_dsp_quality(name: Optional[str]) -> DspQuality:
+    quality = DSP_QUALITIES.get((name or DEFAULT_DSP_QUALITY).lower())
+    if quality is None:
+        raise ValueError(f"Unsupported DSP quality {name}")
+    return quality
 
 
 def db_to_gain(db: float) -> float:
@@ -16,24 +45,161 @@ def apply_gain(audio: np.ndarray, db: float) -> np.ndarray:
     return (audio * gain).astype(np.float32)
 
 
-def apply_time_stretch(audio: np.ndarray, rate: float, sample_rate: int) -> np.ndarray:
-    if rate == 1.0:
-        return audio.astype(np.float32)
+@lru_cache(maxsize=16)
+def _ola_window(length: int) -> np.ndarray:
+    # Periodic Hann so 50% and 75% overlaps sum to a constant.
+    window = np.hanning(length + 1)[:-1].astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+@lru_cache(maxsize=16)
+def _ola_norm(length: int, overlap: int, n_frames: int) -> np.ndarray:
+    window = _ola_window(length)
+    hop = length // overlap
+    norm = np.zeros((n_frames + overlap - 1) * hop, dtype=np.float32)
+    tiled = np.tile(window, (n_frames, 1))
+    for part in range(overlap):
+        norm[part * hop : part * hop + n_frames * hop] += tiled[
+            :, part * hop : (part + 1) * hop
+        ].reshape(-1)
+    norm = np.maximum(norm, 1e-3)
+    norm.setflags(write=False)
+    return norm
+
+
+def wsola_stretch(
+    audio: np.ndarray,
+    rate: float,
+    sample_rate: int,
+    quality: DspQuality,
+) -> np.ndarray:
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame = max(quality.overlap * 8, int(sample_rate * quality.frame_ms / 1000))
+    frame -= frame % quality.overlap
+    hop = frame // quality.overlap
+    tolerance = max(1, int(sample_rate * quality.search_ms / 1000))
+    target_len = int(round(audio.size / rate))
+    if audio.size < frame or target_len == 0:
+        return audio.copy()
+
+    n_frames = -(-target_len // hop) + 1
+    analysis_hop = hop * rate
+    last_nominal = int(round((n_frames - 1) * analysis_hop))
+    tail = max(0, last_nominal + 2 * tolerance + frame + hop - audio.size)
+    padded = np.pad(audio, (tolerance, tail))
+    seam = frame - hop
+
+    # Only the search is sequential: each frame picks the offset whose start best continues the
+    # previous frame, so the overlap-add below never cancels out of phase.
+    positions = np.empty(n_frames, dtype=np.int64)
+    positions[0] = 0
+    previous = 0
+    for index in range(1, n_frames):
+        nominal = int(round(index * analysis_hop))
+        natural = previous + hop + tolerance
+        template = padded[natural : natural + seam]
+        region = padded[nominal : nominal + 2 * tolerance + seam]
+        offset = int(np.argmax(np.correlate(region, template, mode="valid"))) - tolerance
+        previous = nominal + offset
+        positions[index] = previous
+
+    frames = padded[(positions + tolerance)[:, None] + np.arange(frame)] * _ola_window(frame)
+    output = np.zeros((n_frames + quality.overlap - 1) * hop, dtype=np.float32)
+    for part in range(quality.overlap):
+        output[part * hop : part * hop + n_frames * hop] += frames[
+            :, part * hop : (part + 1) * hop
+        ].reshape(-1)
+    output /= _ola_norm(frame, quality.overlap, n_frames)
+    return output[:target_len]
+
+
+def _compress_by_ratio(
+    audio: np.ndarray,
+    ratio: float,
+    length: int,
+    quality: DspQuality,
+) -> np.ndarray:
+    if quality.max_ratio_denominator == 0:
+        positions = np.arange(length, dtype=np.float64) * ratio
+        return np.interp(positions, np.arange(audio.size), audio).astype(np.float32)
+    fraction = Fraction(ratio).limit_denominator(quality.max_ratio_denominator)
+    resampled = PolyphaseResampler(fraction.numerator, fraction.denominator).resample(audio)
+    if resampled.size >= length:
+        return resampled[:length]
+    return np.pad(resampled, (0, length - resampled.size))
+
+
+def _stretch_and_shift(
+    audio: np.ndarray,
+    stretch_factor: float,
+    n_steps: float,
+    sample_rate: int,
+    quality: DspQuality,
+) -> np.ndarray:
+    # Pitch shift = stretch by the pitch ratio, then resample back by the same ratio. Folding the
+    # time stretch into that single WSOLA pass keeps the whole style change to one pass.
+    audio = audio.astype(np.float32)
     if audio.size < max(1, int(sample_rate * 0.01)):
-        return audio.astype(np.float32)
-    import librosa
+        return audio
+    ratio = 2.0 ** (n_steps / 12.0)
+    length = int(round(audio.size * stretch_factor))
+    stretched = audio
+    if not math.isclose(stretch_factor * ratio, 1.0):
+        stretched = wsola_stretch(audio, 1.0 / (stretch_factor * ratio), sample_rate, quality)
+    if n_steps == 0:
+        return stretched
+    return _compress_by_ratio(stretched, ratio, length, quality)
 
-    stretched = librosa.effects.time_stretch(audio.astype(np.float32), rate=rate)
-    return stretched.astype(np.float32)
+
+def apply_time_stretch(
+    audio: np.ndarray,
+    rate: float,
+    sample_rate: int,
+    quality: Optional[str] = None,
+) -> np.ndarray:
+    if rate == 1.0:
+        return audio.astype(np.float32)
+    return _stretch_and_shift(audio, 1.0 / rate, 0.0, sample_rate, resolve_dsp_quality(quality))
 
 
-def apply_pitch_shift(audio: np.ndarray, n_steps: float, sample_rate: int) -> np.ndarray:
+def apply_pitch_shift(
+    audio: np.ndarray,
+    n_steps: float,
+    sample_rate: int,
+    quality: Optional[str] = None,
+) -> np.ndarray:
     if n_steps == 0:
         return audio.astype(np.float32)
-    import librosa
+    return _stretch_and_shift(audio, 1.0, n_steps, sample_rate, resolve_dsp_quality(quality))
 
-    shifted = librosa.effects.pitch_shift(audio.astype(np.float32), sr=sample_rate, n_steps=n_steps)
-    return shifted.astype(np.float32)
+
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int,
+    threshold_db: float = -40.0,
+    floor_db: float = -60.0,
+    frame_ms: float = 10.0,
+    pad_ms: float = 50.0,
+) -> np.ndarray:
+    # Frames quieter than threshold_db below the loudest frame (or under floor_db) count as
+    # silence. pad_ms of it is kept either side so crossfades land in silence, not speech.
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    count = -(-audio.size // frame)
+    if count == 0:
+        return audio
+    framed = np.zeros(count * frame, dtype=np.float32)
+    framed[: audio.size] = audio
+    energy = np.square(framed).reshape(count, frame).mean(axis=1)
+    threshold = max(float(energy.max()) * 10 ** (threshold_db / 10), 10 ** (floor_db / 10))
+    voiced = np.flatnonzero(energy >= threshold)
+    if not voiced.size:
+        return audio[:0]
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, int(voiced[0]) * frame - pad)
+    end = min(audio.size, (int(voiced[-1]) + 1) * frame + pad)
+    return audio[start:end]
 
 
 def apply_limiter(audio: np.ndarray, ceiling: float = 0.99) -> np.ndarray:
@@ -45,6 +211,7 @@ def apply_style_dsp(
     sample_rate: int,
     rate: Optional[str],
     emphasis: Optional[str],
+    quality: Optional[str] = None,
 ) -> np.ndarray:
     stretch_factor = 1.0
     gain_db = 0.0
@@ -65,13 +232,13 @@ def apply_style_dsp(
         pitch_steps += 1.0
 
     processed = audio.astype(np.float32)
-    if pitch_steps:
-        processed = apply_pitch_shift(processed, pitch_steps, sample_rate)
-    if stretch_factor != 1.0:
-        processed = apply_time_stretch(
+    if pitch_steps or stretch_factor != 1.0:
+        processed = _stretch_and_shift(
             processed,
-            rate=1.0 / stretch_factor,
-            sample_rate=sample_rate,
+            stretch_factor,
+            pitch_steps,
+            sample_rate,
+            resolve_dsp_quality(quality),
         )
     if gain_db:
         processed = apply_gain(processed, gain_db)
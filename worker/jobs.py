@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    status: str = "queued"
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    result: Optional[Dict[str, object]] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        # Model calls cannot be interrupted, so job functions check between stages.
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+        }
+
+
+JobFunction = Callable[[Job], Optional[Dict[str, object]]]
+JobCleanup = Callable[[Job], None]
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 1, keep_finished: int = 200) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._keep_finished = keep_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        job_id: str,
+        kind: str,
+        fn: JobFunction,
+        cleanup: Optional[JobCleanup] = None,
+    ) -> Job:
+        job = Job(job_id=job_id, kind=kind)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, cleanup)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in jobs if kind is None or job.kind == kind]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        return job
+
+    def cancel_all(self) -> None:
+        for job in self.list():
+            job.cancel_event.set()
+
+    def _run(self, job: Job, fn: JobFunction, cleanup: Optional[JobCleanup]) -> None:
+        job.started_at = _now()
+        job.status = "running"
+        status = "failed"
+        try:
+            job.raise_if_cancelled()
+            job.result = fn(job)
+            status = "completed"
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as exc:  # noqa: BLE001
+            job.error = str(exc) or exc.__class__.__name__
+        finally:
+            # Cleanup finishes before the final status is visible to pollers.
+            if status != "completed" and cleanup is not None:
+                cleanup(job)
+            job.finished_at = _now()
+            job.status = status
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]
+        for job_id in finished[: max(0, len(finished) - self._keep_finished)]:
+            del self._jobs[job_id]
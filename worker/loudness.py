@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+# ITU-R BS.1770 / EBU R128 constants.
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+BLOCK_SECONDS = 0.4
+HOP_SECONDS = 0.1
+TRUE_PEAK_OVERSAMPLE = 4
+MIN_TARGET_LUFS = -40.0
+MAX_TARGET_LUFS = -5.0
+MIN_TRUE_PEAK_DB = -9.0
+MAX_TRUE_PEAK_DB = 0.0
+
+
+@lru_cache(maxsize=16)
+def _k_weighting_sos(sample_rate: int) -> np.ndarray:
+    # Pre-filter (high shelf) and RLB high-pass, derived for any rate so 48 kHz matches the spec.
+    k = math.tan(math.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh**0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [
+        (vh + vb * k / q + k * k) / a0,
+        2 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+        1.0,
+        2 * (k * k - 1) / a0,
+        (1 - k / q + k * k) / a0,
+    ]
+    k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    high_pass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, high_pass], dtype=np.float64)
+
+
+@lru_cache(maxsize=1)
+def _true_peak_phases() -> np.ndarray:
+    from scipy.signal import firwin
+
+    # 48-tap interpolator as suggested by BS.1770-4 Annex 2, split into its four phases.
+    taps = firwin(12 * TRUE_PEAK_OVERSAMPLE, 1.0 / TRUE_PEAK_OVERSAMPLE) * TRUE_PEAK_OVERSAMPLE
+    phases = taps.reshape(-1, TRUE_PEAK_OVERSAMPLE).T[:, ::-1].astype(np.float32)
+    phases.setflags(write=False)
+    return phases
+
+
+_PEAK_CONTEXT = 6
+
+
+def _peak_envelope(audio: np.ndarray) -> np.ndarray:
+    # Per-sample max of |x| and the interpolated points around it; output is len(audio) - 12.
+    windows = np.lib.stride_tricks.sliding_window_view(audio, 2 * _PEAK_CONTEXT)
+    interpolated = np.abs(windows @ _true_peak_phases().T).max(axis=1)
+    centre = np.abs(audio[_PEAK_CONTEXT : audio.size - _PEAK_CONTEXT + 1])
+    return np.maximum(interpolated, centre)[: audio.size - 2 * _PEAK_CONTEXT]
+
+
+def _energy_to_lufs(energy: float) -> float:
+    if energy <= 0:
+        return -math.inf
+    return -0.691 + 10 * math.log10(energy)
+
+
+def gated_loudness(block_energies: np.ndarray) -> float:
+    if not block_energies.size:
+        return -math.inf
+    with np.errstate(divide="ignore"):
+        block_lufs = -0.691 + 10 * np.log10(block_energies)
+    gated = block_energies[block_lufs > ABSOLUTE_GATE_LUFS]
+    if not gated.size:
+        return -math.inf
+    relative_gate = _energy_to_lufs(float(gated.mean())) + RELATIVE_GATE_LU
+    gated = block_energies[(block_lufs > ABSOLUTE_GATE_LUFS) & (block_lufs > relative_gate)]
+    if not gated.size:
+        return -math.inf
+    return _energy_to_lufs(float(gated.mean()))
+
+
+class LoudnessMeter:
+    def __init__(self, sample_rate: int) -> None:
+        from scipy.signal import sosfilt_zi
+
+        self.sample_rate = sample_rate
+        self._sos = _k_weighting_sos(sample_rate).copy()
+        self._zi = sosfilt_zi(self._sos) * 0.0
+        self._hop = max(1, int(round(sample_rate * HOP_SECONDS)))
+        self._hops_per_block = int(round(BLOCK_SECONDS / HOP_SECONDS))
+        self._partial_sum = 0.0
+        self._partial_count = 0
+        # Only the hops that can still start a block are kept; blocks go into a growing array.
+        self._hop_tail = np.zeros(0, dtype=np.float64)
+        self._block_energies = np.empty(256, dtype=np.float64)
+        self._block_count = 0
+
+    def add(self, audio: np.ndarray) -> None:
+        from scipy.signal import sosfilt
+
+        if not audio.size:
+            return
+        weighted, self._zi = sosfilt(self._sos, audio.astype(np.float64), zi=self._zi)
+        squared = np.square(weighted)
+        need = self._hop - self._partial_count
+        if squared.size < need:
+            self._partial_sum += float(squared.sum())
+            self._partial_count += squared.size
+            return
+        first = self._partial_sum + float(squared[:need].sum())
+        rest = squared[need:]
+        full = rest.size // self._hop
+        sums = rest[: full * self._hop].reshape(full, self._hop).sum(axis=1)
+        tail = rest[full * self._hop :]
+        self._partial_sum = float(tail.sum())
+        self._partial_count = tail.size
+
+        hop_sums = np.concatenate([self._hop_tail, [first], sums])
+        if hop_sums.size >= self._hops_per_block:
+            windows = np.lib.stride_tricks.sliding_window_view(hop_sums, self._hops_per_block)
+            self._append_blocks(windows.sum(axis=1) / (self._hop * self._hops_per_block))
+        self._hop_tail = hop_sums[max(0, hop_sums.size - self._hops_per_block + 1) :].copy()
+
+    def _append_blocks(self, energies: np.ndarray) -> None:
+        needed = self._block_count + energies.size
+        if needed > self._block_energies.size:
+            grown = np.empty(max(needed, 2 * self._block_energies.size), dtype=np.float64)
+            grown[: self._block_count] = self._block_energies[: self._block_count]
+            self._block_energies = grown
+        self._block_energies[self._block_count : needed] = energies
+        self._block_count = needed
+
+    @property
+    def integrated(self) -> float:
+        return gated_loudness(self._block_energies[: self._block_count])
+
+
+def integrated_loudness(audio: np.ndarray, sample_rate: int) -> float:
+    meter = LoudnessMeter(sample_rate)
+    meter.add(np.asarray(audio, dtype=np.float32).reshape(-1))
+    return meter.integrated
+
+
+def true_peak_db(audio: np.ndarray) -> float:
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    padded = np.pad(audio, _PEAK_CONTEXT)
+    peak = float(_peak_envelope(padded).max()) if audio.size else 0.0
+    return 20 * math.log10(peak) if peak > 0 else -math.inf
+
+
+class TruePeakLimiter:
+    def __init__(self, sample_rate: int, ceiling_db: float = -1.0, window_ms: float = 2.5) -> None:
+        self.ceiling = 10 ** (ceiling_db / 20)
+        self._window = max(1, int(sample_rate * window_ms / 1000))
+        # Each output sample needs 2 * window of gain context, plus the interpolator's reach.
+        self.latency = 2 * self._window + _PEAK_CONTEXT
+        self._buffer = np.zeros(self.latency, dtype=np.float32)
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        from scipy.ndimage import minimum_filter1d
+
+        buffer = np.concatenate([self._buffer, np.asarray(audio, dtype=np.float32).reshape(-1)])
+        if buffer.size < 2 * self.latency + 1:
+            self._buffer = buffer
+            return np.zeros(0, dtype=np.float32)
+        envelope = _peak_envelope(buffer)
+        required = np.minimum(1.0, self.ceiling / np.maximum(envelope, 1e-9))
+        width = 2 * self._window + 1
+        held = minimum_filter1d(required, width, mode="nearest")[
+            self._window : required.size - self._window
+        ]
+        sums = np.concatenate([[0.0], np.cumsum(held, dtype=np.float64)])
+        smooth = ((sums[width:] - sums[:-width]) / width).astype(np.float32)
+        output = buffer[self.latency : buffer.size - self.latency] * smooth
+        self._buffer = buffer[buffer.size - 2 * self.latency :]
+        return output
+
+    def flush(self) -> np.ndarray:
+        output = self.process(np.zeros(self.latency, dtype=np.float32))
+        self._buffer = np.zeros(self.latency, dtype=np.float32)
+        return output
+
+
+class LoudnessNormalizer:
+    def __init__(
+        self,
+        sample_rate: int,
+        target_lufs: float = -16.0,
+        true_peak_db: Optional[float] = -1.0,
+        lookahead_seconds: float = 3.0,
+        max_gain_db: float = 24.0,
+    ) -> None:
+        if not MIN_TARGET_LUFS <= target_lufs <= MAX_TARGET_LUFS:
+            raise ValueError(
+                f"Loudness target must be between {MIN_TARGET_LUFS} and {MAX_TARGET_LUFS} LUFS"
+            )
+        if true_peak_db is not None and not MIN_TRUE_PEAK_DB <= true_peak_db <= MAX_TRUE_PEAK_DB:
+            raise ValueError(
+                f"True peak ceiling must be between {MIN_TRUE_PEAK_DB} and {MAX_TRUE_PEAK_DB} dBTP"
+            )
+        self.sample_rate = sample_rate
+        self.target_lufs = target_lufs
+        self.max_gain_db = max_gain_db
+        self.meter = LoudnessMeter(sample_rate)
+        self.limiter: Optional[TruePeakLimiter] = None
+        if true_peak_db is not None:
+            self.limiter = TruePeakLimiter(sample_rate, true_peak_db)
+        self._lookahead = max(0, int(sample_rate * lookahead_seconds))
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._gain: Optional[float] = None
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        self.meter.add(audio)
+        pending = np.concatenate([self._pending, audio]) if self._pending.size else audio
+        ready = pending.size - self._lookahead
+        if ready <= 0:
+            self._pending = pending
+            return np.zeros(0, dtype=np.float32)
+        self._pending = pending[ready:]
+        return self._finish(self._apply_gain(pending[:ready]))
+
+    def flush(self) -> np.ndarray:
+        output = self._apply_gain(self._pending)
+        self._pending = np.zeros(0, dtype=np.float32)
+        if self.limiter is None:
+            return output
+        tail = self.limiter.process(output)
+        return np.concatenate([tail, self.limiter.flush()])
+
+    def _target_gain(self) -> float:
+        loudness = self.meter.integrated
+        if math.isinf(loudness):
+            return 1.0
+        gain_db = min(self.max_gain_db, self.target_lufs - loudness)
+        return 10 ** (gain_db / 20)
+
+    def _apply_gain(self, audio: np.ndarray) -> np.ndarray:
+        if not audio.size:
+            return audio
+        target = self._target_gain()
+        start = target if self._gain is None else self._gain
+        self._gain = target
+        if start == target:
+            return audio * np.float32(target)
+        # Ramp between successive estimates so gain updates never step.
+        ramp = np.linspace(start, target, audio.size, endpoint=False, dtype=np.float32)
+        return audio * ramp
+
+    def _finish(self, audio: np.ndarray) -> np.ndarray:
+        return audio if self.limiter is None else self.limiter.process(audio)
+
+
+def normalize_loudness(
+    audio: np.ndarray,
+    sample_rate: int,
+    target_lufs: float = -16.0,
+    true_peak_db: Optional[float] = -1.0,
+) -> np.ndarray:
+    duration = len(audio) / sample_rate
+    normalizer = LoudnessNormalizer(sample_rate, target_lufs, true_peak_db, duration)
+    head = normalizer.process(audio)
+    return np.concatenate([head, normalizer.flush()])
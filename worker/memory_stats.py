@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import ctypes
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+SMAPS_ROLLUP = Path("/proc/self/smaps_rollup")
+
+
+def _linux_memory() -> Dict[str, Optional[int]]:
+    fields: Dict[str, int] = {}
+    for line in SMAPS_ROLLUP.read_text(encoding="ascii").splitlines():
+        name, _, rest = line.partition(":")
+        parts = rest.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            fields[name] = int(parts[0]) * 1024
+    rss = fields.get("Rss", 0)
+    # Anonymous memory (heap, copy-on-write copies) is what this process alone costs.
+    # File-backed pages such as mmapped weights can be shared even while only one process
+    # maps them.
+    private = fields.get("Anonymous", 0)
+    return {
+        "rss_bytes": rss,
+        # Proportional set size splits shared pages between the processes mapping them, so
+        # summing it over all workers gives their real combined footprint.
+        "pss_bytes": fields.get("Pss"),
+        "private_bytes": private,
+        "shared_bytes": rss - private,
+    }
+
+
+def _windows_memory() -> Dict[str, Optional[int]]:
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+            ("PrivateUsage", ctypes.c_size_t),
+        ]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(Counters)
+    kernel32 = ctypes.windll.kernel32
+    process = kernel32.GetCurrentProcess()
+    if not kernel32.K32GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        raise OSError("GetProcessMemoryInfo failed")
+    return {
+        "rss_bytes": counters.WorkingSetSize,
+        "pss_bytes": None,
+        "private_bytes": counters.PrivateUsage,
+        "shared_bytes": max(0, counters.WorkingSetSize - counters.PrivateUsage),
+    }
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    try:
+        if os.name == "nt":
+            return _windows_memory()
+        if SMAPS_ROLLUP.exists():
+            return _linux_memory()
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"rss_bytes": None, "pss_bytes": None, "private_bytes": None, "shared_bytes": None}
@@ -0,0 +1,483 @@
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger("openvoice")
+
+CACHE_INFO_NAME = "load-cache.json"
+QUANTIZED_NAME = "linears.pt"
+CACHE_FORMAT = 1
+WEIGHTS_SUFFIX = ".safetensors"
+SKIPPED_SUFFIXES = (".part",)
+SKIPPED_NAMES = (".openvoicelab-manifest.json",)
+
+SAFETENSORS_DTYPES: Dict[str, torch.dtype] = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+DTYPE_CODES = {dtype: code for code, dtype in SAFETENSORS_DTYPES.items()}
+# Frame counts decoded during warm-up: one full chunked_decode window plus a short tail.
+WARMUP_FRAMES = (325, 40)
+
+
+@dataclass
+class LoadTimings:
+    device: str
+    dtype: str
+    cache: str = "off"
+    prepare_seconds: float = 0.0
+    load_seconds: float = 0.0
+    map_seconds: float = 0.0
+    mapped_bytes: int = 0
+    quantized: Optional[str] = None
+    quantize_seconds: float = 0.0
+    compiled: Optional[str] = None
+    warmup_seconds: float = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        return (
+            self.prepare_seconds
+            + self.load_seconds
+            + self.map_seconds
+            + self.quantize_seconds
+            + self.warmup_seconds
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "device": self.device,
+            "dtype": self.dtype,
+            "cache": self.cache,
+            "prepare_seconds": round(self.prepare_seconds, 3),
+            "load_seconds": round(self.load_seconds, 3),
+            "map_seconds": round(self.map_seconds, 3),
+            "total_seconds": round(self.total_seconds, 3),
+            "mapped_bytes": self.mapped_bytes,
+            "quantized": self.quantized,
+            "quantize_seconds": round(self.quantize_seconds, 3),
+            "compiled": self.compiled,
+            "warmup_seconds": round(self.warmup_seconds, 3),
+        }
+
+
+def _raw_header(path: Path) -> Tuple[Dict[str, dict], int]:
+    with path.open("rb") as handle:
+        (length,) = struct.unpack("<Q", handle.read(8))
+        return json.loads(handle.read(length)), 8 + length
+
+
+def read_safetensors_header(path: Path) -> Tuple[Dict[str, dict], int]:
+    # Returns (tensor entries, offset of the data section).
+    header, data_start = _raw_header(path)
+    header.pop("__metadata__", None)
+    return header, data_start
+
+
+def mmap_safetensors(path: Path) -> Dict[str, torch.Tensor]:
+    # Tensors are views of a copy-on-write mapping: nothing is read until a page is touched,
+    # and untouched pages stay shared with the page cache.
+    header, data_start = read_safetensors_header(path)
+    tensors: Dict[str, torch.Tensor] = {}
+    if not header:
+        return tensors
+    with path.open("rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_COPY)
+    for name, entry in header.items():
+        dtype = SAFETENSORS_DTYPES.get(entry["dtype"])
+        if dtype is None:
+            raise ValueError(f"{path.name}: unsupported dtype {entry['dtype']} for {name}")
+        start, end = entry["data_offsets"]
+        count = (end - start) // _itemsize(dtype)
+        if count == 0:
+            tensors[name] = torch.empty(entry["shape"], dtype=dtype)
+            continue
+        flat = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + start)
+        tensors[name] = flat.view(entry["shape"])
+    return tensors
+
+
+def _itemsize(dtype: torch.dtype) -> int:
+    return torch.empty((), dtype=dtype).element_size()
+
+
+def _should_cast(code: str, dtype: torch.dtype) -> bool:
+    # Only widening casts are cached. Narrowing ones are left to from_pretrained, which knows
+    # which modules must stay in float32.
+    stored = SAFETENSORS_DTYPES.get(code)
+    return (
+        stored is not None
+        and stored.is_floating_point
+        and stored != dtype
+        and _itemsize(dtype) > _itemsize(stored)
+    )
+
+
+def needs_cast(path: Path, dtype: torch.dtype) -> bool:
+    header, _ = read_safetensors_header(path)
+    return any(_should_cast(entry["dtype"], dtype) for entry in header.values())
+
+
+def write_cast_safetensors(source: Path, target: Path, dtype: torch.dtype) -> None:
+    # Streams one tensor at a time, so a cast never holds more than one tensor in memory.
+    header, _ = _raw_header(source)
+    metadata = header.pop("__metadata__", None)
+    tensors = mmap_safetensors(source)
+    names = sorted(header, key=lambda name: header[name]["data_offsets"][0])
+
+    entries: Dict[str, object] = {}
+    if metadata:
+        entries["__metadata__"] = metadata
+    offset = 0
+    for name in names:
+        entry = header[name]
+        code = DTYPE_CODES[dtype] if _should_cast(entry["dtype"], dtype) else entry["dtype"]
+        size = tensors[name].numel() * _itemsize(SAFETENSORS_DTYPES[code])
+        entries[name] = {
+            "dtype": code,
+            "shape": entry["shape"],
+            "data_offsets": [offset, offset + size],
+        }
+        offset += size
+    encoded = json.dumps(entries, separators=(",", ":")).encode("utf-8")
+    encoded += b" " * (-len(encoded) % 8)
+
+    with target.open("wb") as out:
+        out.write(struct.pack("<Q", len(encoded)))
+        out.write(encoded)
+        for name in names:
+            tensor = tensors[name]
+            if _should_cast(header[name]["dtype"], dtype):
+                tensor = tensor.to(dtype)
+            if tensor.numel():
+                out.write(tensor.contiguous().reshape(-1).view(torch.uint8).numpy().tobytes())
+
+
+def _source_files(local_dir: Path) -> List[Path]:
+    return sorted(
+        path
+        for path in local_dir.rglob("*")
+        if path.is_file()
+        and path.name not in SKIPPED_NAMES
+        and not path.name.endswith(SKIPPED_SUFFIXES)
+    )
+
+
+def _fingerprint(local_dir: Path, files: List[Path]) -> Dict[str, List[int]]:
+    fingerprint = {}
+    for path in files:
+        stat = path.stat()
+        fingerprint[path.relative_to(local_dir).as_posix()] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+# Keeps dtype-cast copies of model folders under root/<model dir>/<dtype>.
+class WeightCache:
+    def __init__(self, root: Path, enabled: bool = True) -> None:
+        self.root = root
+        self.enabled = enabled
+        self._locks_guard = threading.Lock()
+        self._locks: Dict[Path, threading.Lock] = {}
+
+    @contextmanager
+    def _lock(self, path: Path) -> Iterator[None]:
+        # The file lock keeps worker processes from building the same cache at once; the
+        # late ones wait and then find a hit.
+        with self._locks_guard:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock, _file_lock(path.with_name(f"{path.name}.lock")):
+            yield
+
+    def prepare(self, local_dir: Path, dtype: torch.dtype) -> Tuple[Path, str]:
+        # Returns the folder to load from and "off", "skipped", "hit" or "built".
+        if not self.enabled:
+            return local_dir, "off"
+        files = _source_files(local_dir)
+        weights = [path for path in files if path.suffix == WEIGHTS_SUFFIX]
+        cast = {path for path in weights if needs_cast(path, dtype)}
+        if not cast:
+            return local_dir, "skipped"
+
+        target = self.root / local_dir.name / str(dtype).replace("torch.", "")
+        info = {
+            "format": CACHE_FORMAT,
+            "dtype": str(dtype),
+            "files": _fingerprint(local_dir, files),
+        }
+        with self._lock(target):
+            if _read_info(target) == info:
+                return target, "hit"
+            # Build next to the final folder and swap it in, so a crash never leaves a
+            # half-written cache that looks valid.
+            staging = target.with_name(f"{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+            try:
+                for path in files:
+                    out = staging / path.relative_to(local_dir)
+                    out.parent.mkdir(parents=True, exist_ok=True)
+                    if path in cast:
+                        write_cast_safetensors(path, out, dtype)
+                    else:
+                        _link_or_copy(path, out)
+                _swap_in(staging, target, info)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        return target, "built"
+
+    def quantize(self, local_dir: Path, module: torch.nn.Module) -> str:
+        # Replaces the module's linear layers with dynamic int8 ones, reusing the packed
+        # weights saved by an earlier run when the source files have not changed.
+        # Returns "hit", "built" or "off".
+        target = self.root / local_dir.name / "int8"
+        info = {
+            "format": CACHE_FORMAT,
+            "torch": torch.__version__,
+            "engine": torch.backends.quantized.engine,
+            "files": _fingerprint(local_dir, _source_files(local_dir)),
+        }
+        with self._lock(target):
+            if self.enabled and _read_info(target) == info:
+                try:
+                    saved = torch.load(target / QUANTIZED_NAME, weights_only=True)
+                    _restore_dynamic_linears(module, saved)
+                    return "hit"
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Ignoring quantized cache for %s: %s", local_dir, exc)
+            quantized = quantize_linears(module)
+            if not self.enabled:
+                return "off"
+            staging = target.with_name(f"{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+            try:
+                staging.mkdir(parents=True)
+                torch.save(
+                    {name: module.get_submodule(name).state_dict() for name in quantized},
+                    staging / QUANTIZED_NAME,
+                )
+                _swap_in(staging, target, info)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        return "built"
+
+    def clear(self, local_dir: Path) -> None:
+        shutil.rmtree(self.root / local_dir.name, ignore_errors=True)
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                handle.seek(0)
+                try:
+                    # LK_LOCK gives up after ten one-second retries; keep waiting.
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _swap_in(staging: Path, target: Path, info: Dict[str, object]) -> None:
+    (staging / CACHE_INFO_NAME).write_text(json.dumps(info), encoding="utf-8")
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(staging, target)
+
+
+def _read_info(path: Path) -> Optional[Dict[str, object]]:
+    try:
+        return json.loads((path / CACHE_INFO_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def map_weights(module: torch.nn.Module, weights_dir: Path) -> int:
+    # Points CPU parameters and buffers at mmapped checkpoint tensors, dropping the private
+    # copies from_pretrained made. Returns the number of bytes now served from the mapping.
+    targets: Dict[str, torch.Tensor] = dict(module.named_parameters())
+    targets.update(module.named_buffers())
+    mapped = 0
+    for path in sorted(weights_dir.glob(f"*{WEIGHTS_SUFFIX}")):
+        for name, tensor in mmap_safetensors(path).items():
+            current = targets.get(name)
+            if (
+                current is None
+                or current.device.type != "cpu"
+                or current.dtype != tensor.dtype
+                or current.shape != tensor.shape
+                or not torch.equal(current, tensor)
+            ):
+                continue
+            current.data = tensor
+            mapped += tensor.numel() * tensor.element_size()
+    return mapped
+
+
+def quantize_linears(module: torch.nn.Module) -> List[str]:
+    # Per-channel scales keep the int8 error per output row, which matters for the small
+    # projection layers. Returns the names of the replaced layers.
+    from torch.ao.quantization import per_channel_dynamic_qconfig, quantize_dynamic
+
+    names = [name for name, child in module.named_modules() if type(child) is torch.nn.Linear]
+    quantize_dynamic(
+        module,
+        {torch.nn.Linear: per_channel_dynamic_qconfig},
+        dtype=torch.qint8,
+        inplace=True,
+    )
+    return names
+
+
+def _restore_dynamic_linears(module: torch.nn.Module, saved: Dict[str, Dict[str, object]]) -> None:
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+
+    # Build every replacement before swapping any in, so a stale cache cannot leave the
+    # model half quantized.
+    replacements = []
+    for name, state in saved.items():
+        parent_name, _, attribute = name.rpartition(".")
+        parent = module.get_submodule(parent_name)
+        linear = getattr(parent, attribute)
+        if type(linear) is not torch.nn.Linear:
+            raise ValueError(f"{name} is not a linear layer")
+        replacement = DynamicLinear(
+            linear.in_features,
+            linear.out_features,
+            bias_=linear.bias is not None,
+            dtype=torch.qint8,
+        )
+        replacement.load_state_dict(state)
+        replacements.append((parent, attribute, replacement))
+    for parent, attribute, replacement in replacements:
+        setattr(parent, attribute, replacement)
+
+
+def configure_compile_cache(path: Path) -> None:
+    # Inductor keeps compiled graphs and autotuning results here, so a restarted worker
+    # reuses them instead of compiling again. Explicit environment settings win.
+    path.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(path))
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    try:
+        import torch._inductor.config as inductor_config
+    except ImportError:
+        return
+    inductor_config.fx_graph_cache = os.environ["TORCHINDUCTOR_FX_GRAPH_CACHE"] == "1"
+
+
+def compile_speech_decoder(model, device: str) -> str:
+    # Compiles the codes-to-waveform decoder and runs it once so the first request does not
+    # pay for compilation. Returns "on", "failed" or "unsupported"; on failure the decoder
+    # keeps running eagerly.
+    tokenizer = getattr(model.model, "speech_tokenizer", None)
+    decoder = getattr(getattr(tokenizer, "model", None), "decoder", None)
+    quantizers = getattr(getattr(decoder, "config", None), "num_quantizers", None)
+    if decoder is None or quantizers is None:
+        return "unsupported"
+    eager = decoder.forward
+    try:
+        compiled = torch.compile(eager, dynamic=True)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("torch.compile unavailable, decoder stays eager: %s", exc)
+        return "unsupported"
+
+    def forward(codes):
+        try:
+            return compiled(codes)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Compiled decoder failed, switching to eager mode: %s", exc)
+            decoder.forward = eager
+            return eager(codes)
+
+    decoder.forward = forward
+    try:
+        with torch.inference_mode():
+            for frames in WARMUP_FRAMES:
+                decoder(torch.zeros((1, quantizers, frames), dtype=torch.long, device=device))
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Decoder warm-up failed: %s", exc)
+        decoder.forward = eager
+    return "on" if decoder.forward is forward else "failed"
+
+
+def load_model(
+    local_dir: Path,
+    device: str,
+    dtype: torch.dtype,
+    cache: WeightCache,
+    quantize: bool = False,
+):
+    from qwen_tts import Qwen3TTSModel
+
+    timings = LoadTimings(device=device, dtype=str(dtype).replace("torch.", ""))
+    start = time.perf_counter()
+    try:
+        load_dir, timings.cache = cache.prepare(local_dir, dtype)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Weight cache for %s unavailable, loading originals: %s", local_dir, exc)
+        load_dir, timings.cache = local_dir, "error"
+    timings.prepare_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = Qwen3TTSModel.from_pretrained(str(load_dir), device_map=device, torch_dtype=dtype)
+    timings.load_seconds = time.perf_counter() - start
+
+    if device == "cpu":
+        start = time.perf_counter()
+        try:
+            timings.mapped_bytes = map_weights(model.model, load_dir)
+            tokenizer = getattr(model.model, "speech_tokenizer", None)
+            if tokenizer is not None and (load_dir / "speech_tokenizer").is_dir():
+                timings.mapped_bytes += map_weights(tokenizer.model, load_dir / "speech_tokenizer")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Could not map weights for %s: %s", local_dir, exc)
+        timings.map_seconds = time.perf_counter() - start
+
+    if quantize:
+        start = time.perf_counter()
+        timings.quantized = cache.quantize(local_dir, model.model)
+        timings.quantize_seconds = time.perf_counter() - start
+    return model, timings
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import os
 import threading
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
 
-from huggingface_hub import HfApi, snapshot_download
+from download_manager import DEFAULT_DOWNLOAD_WORKERS, DownloadManager, FileProgress, RemoteFile
+from huggingface_hub import HfApi, constants
+from storage import read_json, write_json
 
 MODEL_SPECS = {
     "custom_voice": {
@@ -20,6 +25,8 @@ MODEL_SPECS = {
         "1.7b": "Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign",
     },
 }
+MANIFEST_NAME = ".openvoicelab-manifest.json"
+REMOTE_TIMEOUT_SECONDS = 10.0
 
 
 @dataclass
@@ -30,15 +37,44 @@ class ModelDownloadState:
     downloaded_bytes: int = 0
     status: str = "pending"
     error: Optional[str] = None
+    files: Dict[str, FileProgress] = field(default_factory=dict)
+    started_at: Optional[float] = None
+    transferred_bytes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_bytes(self, count: int, resumed: bool) -> None:
+        with self._lock:
+            self.downloaded_bytes += count
+            if not resumed:
+                self.transferred_bytes += count
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.started_at is None or self.status != "downloading":
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.transferred_bytes / elapsed if elapsed > 0 else 0.0
 
 
 class ModelManager:
-    def __init__(self, root: Path) -> None:
+    def __init__(self, root: Path, download_workers: int = DEFAULT_DOWNLOAD_WORKERS) -> None:
         self.root = root
         self.cache: Dict[str, Path] = {}
         self.downloads: Dict[str, ModelDownloadState] = {}
-        self._download_lock = threading.Lock()
+        self._locks_guard = threading.Lock()
+        self._model_locks: Dict[str, threading.Lock] = {}
         self._hf_api = HfApi()
+        self.endpoint = constants.ENDPOINT
+        token = os.getenv("HF_TOKEN")
+        self.downloader = DownloadManager(
+            download_workers,
+            headers={"Authorization": f"Bearer {token}"} if token else None,
+        )
+        self._sizes_path = root / "model_sizes.json"
+        self._sizes_lock = threading.Lock()
+        self._total_bytes: Dict[str, int] = {
+            model_id: int(size) for model_id, size in read_json(self._sizes_path).items()
+        }
 
     def resolve_model_id(self, model_kind: str, size: str) -> str:
         normalized = size.lower().replace(" ", "")
@@ -58,13 +94,87 @@ class ModelManager:
     def _local_dir_for(self, model_id: str) -> Path:
         return self.root / model_id.replace("/", "_")
 
+    def _remember_total_bytes(self, model_id: str, total: int) -> None:
+        with self._sizes_lock:
+            if self._total_bytes.get(model_id) == total:
+                return
+            self._total_bytes[model_id] = total
+            write_json(self._sizes_path, dict(self._total_bytes))
+
+    def _model_lock(self, model_id: str) -> threading.Lock:
+        # Per-model locks: creating one model's state never waits on another's.
+        with self._locks_guard:
+            return self._model_locks.setdefault(model_id, threading.Lock())
+
+    def get_remote_files(self, model_id: str) -> List[RemoteFile]:
+        info = self._hf_api.model_info(
+            model_id,
+            files_metadata=True,
+            timeout=REMOTE_TIMEOUT_SECONDS,
+        )
+        # Pin the listed revision so every file comes from the same commit.
+        revision = getattr(info, "sha", None) or "main"
+        files = [
+            RemoteFile(
+                name=sibling.rfilename,
+                url=f"{self.endpoint}/{model_id}/resolve/{revision}/{quote(sibling.rfilename)}",
+                size=sibling.size or 0,
+                sha256=getattr(sibling.lfs, "sha256", None) if sibling.lfs else None,
+            )
+            for sibling in info.siblings
+        ]
+        self._remember_total_bytes(model_id, sum(remote.size for remote in files))
+        return files
+
+    def get_file_sizes(self, model_id: str) -> Dict[str, int]:
+        return {remote.name: remote.size for remote in self.get_remote_files(model_id)}
+
     def get_total_bytes(self, model_id: str) -> int:
-        info = self._hf_api.model_info(model_id)
-        total = 0
-        for sibling in info.siblings:
-            size = sibling.size or 0
-            total += size
-        return total
+        manifest = self.read_manifest(model_id)
+        if manifest is not None:
+            return sum(entry["size"] for entry in manifest["files"].values())
+        # Sizes are fetched once and persisted; later calls never touch the network.
+        if model_id not in self._total_bytes:
+            self.get_file_sizes(model_id)
+        return self._total_bytes[model_id]
+
+    def refresh_remote_metadata(self) -> Dict[str, object]:
+        # Opt-in, run off the request path: re-reads repo sizes for every known model.
+        refreshed: Dict[str, object] = {}
+        for entry in self.list_required_models():
+            model_id = entry["model_id"]
+            try:
+                total = sum(self.get_file_sizes(model_id).values())
+            except Exception as exc:  # noqa: BLE001
+                refreshed[model_id] = {"ok": False, "error": str(exc)}
+                continue
+            refreshed[model_id] = {"ok": True, "total_bytes": total}
+            state = self.downloads.get(model_id)
+            if state is not None and state.status != "completed":
+                state.total_bytes = total
+        return refreshed
+
+    def _manifest_path(self, model_id: str) -> Path:
+        return self._local_dir_for(model_id) / MANIFEST_NAME
+
+    def read_manifest(self, model_id: str) -> Optional[Dict[str, object]]:
+        path = self._manifest_path(model_id)
+        if not path.exists():
+            return None
+        return read_json(path)
+
+    def _write_manifest(self, model_id: str, files: Dict[str, Dict[str, object]]) -> None:
+        write_json(self._manifest_path(model_id), {"model_id": model_id, "files": files})
+
+    def _local_progress(self, manifest: Dict[str, object], local_dir: Path) -> Tuple[int, int]:
+        # Stats only the files the manifest lists; returns (total, present) bytes.
+        total = present = 0
+        for filename, entry in manifest["files"].items():
+            total += entry["size"]
+            path = local_dir / filename
+            if path.is_file() and path.stat().st_size == entry["size"]:
+                present += entry["size"]
+        return total, present
 
     def get_downloaded_bytes(self, model_id: str) -> int:
         local_dir = self._local_dir_for(model_id)
@@ -80,36 +190,51 @@ class ModelManager:
         local_dir = self._local_dir_for(model_id)
         if not local_dir.exists():
             return False
+        manifest = self.read_manifest(model_id)
+        if manifest is not None:
+            total, present = self._local_progress(manifest, local_dir)
+            return present == total
         for suffix in ("*.safetensors", "*.bin"):
             if any(local_dir.rglob(suffix)):
                 return True
         return (local_dir / "config.json").exists()
 
     def download(self, model_id: str) -> ModelDownloadState:
-        with self._download_lock:
-            if model_id in self.downloads and self.downloads[model_id].status in {
-                "downloading",
-                "completed",
-            }:
-                return self.downloads[model_id]
-            local_dir = self._local_dir_for(model_id)
-            total_bytes = self.get_total_bytes(model_id)
-            state = ModelDownloadState(
-                model_id=model_id,
-                local_dir=local_dir,
-                total_bytes=total_bytes,
-            )
-            self.downloads[model_id] = state
-        state.status = "downloading"
+        with self._model_lock(model_id):
+            state = self.downloads.get(model_id)
+            if state is not None and state.status in {"downloading", "completed"}:
+                return state
+            if state is None:
+                state = ModelDownloadState(
+                    model_id=model_id,
+                    local_dir=self._local_dir_for(model_id),
+                    total_bytes=self._total_bytes.get(model_id, 0),
+                )
+                self.downloads[model_id] = state
+            # Reuse the pending state so event streams opened before the download see it.
+            state.status = "downloading"
+            state.error = None
+            state.downloaded_bytes = state.transferred_bytes = 0
         try:
-            path = snapshot_download(
-                repo_id=model_id,
-                local_dir=str(local_dir),
-                resume_download=True,
-                local_dir_use_symlinks=False,
+            remote_files = self.get_remote_files(model_id)
+            state.total_bytes = sum(remote.size for remote in remote_files)
+            state.files = {
+                remote.name: FileProgress(remote.name, remote.size) for remote in remote_files
+            }
+            state.started_at = time.monotonic()
+            # Progress is counted as blocks land, so pollers never walk the model directory.
+            digests = self.downloader.download(
+                remote_files,
+                state.local_dir,
+                state.files,
+                state.add_bytes,
             )
-            self.cache[model_id] = Path(path)
-            state.downloaded_bytes = self.get_downloaded_bytes(model_id)
+            files = {
+                remote.name: {"size": remote.size, "sha256": digests[remote.name]}
+                for remote in sorted(remote_files, key=lambda remote: remote.name)
+            }
+            self._write_manifest(model_id, files)
+            self.cache[model_id] = state.local_dir
             state.status = "completed"
         except Exception as exc:  # noqa: BLE001
             state.status = "error"
@@ -117,24 +242,36 @@ class ModelManager:
         return state
 
     def ensure_download_state(self, model_id: str) -> ModelDownloadState:
-        if model_id in self.downloads:
-            return self.downloads[model_id]
-        local_dir = self._local_dir_for(model_id)
-        total_bytes = self.get_total_bytes(model_id)
-        state = ModelDownloadState(
-            model_id=model_id,
-            local_dir=local_dir,
-            total_bytes=total_bytes,
-        )
-        state.downloaded_bytes = self.get_downloaded_bytes(model_id)
-        if self.is_downloaded(model_id):
-            state.status = "completed"
-        self.downloads[model_id] = state
-        return state
+        with self._model_lock(model_id):
+            if model_id in self.downloads:
+                return self.downloads[model_id]
+            local_dir = self._local_dir_for(model_id)
+            state = ModelDownloadState(
+                model_id=model_id,
+                local_dir=local_dir,
+                total_bytes=self._total_bytes.get(model_id, 0),
+            )
+            manifest = self.read_manifest(model_id) if local_dir.exists() else None
+            if manifest is not None:
+                state.total_bytes, state.downloaded_bytes = self._local_progress(
+                    manifest, local_dir
+                )
+                if state.downloaded_bytes == state.total_bytes:
+                    state.status = "completed"
+                self.downloads[model_id] = state
+                return state
+            # Installs without a manifest: one directory walk when the state is first created.
+            state.downloaded_bytes = self.get_downloaded_bytes(model_id)
+            if self.is_downloaded(model_id):
+                state.status = "completed"
+                # Shown as the size, but not remembered: without a manifest the folder may be
+                # a partial download, and only hub metadata or a manifest is authoritative.
+                state.total_bytes = state.total_bytes or state.downloaded_bytes
+            self.downloads[model_id] = state
+            return state
 
     def update_progress(self, model_id: str) -> None:
         state = self.ensure_download_state(model_id)
-        state.downloaded_bytes = self.get_downloaded_bytes(model_id)
         if (
             state.status == "downloading"
             and state.total_bytes
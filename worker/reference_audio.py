@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from audio_utils import PolyphaseResampler
+from dsp_utils import trim_silence
+
+# Clone prompts only use the start of the clip, so longer uploads are truncated while decoding.
+MAX_REFERENCE_SECONDS = 30.0
+MAX_REFERENCE_BYTES = 64 * 1024 * 1024
+_PIPE_CHUNK_BYTES = 64 * 1024
+_SOUNDFILE_SUFFIXES = {".wav", ".flac"}
+# MP4-family files often keep their index (moov atom) at the end, which ffmpeg can only reach
+# by seeking, so these are decoded from a file rather than a pipe.
+_SEEKABLE_SUFFIXES = {".m4a", ".m4b", ".mp4", ".mov", ".3gp"}
+
+
+class ReferenceAudioTooLarge(ValueError):
+    pass
+
+
+def _read_with_soundfile(file: BinaryIO, max_seconds: float) -> Tuple[np.ndarray, int]:
+    try:
+        with sf.SoundFile(file) as source:
+            limit = int(source.samplerate * max_seconds)
+            audio = source.read(frames=limit, dtype="float32", always_2d=True)
+            return audio.mean(axis=1, dtype=np.float32), source.samplerate
+    except RuntimeError as exc:
+        raise ValueError("Could not decode audio") from exc
+
+
+def _feed_pipe(
+    file: BinaryIO,
+    process: subprocess.Popen,
+    max_bytes: int,
+    too_large: threading.Event,
+) -> None:
+    sent = 0
+    try:
+        while True:
+            chunk = file.read(_PIPE_CHUNK_BYTES)
+            if not chunk:
+                break
+            sent += len(chunk)
+            if sent > max_bytes:
+                too_large.set()
+                process.kill()
+                break
+            process.stdin.write(chunk)
+    except OSError:
+        # ffmpeg closes stdin once -t is reached; the rest of the upload is not needed.
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+
+def _too_large(max_bytes: int) -> ReferenceAudioTooLarge:
+    return ReferenceAudioTooLarge(f"Reference audio exceeds {max_bytes // (1024 * 1024)} MB")
+
+
+def _ffmpeg_command(source: str, sample_rate: int, max_seconds: float) -> List[str]:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise ValueError("Non-wav input requires ffmpeg installed")
+    return [
+        ffmpeg,
+        "-hide_banner",
+        "-i",
+        source,
+        "-t",
+        f"{max_seconds:g}",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+
+
+def _read_pcm(
+    process: subprocess.Popen, sample_rate: int, max_seconds: float
+) -> Tuple[bytes, bool]:
+    limit = int(sample_rate * max_seconds) * 4
+    pcm = process.stdout.read(limit)
+    truncated = len(pcm) >= limit
+    if truncated:
+        process.kill()
+    process.stdout.close()
+    return pcm, truncated
+
+
+def _pcm_to_audio(pcm: bytes, returncode: int, truncated: bool) -> np.ndarray:
+    usable = len(pcm) - len(pcm) % 4
+    if (returncode != 0 and not truncated) or usable == 0:
+        raise ValueError("ffmpeg failed to decode audio")
+    return np.frombuffer(pcm, dtype="<f4", count=usable // 4).astype(np.float32)
+
+
+def _decode_with_ffmpeg(
+    file: BinaryIO,
+    sample_rate: int,
+    max_seconds: float,
+    max_bytes: int,
+) -> np.ndarray:
+    process = subprocess.Popen(
+        _ffmpeg_command("pipe:0", sample_rate, max_seconds),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    too_large = threading.Event()
+    feeder = threading.Thread(
+        target=_feed_pipe,
+        args=(file, process, max_bytes, too_large),
+        daemon=True,
+    )
+    feeder.start()
+    pcm, truncated = _read_pcm(process, sample_rate, max_seconds)
+    returncode = process.wait()
+    feeder.join()
+    if too_large.is_set():
+        raise _too_large(max_bytes)
+    return _pcm_to_audio(pcm, returncode, truncated)
+
+
+def _decode_file_with_ffmpeg(
+    file: BinaryIO,
+    suffix: str,
+    sample_rate: int,
+    max_seconds: float,
+    max_bytes: int,
+) -> np.ndarray:
+    # A named copy lets ffmpeg seek; it is closed before decoding so Windows can reopen it.
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as copy:
+        path = copy.name
+        try:
+            copied = 0
+            while True:
+                chunk = file.read(_PIPE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                copied += len(chunk)
+                if copied > max_bytes:
+                    raise _too_large(max_bytes)
+                copy.write(chunk)
+        except BaseException:
+            copy.close()
+            os.unlink(path)
+            raise
+    try:
+        process = subprocess.Popen(
+            _ffmpeg_command(path, sample_rate, max_seconds),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        pcm, truncated = _read_pcm(process, sample_rate, max_seconds)
+        return _pcm_to_audio(pcm, process.wait(), truncated)
+    finally:
+        os.unlink(path)
+
+
+def decode_reference_audio(
+    file: BinaryIO,
+    filename: Optional[str],
+    sample_rate: int,
+    max_seconds: float = MAX_REFERENCE_SECONDS,
+    max_bytes: int = MAX_REFERENCE_BYTES,
+) -> np.ndarray:
+    file.seek(0)
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in _SEEKABLE_SUFFIXES:
+        audio = _decode_file_with_ffmpeg(file, suffix, sample_rate, max_seconds, max_bytes)
+    elif suffix not in _SOUNDFILE_SUFFIXES:
+        try:
+            audio = _decode_with_ffmpeg(file, sample_rate, max_seconds, max_bytes)
+        except ReferenceAudioTooLarge:
+            raise
+        except ValueError:
+            # Misnamed or unusual containers may still need to seek; try once from a file.
+            file.seek(0)
+            audio = _decode_file_with_ffmpeg(file, suffix, sample_rate, max_seconds, max_bytes)
+    else:
+        audio, source_rate = _read_with_soundfile(file, max_seconds)
+        if source_rate != sample_rate:
+            audio = PolyphaseResampler(source_rate, sample_rate).resample(audio)
+    # Leading/trailing silence only adds prompt length, so it is cut before prompt creation.
+    audio = trim_silence(audio, sample_rate)
+    if not audio.size:
+        raise ValueError("Reference audio is silent")
+    return audio
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+from audio_utils import AudioFormat, PolyphaseResampler
+from loudness import LoudnessNormalizer
+from text_pipeline import StreamingStitcher
+
+
+class StreamingRenderWriter:
+    def __init__(
+        self,
+        path: Path,
+        fmt: AudioFormat,
+        sample_rate: int,
+        crossfade_ms: int = 50,
+        normalizer: Optional[LoudnessNormalizer] = None,
+    ) -> None:
+        self.path = path
+        self.format = fmt
+        self.sample_rate = sample_rate
+        self.crossfade_ms = crossfade_ms
+        self.normalizer = normalizer
+        self.frames = 0
+        self._part_path = path.with_name(path.name + ".part")
+        self._file: Optional[sf.SoundFile] = None
+        self._stitcher: Optional[StreamingStitcher] = None
+        self._resampler: Optional[PolyphaseResampler] = None
+
+    def __enter__(self) -> "StreamingRenderWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = sf.SoundFile(
+            str(self._part_path),
+            mode="w",
+            samplerate=self.sample_rate,
+            channels=1,
+            format=self.format.container,
+            subtype=self.format.subtype,
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._drain_stitcher()
+            if self.normalizer is not None:
+                self._write_file(self.normalizer.flush())
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if exc_type is None:
+            os.replace(self._part_path, self.path)
+        else:
+            self._part_path.unlink(missing_ok=True)
+
+    def add(self, audio: np.ndarray, source_rate: int) -> None:
+        if self._stitcher is not None and self._stitcher.sample_rate != source_rate:
+            self._drain_stitcher()
+        if self._stitcher is None:
+            self._stitcher = StreamingStitcher(source_rate, self.crossfade_ms)
+        self._write(self._stitcher.push(audio), source_rate)
+
+    def _drain_stitcher(self) -> None:
+        if self._stitcher is not None:
+            self._write(self._stitcher.flush(), self._stitcher.sample_rate)
+            self._stitcher = None
+        if self._resampler is not None:
+            self._write_frames(self._resampler.flush())
+            self._resampler = None
+
+    def _write(self, audio: np.ndarray, source_rate: int) -> None:
+        if source_rate != self.sample_rate:
+            if self._resampler is None:
+                self._resampler = PolyphaseResampler(source_rate, self.sample_rate)
+            audio = self._resampler.process(audio)
+        self._write_frames(audio)
+
+    def _write_frames(self, audio: np.ndarray) -> None:
+        if self.normalizer is not None:
+            audio = self.normalizer.process(audio)
+        self._write_file(audio)
+
+    def _write_file(self, audio: np.ndarray) -> None:
+        if not audio.size or self._file is None:
+            return
+        self._file.write(audio)
+        self.frames += len(audio)
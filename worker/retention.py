@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from storage import Database, read_json, write_json
+
+logger = logging.getLogger("openvoice")
+
+MIN_SWEEP_INTERVAL_SECONDS = 10.0
+
+
+@dataclass
+class RetentionPolicy:
+    max_bytes: Optional[int] = None
+    max_age_days: Optional[float] = None
+    keep_pinned_projects: bool = True
+    sweep_interval_seconds: float = 600.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RetentionPolicy":
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class SweepResult:
+    evicted: int = 0
+    freed_bytes: int = 0
+    retained_bytes: int = 0
+    retained_files: int = 0
+    swept_at: Optional[str] = None
+
+
+def load_retention_policy(path: Path) -> RetentionPolicy:
+    return RetentionPolicy.from_dict(read_json(path))
+
+
+def save_retention_policy(path: Path, policy: RetentionPolicy) -> None:
+    write_json(path, policy.to_dict())
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.rstrip("Z"))
+    except ValueError:
+        return None
+
+
+class OutputJanitor:
+    def __init__(self, db: Database, policy_path: Path, archive_dir: Optional[Path] = None) -> None:
+        self.db = db
+        self.policy_path = policy_path
+        self.archive_dir = archive_dir
+        self.policy = load_retention_policy(policy_path)
+        self.last_result = SweepResult()
+        self._sweep_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def update_policy(self, policy: RetentionPolicy) -> None:
+        save_retention_policy(self.policy_path, policy)
+        self.policy = policy
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def sweep(self, now: Optional[datetime] = None) -> SweepResult:
+        with self._sweep_lock:
+            result = self._sweep(now or datetime.utcnow())
+        self.last_result = result
+        return result
+
+    def _archive_rows(self) -> List[Dict[str, Any]]:
+        # Batch archives have no history row, so they are aged by modification time.
+        if self.archive_dir is None or not self.archive_dir.is_dir():
+            return []
+        rows: List[Dict[str, Any]] = []
+        for path in self.archive_dir.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if not path.is_file():
+                continue
+            rows.append(
+                {
+                    "job_id": None,
+                    "output_path": str(path),
+                    "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat() + "Z",
+                    "pinned": False,
+                    "size": stat.st_size,
+                }
+            )
+        return rows
+
+    def _sweep(self, now: datetime) -> SweepResult:
+        policy = self.policy
+        candidates: List[Dict[str, Any]] = []
+        evicted: List[str] = []
+        for row in self.db.list_retained_outputs():
+            try:
+                size = Path(row["output_path"]).stat().st_size
+            except OSError:
+                # The file is already gone; record that so clients stop offering playback.
+                evicted.append(row["job_id"])
+                continue
+            candidates.append({**row, "size": size})
+        archives = self._archive_rows()
+        if archives:
+            candidates = sorted(
+                candidates + archives,
+                key=lambda row: _parse_timestamp(row["created_at"]) or datetime.min,
+            )
+
+        def _protected(row: Dict[str, Any]) -> bool:
+            return policy.keep_pinned_projects and row["pinned"]
+
+        to_evict: List[Dict[str, Any]] = []
+        retained: List[Dict[str, Any]] = []
+        cutoff = None
+        if policy.max_age_days is not None:
+            cutoff = now - timedelta(days=policy.max_age_days)
+        for row in candidates:
+            created_at = _parse_timestamp(row["created_at"])
+            if (
+                cutoff is not None
+                and created_at is not None
+                and created_at < cutoff
+                and not _protected(row)
+            ):
+                to_evict.append(row)
+            else:
+                retained.append(row)
+
+        retained_bytes = sum(row["size"] for row in retained)
+        if policy.max_bytes is not None and retained_bytes > policy.max_bytes:
+            keep: List[Dict[str, Any]] = []
+            for row in retained:
+                if retained_bytes > policy.max_bytes and not _protected(row):
+                    to_evict.append(row)
+                    retained_bytes -= row["size"]
+                else:
+                    keep.append(row)
+            retained = keep
+
+        freed = 0
+        archives_evicted = 0
+        for row in to_evict:
+            try:
+                Path(row["output_path"]).unlink(missing_ok=True)
+            except OSError as exc:
+                logger.warning("Failed to evict output %s: %s", row["output_path"], exc)
+                retained.append(row)
+                retained_bytes += row["size"]
+                continue
+            freed += row["size"]
+            if row["job_id"] is None:
+                archives_evicted += 1
+            else:
+                evicted.append(row["job_id"])
+
+        swept_at = now.isoformat() + "Z"
+        if evicted:
+            self.db.mark_history_evicted(evicted, swept_at)
+        if evicted or archives_evicted:
+            logger.info(
+                "Output janitor evicted=%s archives=%s freed_bytes=%s",
+                len(evicted),
+                archives_evicted,
+                freed,
+            )
+        return SweepResult(
+            evicted=len(evicted) + archives_evicted,
+            freed_bytes=freed,
+            retained_bytes=retained_bytes,
+            retained_files=len(retained),
+            swept_at=swept_at,
+        )
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.sweep)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Output janitor sweep failed: %s", exc)
+            interval = max(MIN_SWEEP_INTERVAL_SECONDS, self.policy.sweep_interval_seconds)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
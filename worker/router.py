@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+logger = logging.getLogger("openvoice")
+
+PORT_PREFIX = "WORKER_PORT="
+# Stateless synthesis endpoints that any worker can serve. Everything else (jobs, downloads,
+# voices, history) lives in the primary worker's memory and database.
+INFERENCE_PATHS = {"/tts", "/tts/stream", "/tts/batch"}
+HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+}
+HEALTH_TIMEOUT_SECONDS = 2.0
+STOP_TIMEOUT_SECONDS = 10.0
+RESTART_POLL_SECONDS = 1.0
+METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+# How many more in-flight requests a voice's preferred worker may have than the least busy one
+# before requests move on. Moving costs the next worker a model load, so a small queue is cheaper.
+SPILL_MARGIN = 2
+
+
+@dataclass
+class WorkerProcess:
+    index: int
+    port: int
+    process: Optional[subprocess.Popen] = None
+    in_flight: int = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+
+def affinity_key(body: bytes) -> str:
+    # Requests for the same voice and model size share a worker, so its model and clone
+    # prompt stay loaded.
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return ""
+    if not isinstance(payload, dict):
+        return ""
+    voice = payload.get("voiceId", payload.get("voice_id", ""))
+    size = payload.get("modelSize", payload.get("model_size", ""))
+    return f"{voice}|{size}"
+
+
+def _score(key: str, index: int) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{key}:{index}".encode(), digest_size=8).digest(), "big")
+
+
+def pick_worker(
+    workers: List[WorkerProcess], key: str, margin: int = SPILL_MARGIN
+) -> WorkerProcess:
+    # Rendezvous hashing gives every key a stable preference order. The first worker in it
+    # that is within `margin` of the least busy wins, so a voice stays on its warm worker
+    # under steady load and only spills over once that worker falls clearly behind.
+    ranked = sorted(workers, key=lambda worker: _score(key, worker.index), reverse=True)
+    least = min(worker.in_flight for worker in ranked)
+    return next(worker for worker in ranked if worker.in_flight <= least + margin)
+
+
+def worker_command(log_level: str) -> List[str]:
+    args = ["--host", "127.0.0.1", "--port", "0", "--log-level", log_level, "--workers", "1"]
+    if getattr(sys, "frozen", False):
+        return [sys.executable, *args]
+    return [sys.executable, str(Path(__file__).with_name("worker_main.py")), *args]
+
+
+class WorkerPool:
+    def __init__(self, count: int, log_level: str = "info") -> None:
+        self.count = count
+        self.log_level = log_level
+        self.workers: List[WorkerProcess] = []
+        self.stopping = False
+
+    def _environment(self, index: int) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["OPENVOICELAB_WORKER_ROLE"] = "primary" if index == 0 else "inference"
+        env["OPENVOICELAB_WORKER_INDEX"] = str(index)
+        # Split the cores instead of letting every process size its pool for the whole machine.
+        env.setdefault("OPENVOICELAB_CPU_THREADS", str(max(1, (os.cpu_count() or 1) // self.count)))
+        return env
+
+    def _launch(self, index: int) -> subprocess.Popen:
+        return subprocess.Popen(
+            worker_command(self.log_level),
+            env=self._environment(index),
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+
+    def _attach(self, index: int, process: subprocess.Popen) -> WorkerProcess:
+        for line in process.stdout:
+            if line.startswith(PORT_PREFIX):
+                port = int(line[len(PORT_PREFIX) :].strip())
+                break
+            _forward(index, line)
+        else:
+            raise RuntimeError(f"Worker {index} exited before reporting its port")
+        # The supervisor reads our stdout for the router port, so child port lines stay here.
+        threading.Thread(target=_drain, args=(index, process), daemon=True).start()
+        return WorkerProcess(index=index, port=port, process=process)
+
+    def start(self) -> None:
+        processes = [self._launch(index) for index in range(self.count)]
+        self.workers = [self._attach(index, process) for index, process in enumerate(processes)]
+
+    def restart_exited(self) -> List[int]:
+        restarted = []
+        for position, worker in enumerate(self.workers):
+            if self.stopping or worker.process is None or worker.process.poll() is None:
+                continue
+            logger.warning(
+                "Worker %s exited with %s; restarting", worker.index, worker.process.returncode
+            )
+            self.workers[position] = self._attach(worker.index, self._launch(worker.index))
+            restarted.append(worker.index)
+        return restarted
+
+    def stop(self) -> None:
+        self.stopping = True
+        with httpx.Client(timeout=HEALTH_TIMEOUT_SECONDS) as client:
+            for worker in self.workers:
+                try:
+                    client.post(f"{worker.url}/shutdown")
+                except httpx.HTTPError:
+                    pass
+        deadline = time.monotonic() + STOP_TIMEOUT_SECONDS
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            try:
+                worker.process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+                worker.process.wait()
+
+
+def _forward(index: int, line: str) -> None:
+    line = line.rstrip()
+    if line and not line.startswith(PORT_PREFIX):
+        print(f"[worker {index}] {line}", flush=True)
+
+
+def _drain(index: int, process: subprocess.Popen) -> None:
+    for line in process.stdout:
+        _forward(index, line)
+
+
+def create_router_app(pool: WorkerPool, shutdown_event: asyncio.Event) -> Starlette:
+    client = httpx.AsyncClient(timeout=None)
+
+    async def proxy(request: Request) -> Response:
+        if request.url.path in INFERENCE_PATHS:
+            body = await request.body()
+            worker = pick_worker(pool.workers, affinity_key(body))
+            content = body
+        else:
+            worker = pool.workers[0]
+            content = request.stream()
+        headers = [
+            (name, value) for name, value in request.headers.raw if name.decode() not in HOP_HEADERS
+        ]
+        upstream_request = client.build_request(
+            request.method,
+            f"{worker.url}{request.url.path}",
+            params=request.url.query,
+            headers=headers,
+            content=content,
+        )
+        worker.in_flight += 1
+        try:
+            upstream = await client.send(upstream_request, stream=True)
+        except httpx.HTTPError as exc:
+            worker.in_flight -= 1
+            return JSONResponse(
+                {"detail": f"Worker {worker.index} unavailable: {exc}"}, status_code=502
+            )
+
+        async def relay():
+            # Runs its finally block on client disconnects too, unlike a background task.
+            try:
+                async for chunk in upstream.aiter_raw():
+                    yield chunk
+            finally:
+                worker.in_flight -= 1
+                await upstream.aclose()
+
+        return StreamingResponse(
+            relay(),
+            status_code=upstream.status_code,
+            headers={
+                name: value
+                for name, value in upstream.headers.items()
+                if name.lower() not in HOP_HEADERS
+            },
+        )
+
+    async def health(_: Request) -> Response:
+        async def check(worker: WorkerProcess) -> Dict[str, object]:
+            try:
+                response = await client.get(f"{worker.url}/health", timeout=HEALTH_TIMEOUT_SECONDS)
+                data = response.json() if response.status_code == 200 else {}
+            except (httpx.HTTPError, ValueError):
+                data = {}
+            return {
+                "index": worker.index,
+                "ok": bool(data.get("ok")),
+                "version": data.get("version"),
+                "inFlight": worker.in_flight,
+            }
+
+        workers = await asyncio.gather(*(check(worker) for worker in pool.workers))
+        ok = all(worker["ok"] for worker in workers)
+        return JSONResponse(
+            {"ok": ok, "version": workers[0]["version"], "workers": workers},
+            status_code=200 if ok else 503,
+        )
+
+    async def collect(path: str) -> List[Dict[str, object]]:
+        async def fetch(worker: WorkerProcess) -> Dict[str, object]:
+            try:
+                response = await client.get(f"{worker.url}{path}", timeout=HEALTH_TIMEOUT_SECONDS)
+                data = response.json() if response.status_code == 200 else {}
+            except (httpx.HTTPError, ValueError):
+                data = {}
+            return {"index": worker.index, **data}
+
+        return await asyncio.gather(*(fetch(worker) for worker in pool.workers))
+
+    async def memory(_: Request) -> Response:
+        workers = await collect("/memory")
+
+        def total(field: str) -> Optional[int]:
+            values = [worker.get(field) for worker in workers]
+            return None if None in values else sum(values)
+
+        # Shared weight pages show up in every worker's RSS but only once in the PSS total.
+        return JSONResponse(
+            {
+                "totalRssBytes": total("rssBytes"),
+                "totalPssBytes": total("pssBytes"),
+                "totalPrivateBytes": total("privateBytes"),
+                "workers": workers,
+            }
+        )
+
+    async def scheduler(_: Request) -> Response:
+        # Each worker schedules its own lanes; previews and renders for a voice share a worker.
+        return JSONResponse({"workers": await collect("/scheduler")})
+
+    async def admission(_: Request) -> Response:
+        # Capacity and client limits are enforced per worker.
+        return JSONResponse({"workers": await collect("/admission")})
+
+    async def shutdown(request: Request) -> Response:
+        if request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+            return JSONResponse({"detail": "Forbidden"}, status_code=403)
+        shutdown_event.set()
+        return JSONResponse({"ok": True})
+
+    @asynccontextmanager
+    async def lifespan(_: Starlette):
+        watcher = asyncio.create_task(watch_workers(pool))
+        try:
+            yield
+        finally:
+            watcher.cancel()
+            await client.aclose()
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/memory", memory, methods=["GET"]),
+            Route("/scheduler", scheduler, methods=["GET"]),
+            Route("/admission", admission, methods=["GET"]),
+            Route("/shutdown", shutdown, methods=["POST"]),
+            Route("/{path:path}", proxy, methods=METHODS),
+        ],
+        lifespan=lifespan,
+    )
+
+
+async def watch_workers(pool: WorkerPool) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(RESTART_POLL_SECONDS)
+        try:
+            await loop.run_in_executor(None, pool.restart_exited)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Worker restart failed: %s", exc)
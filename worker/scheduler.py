@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+WAIT_SAMPLES = 512
+LANE_THREADS = 16
+
+
+class _Lane:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.max_wait = 0.0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def to_dict(self) -> Dict[str, object]:
+        waits = sorted(self.waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 1)
+
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_max_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class InferenceScheduler:
+    # Slots are held for one model call at a time, so a long render gives way to previews
+    # at its next chunk boundary instead of after the whole document.
+    def __init__(
+        self, interactive_slots: int = 1, bulk_slots: int = 1, lane_threads: int = LANE_THREADS
+    ) -> None:
+        if interactive_slots < 1 or bulk_slots < 1:
+            raise ValueError("Scheduler lanes need at least one slot")
+        if lane_threads < 1:
+            raise ValueError("Scheduler lanes need at least one thread")
+        self._condition = threading.Condition()
+        self._lanes = {INTERACTIVE: _Lane(interactive_slots), BULK: _Lane(bulk_slots)}
+        # Requests run on their lane's own threads, so queued renders cannot use up the threads
+        # a preview needs to reach its slot. A thread runs a whole request between model calls,
+        # so the pools are not sized to the slots; waiting for the model happens in slot().
+        self._executors = {
+            lane: ThreadPoolExecutor(max_workers=lane_threads, thread_name_prefix=lane)
+            for lane in self._lanes
+        }
+
+    @classmethod
+    def from_env(cls) -> "InferenceScheduler":
+        return cls(
+            int(os.getenv("OPENVOICELAB_INTERACTIVE_SLOTS", "1")),
+            int(os.getenv("OPENVOICELAB_BULK_SLOTS", "1")),
+            int(os.getenv("OPENVOICELAB_LANE_THREADS", str(LANE_THREADS))),
+        )
+
+    def executor(self, lane: str) -> ThreadPoolExecutor:
+        if lane not in self._executors:
+            raise ValueError(f"Unknown priority: {lane}")
+        return self._executors[lane]
+
+    def _has_room(self, lane: str) -> bool:
+        state = self._lanes[lane]
+        if state.running >= state.limit:
+            return False
+        if lane == BULK:
+            # Bulk chunks pause while any preview is queued or generating; the chunk already
+            # running finishes first, since model calls cannot be interrupted.
+            interactive = self._lanes[INTERACTIVE]
+            return interactive.waiting == 0 and interactive.running == 0
+        return True
+
+    @contextmanager
+    def slot(self, lane: str) -> Iterator[None]:
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown priority: {lane}")
+        state = self._lanes[lane]
+        queued_at = time.perf_counter()
+        with self._condition:
+            state.waiting += 1
+            try:
+                self._condition.wait_for(lambda: self._has_room(lane))
+            finally:
+                state.waiting -= 1
+            state.running += 1
+            state.admitted += 1
+            wait = time.perf_counter() - queued_at
+            state.waits.append(wait)
+            state.max_wait = max(state.max_wait, wait)
+        try:
+            yield
+        finally:
+            with self._condition:
+                state.running -= 1
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._condition:
+            return {lane: state.to_dict() for lane, state in self._lanes.items()}
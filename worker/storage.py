@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import os
+import shutil
 import sqlite3
 from dataclasses import dataclass
 from pathlib import Path
@@ -68,6 +69,17 @@ def write_json(path: Path, data: Dict[str, Any]) -> None:
     path.write_text(json.dumps(data, indent=2), encoding="utf-8")
 
 
+def clear_directory(path: Path) -> None:
+    if not path.exists():
+        return
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                Path(entry.path).unlink(missing_ok=True)
+
+
 class Database:
     def __init__(self, path: Path) -> None:
         self.path = path
@@ -124,14 +136,21 @@ class Database:
             columns = [row["name"] for row in conn.execute("PRAGMA table_info(history)").fetchall()]
             if "pronunciation_profile_id" not in columns:
                 conn.execute("ALTER TABLE history ADD COLUMN pronunciation_profile_id TEXT")
+            if "evicted_at" not in columns:
+                conn.execute("ALTER TABLE history ADD COLUMN evicted_at TEXT")
+            project_columns = [
+                row["name"] for row in conn.execute("PRAGMA table_info(projects)").fetchall()
+            ]
+            if "pinned" not in project_columns:
+                conn.execute("ALTER TABLE projects ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0")
             conn.commit()
 
     def list_projects(self) -> List[Dict[str, Any]]:
         with self._connect() as conn:
             rows = conn.execute(
-                "SELECT project_id, name, created_at FROM projects ORDER BY created_at DESC"
+                "SELECT project_id, name, created_at, pinned FROM projects ORDER BY created_at DESC"
             ).fetchall()
-        return [dict(row) for row in rows]
+        return [{**dict(row), "pinned": bool(row["pinned"])} for row in rows]
 
     def create_project(self, project_id: str, name: str, created_at: str) -> None:
         with self._connect() as conn:
@@ -141,9 +160,21 @@ class Database:
             )
             conn.commit()
 
+    def set_project_pinned(self, project_id: str, pinned: bool) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE projects SET pinned = ? WHERE project_id = ?",
+                (1 if pinned else 0, project_id),
+            )
+            conn.commit()
+        return cursor.rowcount > 0
+
     def add_history(self, entry: Dict[str, Any]) -> None:
+        self.add_history_many([entry])
+
+    def add_history_many(self, entries: Iterable[Dict[str, Any]]) -> None:
         with self._connect() as conn:
-            conn.execute(
+            conn.executemany(
                 """
                 INSERT OR REPLACE INTO history
                     (
@@ -157,15 +188,18 @@ class Database:
                     )
                 VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    entry["job_id"],
-                    entry["text"],
-                    entry["voice_id"],
-                    entry["output_path"],
-                    entry["created_at"],
-                    entry.get("project_id"),
-                    entry.get("pronunciation_profile_id"),
-                ),
+                [
+                    (
+                        entry["job_id"],
+                        entry["text"],
+                        entry["voice_id"],
+                        entry["output_path"],
+                        entry["created_at"],
+                        entry.get("project_id"),
+                        entry.get("pronunciation_profile_id"),
+                    )
+                    for entry in entries
+                ],
             )
             conn.commit()
 
@@ -177,7 +211,7 @@ class Database:
     ) -> List[Dict[str, Any]]:
         sql = (
             "SELECT job_id, text, voice_id, output_path, created_at, "
-            "project_id, pronunciation_profile_id "
+            "project_id, pronunciation_profile_id, evicted_at "
             "FROM history"
         )
         params: List[Any] = []
@@ -201,7 +235,7 @@ class Database:
             row = conn.execute(
                 """
                 SELECT job_id, text, voice_id, output_path, created_at, project_id,
-                    pronunciation_profile_id
+                    pronunciation_profile_id, evicted_at
                 FROM history
                 WHERE job_id = ?
                 """,
@@ -209,6 +243,28 @@ class Database:
             ).fetchone()
         return dict(row) if row else None
 
+    def list_retained_outputs(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT history.job_id, history.output_path, history.created_at,
+                    COALESCE(projects.pinned, 0) AS pinned
+                FROM history
+                LEFT JOIN projects ON projects.project_id = history.project_id
+                WHERE history.evicted_at IS NULL
+                ORDER BY history.created_at ASC
+                """
+            ).fetchall()
+        return [{**dict(row), "pinned": bool(row["pinned"])} for row in rows]
+
+    def mark_history_evicted(self, job_ids: Iterable[str], evicted_at: str) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE history SET evicted_at = ? WHERE job_id = ?",
+                [(evicted_at, job_id) for job_id in job_ids],
+            )
+            conn.commit()
+
     def list_pronunciation_profiles(self) -> List[Dict[str, Any]]:
         with self._connect() as conn:
             profiles = conn.execute(
@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import pytest
+from admission import (
+    AdmissionController,
+    AdmissionPolicy,
+    AdmissionRejected,
+    ClientLimits,
+    client_label,
+    estimate_cost,
+    load_admission_policy,
+)
+from scheduler import BULK, INTERACTIVE
+
+
+def _policy(**overrides):
+    values = {"capacity": 100.0, "queue_limit": 4, "queue_timeout_seconds": 5.0}
+    values.update(overrides)
+    return AdmissionPolicy.from_dict(values)
+
+
+def test_cost_scales_with_text_and_model_size():
+    assert estimate_cost(1000, "1.7b") == pytest.approx(1700)
+    assert estimate_cost(1000, "0.6B") == pytest.approx(600)
+    assert estimate_cost(0, "custom") == 1.0
+
+
+def test_requests_queue_until_capacity_frees_in_order():
+    async def scenario():
+        controller = AdmissionController(_policy())
+        first = await controller.acquire("a", 80)
+        order = []
+
+        async def wait(client, cost):
+            admission = await controller.acquire(client, cost)
+            order.append(client)
+            return admission
+
+        large = asyncio.create_task(wait("b", 60))
+        small = asyncio.create_task(wait("c", 10))
+        await asyncio.sleep(0.01)
+        # The small request would fit, but does not overtake the large one ahead of it.
+        assert controller.stats()["queued"] == 2
+        controller.release(first)
+        admissions = await asyncio.gather(large, small)
+        stats = controller.stats()
+        assert order == ["b", "c"]
+        assert (stats["running"], stats["in_flight_cost"]) == (2, 70)
+        for admission in admissions:
+            controller.release(admission)
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["running"], stats["queued"], stats["admitted"]) == (0, 0, 3)
+    assert stats["wait_max_ms"] > 0
+
+
+def test_previews_are_admitted_while_a_large_render_runs():
+    async def scenario():
+        controller = AdmissionController(_policy(max_request_cost=35))
+        # A render longer than the whole capacity is charged the per-request maximum.
+        render = await controller.acquire(None, 5000, BULK)
+        assert render.cost == 35
+        second = await controller.acquire(None, 5000, BULK)
+        # Bulk work cannot use the reserved share, so the third render waits ...
+        third = asyncio.create_task(controller.acquire(None, 10, BULK))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        # ... while a preview still fits.
+        preview = await controller.acquire(None, 20, INTERACTIVE)
+        lanes = controller.stats()["lanes"]
+        assert lanes[BULK] == {"capacity": 75, "in_flight_cost": 70, "running": 2, "queued": 1}
+        assert (lanes[INTERACTIVE]["running"], lanes[INTERACTIVE]["in_flight_cost"]) == (1, 20)
+        for admission in (render, second, preview):
+            controller.release(admission)
+        controller.release(await third)
+        with pytest.raises(ValueError):
+            await controller.acquire(None, 1, "urgent")
+
+    asyncio.run(scenario())
+
+
+def test_bulk_waits_behind_a_held_back_preview():
+    async def scenario():
+        controller = AdmissionController(_policy())
+        held = await controller.acquire(None, 60, INTERACTIVE)
+        preview = asyncio.create_task(controller.acquire(None, 60, INTERACTIVE))
+        await asyncio.sleep(0.01)
+        # The render would fit, but does not overtake the preview waiting for capacity.
+        render = asyncio.create_task(controller.acquire(None, 10, BULK))
+        await asyncio.sleep(0.01)
+        assert not render.done()
+        controller.release(held)
+        controller.release(await preview)
+        controller.release(await render)
+
+    asyncio.run(scenario())
+
+
+def test_client_limits_queue_and_shed_with_retry_after():
+    async def scenario():
+        policy = _policy(clients={"secret": {"concurrency": 1, "queue_limit": 0}})
+        controller = AdmissionController(policy)
+        held = await controller.acquire("secret", 1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("secret", 1)
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after >= 1
+        # Other clients are not held back by one that is at its limit, and requests without an
+        # API key are only bound by the shared capacity.
+        other = await controller.acquire("b", 1)
+        anonymous = [await controller.acquire(None, 1) for _ in range(4)]
+        stats = controller.stats()
+        assert (stats["shed"], stats["running"]) == (1, 6)
+        assert stats["clients"][client_label("secret")] == {"running": 1, "queued": 0}
+        assert "secret" not in json.dumps(stats)
+        for admission in [held, other, *anonymous]:
+            controller.release(admission)
+        # Releasing twice does not free capacity held by others.
+        controller.release(held)
+        assert (controller.stats()["running"], controller.stats()["in_flight_cost"]) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_and_timeouts_are_shed():
+    async def scenario():
+        controller = AdmissionController(_policy(queue_limit=0, queue_timeout_seconds=0.05))
+        held = await controller.acquire(None, 100)
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire("b", 1)
+        assert full.value.status_code == 503
+        controller.policy.queue_limit = 4
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire("b", 1)
+        assert "Timed out" in timed_out.value.detail
+        assert controller.stats()["queued"] == 0
+        controller.release(held)
+
+    asyncio.run(scenario())
+
+
+def test_policy_file_overrides_defaults(tmp_path):
+    path = tmp_path / "admission.json"
+    assert load_admission_policy(path).capacity == AdmissionPolicy().capacity
+    path.write_text(json.dumps({"capacity": 50, "clients": {"default": {"concurrency": 1}}}))
+    policy = load_admission_policy(path)
+    assert policy.capacity == 50
+    assert policy.limits_for("unlisted") == ClientLimits(concurrency=1, queue_limit=8)
+    assert policy.limits_for(None) is None
+    assert AdmissionPolicy().limits_for("unlisted") is None
+    assert policy.lane_capacity(BULK) == 37.5
+    for invalid in ({"clients": {"default": {"concurrency": 0}}}, {"interactive_reserve": 1}):
+        path.write_text(json.dumps(invalid))
+        with pytest.raises(ValueError):
+            load_admission_policy(path)
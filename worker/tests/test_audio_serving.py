@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from audio_serving import (
+    BufferStreamingResponse,
+    RangeNotSatisfiable,
+    audio_file_response,
+    parse_range,
+)
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+
+def _client(path):
+    app = FastAPI()
+
+    @app.api_route("/audio", methods=["GET", "HEAD"])
+    async def audio(request: Request):
+        return await audio_file_response(path, request.headers)
+
+    return TestClient(app)
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=-10", 0)
+
+
+def test_full_and_partial_responses(tmp_path):
+    path = tmp_path / "take.flac"
+    payload = bytes(range(256)) * 1024
+    path.write_bytes(payload)
+    client = _client(path)
+
+    full = client.get("/audio")
+    assert full.status_code == 200
+    assert full.content == payload
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.headers["content-type"] == "audio/flac"
+    etag = full.headers["etag"]
+
+    partial = client.get("/audio", headers={"Range": "bytes=1000-70999"})
+    assert partial.status_code == 206
+    assert partial.content == payload[1000:71000]
+    assert partial.headers["content-range"] == f"bytes 1000-70999/{len(payload)}"
+    assert partial.headers["content-length"] == "70000"
+
+    stale = client.get("/audio", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+
+    cached = client.get("/audio", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    unsatisfiable = client.get("/audio", headers={"Range": f"bytes={len(payload)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(payload)}"
+
+
+def test_stream_close_runs_when_the_body_is_never_iterated():
+    iterated, closed = [], []
+
+    async def body():
+        iterated.append(True)
+        yield b"audio"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # The client disconnects while the headers are still being sent.
+        await asyncio.sleep(5)
+
+    response = BufferStreamingResponse(body(), on_close=lambda: closed.append(True))
+    asyncio.run(response({"type": "http"}, receive, send))
+    assert (iterated, closed) == ([], [True])
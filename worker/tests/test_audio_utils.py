@@ -1,5 +1,18 @@
+import io
+import math
+
 import numpy as np
-from audio_utils import resample_audio
+import pytest
+import soundfile as sf
+from audio_utils import (
+    PolyphaseResampler,
+    StreamEncoder,
+    resample_audio,
+    resolve_audio_format,
+    resolve_stream_format,
+    write_audio,
+)
+from scipy.signal import resample_poly
 
 
 def test_resample_audio_length_and_dtype():
@@ -12,3 +25,75 @@ def test_resample_audio_length_and_dtype():
     expected_len = int(target_sr * duration)
     assert resampled.dtype == np.float32
     assert abs(len(resampled) - expected_len) <= 2
+
+
+def _sine(sample_rate: int, duration: float) -> np.ndarray:
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def test_write_audio_flac_round_trip(tmp_path):
+    audio = _sine(24000, 0.5)
+    fmt = resolve_audio_format("flac", 24000)
+    path = tmp_path / f"out{fmt.extension}"
+    write_audio(path, audio, 24000, fmt)
+    decoded, sr = sf.read(str(path), dtype="float32")
+    assert sr == 24000
+    assert np.max(np.abs(decoded - audio)) < 1e-3
+
+
+def test_resolve_audio_format_rejects_unsupported():
+    with pytest.raises(ValueError):
+        resolve_audio_format("aiff", 24000)
+    with pytest.raises(ValueError):
+        resolve_audio_format("opus", 44100)
+    with pytest.raises(ValueError):
+        resolve_stream_format("mp3", 24000)
+    assert resolve_stream_format("pcm", 24000) is None
+
+
+def test_stream_encoder_flac_emits_before_close():
+    encoder = StreamEncoder(resolve_audio_format("flac", 24000), 24000)
+    audio = _sine(24000, 1.0)
+    emitted = b""
+    for start in range(0, len(audio), 2400):
+        emitted += encoder.encode(audio[start : start + 2400])
+    assert emitted.startswith(b"fLaC")
+    assert len(emitted) > 1000
+    emitted += encoder.close()
+    assert len(emitted) < audio.size * 2
+
+
+def test_stream_encoder_opus_decodes():
+    encoder = StreamEncoder(resolve_audio_format("opus", 24000), 24000)
+    audio = _sine(24000, 2.0)
+    encoded = encoder.encode(audio) + encoder.close()
+    decoded, sr = sf.read(io.BytesIO(encoded), dtype="float32")
+    assert sr == 24000
+    assert abs(len(decoded) - len(audio)) < 24000 * 0.1
+
+
+@pytest.mark.parametrize("target_sr", [16000, 22050, 44100])
+def test_polyphase_resampler_streaming_matches_one_shot(target_sr):
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, 24000).astype(np.float32)
+    divisor = math.gcd(24000, target_sr)
+    expected = resample_poly(audio, target_sr // divisor, 24000 // divisor)
+
+    resampler = PolyphaseResampler(24000, target_sr)
+    streamed = []
+    offset = 0
+    for size in [480, 1, 7, 5000, 13] * 200:
+        if offset >= audio.size:
+            break
+        streamed.append(resampler.process(audio[offset : offset + size]))
+        offset += size
+    streamed.append(resampler.flush())
+
+    np.testing.assert_allclose(np.concatenate(streamed), expected, atol=1e-6)
+
+
+def test_polyphase_filter_design_is_cached():
+    first = PolyphaseResampler(24000, 44100)
+    second = PolyphaseResampler(48000, 88200)
+    assert first._filter is second._filter
@@ -1,5 +1,13 @@
 import numpy as np
-from dsp_utils import apply_style_dsp
+import pytest
+from dsp_utils import (
+    DSP_QUALITIES,
+    apply_pitch_shift,
+    apply_style_dsp,
+    apply_time_stretch,
+    resolve_dsp_quality,
+    trim_silence,
+)
 
 
 def _sine_wave(freq: float, sample_rate: int, duration: float) -> np.ndarray:
@@ -19,3 +27,45 @@ def test_apply_style_dsp_emphasis_and_rate():
     assert styled.dtype == np.float32
     assert _rms(styled) > baseline_rms
     assert len(styled) > len(audio)
+
+
+def _dominant_frequency(audio: np.ndarray, sample_rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(len(audio))))
+    return float(np.argmax(spectrum) * sample_rate / len(audio))
+
+
+@pytest.mark.parametrize("quality", sorted(DSP_QUALITIES))
+def test_pitch_shift_keeps_length_and_moves_pitch(quality):
+    sample_rate = 24000
+    audio = _sine_wave(220.0, sample_rate, 1.0) * 0.5
+    shifted = apply_pitch_shift(audio, 2.0, sample_rate, quality)
+    assert shifted.dtype == np.float32
+    assert len(shifted) == len(audio)
+    expected = 220.0 * 2 ** (2 / 12)
+    assert abs(_dominant_frequency(shifted[2000:-2000], sample_rate) - expected) < 3.0
+
+
+@pytest.mark.parametrize("quality", sorted(DSP_QUALITIES))
+def test_time_stretch_keeps_pitch(quality):
+    sample_rate = 24000
+    audio = _sine_wave(330.0, sample_rate, 1.0) * 0.5
+    stretched = apply_time_stretch(audio, 0.8, sample_rate, quality)
+    assert len(stretched) == int(round(len(audio) / 0.8))
+    assert abs(_dominant_frequency(stretched[2000:-2000], sample_rate) - 330.0) < 3.0
+    assert abs(_rms(stretched[2000:-2000]) - _rms(audio)) < 0.05
+
+
+def test_rejects_unknown_quality():
+    with pytest.raises(ValueError):
+        resolve_dsp_quality("ultra")
+
+
+def test_trim_silence_keeps_padding_around_speech():
+    sample_rate = 24000
+    speech = _sine_wave(220.0, sample_rate, 0.5) * 0.3
+    noise = np.random.default_rng(0).normal(0, 1e-4, sample_rate).astype(np.float32)
+    audio = np.concatenate([noise, speech, noise])
+    trimmed = trim_silence(audio, sample_rate, pad_ms=50.0)
+    assert len(speech) <= len(trimmed) <= len(speech) + int(sample_rate * 0.12)
+    assert np.abs(trimmed[: int(sample_rate * 0.04)]).max() < 1e-3
+    assert trim_silence(np.zeros(sample_rate, dtype=np.float32), sample_rate).size == 0
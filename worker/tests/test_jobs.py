@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+from jobs import JobManager
+
+
+def _wait(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.status not in {"completed", "failed", "cancelled"}:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return job
+
+
+def test_job_completes_with_result():
+    manager = JobManager()
+    job = _wait(manager.submit("a", "test", lambda job: {"value": 1}))
+    assert job.status == "completed"
+    assert job.result == {"value": 1}
+    assert manager.get("a") is job
+
+
+def test_failed_job_runs_cleanup():
+    manager = JobManager()
+    cleaned = []
+
+    def boom(job):
+        raise RuntimeError("model exploded")
+
+    job = _wait(manager.submit("b", "test", boom, cleanup=lambda job: cleaned.append(job.job_id)))
+    assert job.status == "failed"
+    assert job.error == "model exploded"
+    assert cleaned == ["b"]
+
+
+@pytest.mark.parametrize("queued", [False, True])
+def test_cancel_running_and_queued_jobs(queued):
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking(job):
+        started.set()
+        release.wait(5)
+        job.raise_if_cancelled()
+        return {}
+
+    first = manager.submit("first", "test", blocking)
+    second = manager.submit("second", "test", lambda job: {}) if queued else None
+    assert started.wait(5)
+    manager.cancel("second" if queued else "first")
+    release.set()
+    if queued:
+        assert _wait(first).status == "completed"
+        assert _wait(second).status == "cancelled"
+    else:
+        assert _wait(first).status == "cancelled"
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from loudness import (
+    LoudnessMeter,
+    LoudnessNormalizer,
+    TruePeakLimiter,
+    integrated_loudness,
+    normalize_loudness,
+    true_peak_db,
+)
+from scipy.signal import resample_poly
+
+
+def _uneven_speech(sample_rate):
+    rng = np.random.default_rng(0)
+    chunks = []
+    for level in [0.05, 0.5, 0.2, 0.9, 0.01]:
+        t = np.arange(int(sample_rate * rng.uniform(0.5, 3.0))) / sample_rate
+        tone = level * np.sin(2 * np.pi * 220 * t) * (1 + 0.3 * np.sin(2 * np.pi * 3 * t))
+        chunks.append((tone + level * 0.3 * rng.standard_normal(t.size)).astype(np.float32))
+    return np.concatenate(chunks)
+
+
+def _oversampled_peak_db(audio):
+    return 20 * np.log10(np.abs(resample_poly(audio, 4, 1)).max())
+
+
+def test_reference_sine_reads_minus_three_lufs():
+    sample_rate = 48000
+    t = np.arange(sample_rate * 5) / sample_rate
+    sine = np.sin(2 * np.pi * 997 * t).astype(np.float32)
+    assert integrated_loudness(sine, sample_rate) == pytest.approx(-3.01, abs=0.05)
+    assert integrated_loudness(np.zeros(sample_rate, dtype=np.float32), sample_rate) == -np.inf
+
+
+def test_meter_streams_in_uneven_pieces_with_bounded_state():
+    sample_rate = 24000
+    audio = _uneven_speech(sample_rate)
+    meter = LoudnessMeter(sample_rate)
+    offset = 0
+    for size in [1, 700, 2399, 2400, 5, 9000] * 100:
+        if offset >= audio.size:
+            break
+        meter.add(audio[offset : offset + size])
+        offset += size
+        assert meter._hop_tail.size < 4
+    assert meter.integrated == pytest.approx(integrated_loudness(audio, sample_rate), abs=1e-9)
+
+
+def test_normalize_loudness_hits_target_under_ceiling():
+    sample_rate = 24000
+    audio = _uneven_speech(sample_rate)
+    normalized = normalize_loudness(audio, sample_rate, target_lufs=-16.0, true_peak_db=-1.0)
+    assert len(normalized) == len(audio)
+    assert integrated_loudness(normalized, sample_rate) == pytest.approx(-16.0, abs=0.5)
+    assert _oversampled_peak_db(normalized) <= -0.9
+
+
+@pytest.mark.parametrize("sample_rate", [24000, 48000])
+def test_streaming_normalizer_with_bounded_lookahead(sample_rate):
+    audio = _uneven_speech(sample_rate)
+    normalizer = LoudnessNormalizer(sample_rate, -16.0, -1.0, lookahead_seconds=1.0)
+    blocks = [normalizer.process(block) for block in np.array_split(audio, 57)]
+    # Nothing is held back beyond the look-ahead plus the limiter's few milliseconds.
+    assert sum(len(block) for block in blocks) >= len(audio) - sample_rate - 256
+    output = np.concatenate(blocks + [normalizer.flush()])
+    assert len(output) == len(audio)
+    assert integrated_loudness(output, sample_rate) == pytest.approx(-16.0, abs=1.5)
+    assert _oversampled_peak_db(output) <= -0.9
+
+
+def test_limiter_is_transparent_below_ceiling():
+    limiter = TruePeakLimiter(24000, ceiling_db=-1.0)
+    audio = np.random.default_rng(1).uniform(-0.5, 0.5, 5000).astype(np.float32)
+    output = np.concatenate([limiter.process(audio[:1234]), limiter.process(audio[1234:])])
+    output = np.concatenate([output, limiter.flush()])
+    np.testing.assert_allclose(output, audio, atol=1e-6)
+    assert true_peak_db(audio) < -1.0
+
+
+def test_rejects_out_of_range_target():
+    with pytest.raises(ValueError):
+        LoudnessNormalizer(24000, target_lufs=3.0)
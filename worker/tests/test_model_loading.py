@@ -0,0 +1,282 @@
+import inspect
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import torch
+from memory_stats import process_memory
+from model_loading import (
+    WeightCache,
+    compile_speech_decoder,
+    map_weights,
+    mmap_safetensors,
+    write_cast_safetensors,
+)
+from safetensors import safe_open
+from safetensors.torch import load_file, save_file
+
+
+def _write_model(root):
+    root.mkdir()
+    (root / "config.json").write_text("{}", encoding="utf-8")
+    (root / "speech_tokenizer").mkdir()
+    save_file(
+        {
+            "embed.weight": torch.randn(8, 4, dtype=torch.bfloat16),
+            "positions": torch.arange(5),
+            "scale": torch.tensor(0.5, dtype=torch.bfloat16),
+        },
+        str(root / "model.safetensors"),
+        metadata={"format": "pt"},
+    )
+    save_file({"conv.weight": torch.randn(3, 3)}, str(root / "speech_tokenizer/model.safetensors"))
+    return root
+
+
+def test_mmap_safetensors_matches_safetensors(tmp_path):
+    model_dir = _write_model(tmp_path / "model")
+    expected = load_file(str(model_dir / "model.safetensors"))
+    tensors = mmap_safetensors(model_dir / "model.safetensors")
+    assert tensors.keys() == expected.keys()
+    for name, tensor in expected.items():
+        assert tensors[name].dtype == tensor.dtype
+        assert torch.equal(tensors[name], tensor)
+
+
+def test_cast_file_is_valid_safetensors(tmp_path):
+    model_dir = _write_model(tmp_path / "model")
+    target = tmp_path / "cast.safetensors"
+    write_cast_safetensors(model_dir / "model.safetensors", target, torch.float32)
+    source = load_file(str(model_dir / "model.safetensors"))
+    with safe_open(str(target), framework="pt") as handle:
+        assert handle.metadata() == {"format": "pt"}
+        assert handle.get_tensor("embed.weight").dtype == torch.float32
+        assert torch.equal(handle.get_tensor("embed.weight"), source["embed.weight"].float())
+        assert handle.get_tensor("scale").shape == ()
+        assert torch.equal(handle.get_tensor("positions"), source["positions"])
+
+
+def test_weight_cache_builds_once_and_tracks_sources(tmp_path):
+    model_dir = _write_model(tmp_path / "model")
+    cache = WeightCache(tmp_path / "cache")
+
+    assert cache.prepare(model_dir, torch.bfloat16) == (model_dir, "skipped")
+    load_dir, status = cache.prepare(model_dir, torch.float32)
+    assert status == "built"
+    assert load_dir == tmp_path / "cache" / "model" / "float32"
+    assert (load_dir / "config.json").read_text(encoding="utf-8") == "{}"
+    assert (load_dir / "speech_tokenizer/model.safetensors").is_file()
+    assert load_file(str(load_dir / "model.safetensors"))["embed.weight"].dtype == torch.float32
+    assert cache.prepare(model_dir, torch.float32) == (load_dir, "hit")
+
+    (model_dir / "config.json").write_text('{"changed": true}', encoding="utf-8")
+    assert cache.prepare(model_dir, torch.float32) == (load_dir, "built")
+    assert (load_dir / "config.json").read_text(encoding="utf-8") == '{"changed": true}'
+    assert not list(load_dir.parent.glob("*.tmp"))
+
+    assert WeightCache(tmp_path / "cache", enabled=False).prepare(model_dir, torch.float32) == (
+        model_dir,
+        "off",
+    )
+
+
+def test_concurrent_caches_build_once(tmp_path):
+    # Separate instances stand in for separate worker processes sharing the models folder.
+    model_dir = _write_model(tmp_path / "model")
+    results = []
+
+    def prepare():
+        results.append(WeightCache(tmp_path / "cache").prepare(model_dir, torch.float32)[1])
+
+    threads = [threading.Thread(target=prepare) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == ["built", "hit", "hit", "hit"]
+
+
+def test_mapped_weights_do_not_count_as_private_memory(tmp_path):
+    if process_memory()["pss_bytes"] is None:
+        pytest.skip("needs /proc/self/smaps_rollup")
+    size = 64 << 20
+    save_file({"weight": torch.ones(size // 4)}, str(tmp_path / "model.safetensors"))
+    before = process_memory()
+    tensors = mmap_safetensors(tmp_path / "model.safetensors")
+    assert tensors["weight"].sum().item() == size // 4
+    after = process_memory()
+    assert after["rss_bytes"] - before["rss_bytes"] > size * 0.9
+    assert after["private_bytes"] - before["private_bytes"] < size * 0.1
+
+
+def test_map_weights_serves_parameters_from_mapping(tmp_path):
+    module = torch.nn.Sequential(torch.nn.Linear(4, 3), torch.nn.BatchNorm1d(3))
+    save_file(module.state_dict(), str(tmp_path / "model.safetensors"))
+    module[0].weight.data = module[0].weight.data.clone()
+    before = {name: value.clone() for name, value in module.state_dict().items()}
+
+    mapped = map_weights(module, tmp_path)
+
+    weight_bytes = sum(value.numel() * value.element_size() for value in before.values())
+    assert mapped == weight_bytes
+    for name, value in module.state_dict().items():
+        assert torch.equal(value, before[name])
+    # Views over an external buffer cannot be resized; the copies from_pretrained makes can.
+    assert not module[0].weight.untyped_storage().resizable()
+    assert not module[1].running_mean.untyped_storage().resizable()
+    assert module(torch.ones(2, 4)).shape == (2, 3)
+
+
+def _tiny_model():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(
+        torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 8, bias=False)
+    )
+
+
+def test_quantized_linears_are_cached_on_disk(tmp_path):
+    model_dir = _write_model(tmp_path / "model")
+    cache = WeightCache(tmp_path / "cache")
+    inputs = torch.randn(4, 16)
+    reference = _tiny_model()(inputs)
+
+    built = _tiny_model()
+    assert cache.quantize(model_dir, built) == "built"
+    assert type(built[0]).__name__ == "Linear" and type(built[0]) is not torch.nn.Linear
+    assert (tmp_path / "cache/model/int8/linears.pt").is_file()
+    assert torch.allclose(built(inputs), reference, atol=0.05)
+
+    restored = _tiny_model()
+    assert cache.quantize(model_dir, restored) == "hit"
+    assert torch.equal(restored(inputs), built(inputs))
+
+    (model_dir / "config.json").write_text('{"changed": true}', encoding="utf-8")
+    assert cache.quantize(model_dir, _tiny_model()) == "built"
+
+
+def test_stale_quantized_cache_is_rebuilt(tmp_path):
+    model_dir = _write_model(tmp_path / "model")
+    cache = WeightCache(tmp_path / "cache")
+    cache.quantize(model_dir, _tiny_model())
+
+    other = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Identity())
+    assert cache.quantize(model_dir, other) == "built"
+    assert type(other[0]) is not torch.nn.Linear
+    assert isinstance(other[2], torch.nn.Identity)
+
+
+def test_cpu_profile_splits_threads_between_parallel_requests(monkeypatch):
+    from tts_engine import CpuProfile
+
+    monkeypatch.setattr(torch, "get_num_threads", lambda: 16)
+    monkeypatch.setenv("OPENVOICELAB_CPU_PARALLEL_REQUESTS", "4")
+    monkeypatch.setenv("OPENVOICELAB_CPU_PRECISION", "INT8")
+    assert CpuProfile.from_env() == CpuProfile(precision="int8", threads=4, interop_threads=4)
+
+    monkeypatch.setenv("OPENVOICELAB_CPU_THREADS", "6")
+    monkeypatch.setenv("OPENVOICELAB_CPU_PRECISION", "fp4")
+    assert CpuProfile.from_env() == CpuProfile(precision="float32", threads=6, interop_threads=4)
+
+
+def test_cpu_profile_falls_back_without_bf16(monkeypatch):
+    import tts_engine
+
+    monkeypatch.setattr(tts_engine, "cpu_supports_bf16", lambda: False)
+    assert tts_engine.CpuProfile(precision="auto").resolve_precision() == "float32"
+    assert tts_engine.CpuProfile(precision="bfloat16").resolve_precision() == "float32"
+    monkeypatch.setattr(tts_engine, "cpu_supports_bf16", lambda: True)
+    assert tts_engine.CpuProfile(precision="auto").resolve_precision() == "bfloat16"
+    assert tts_engine.CpuProfile(precision="int8").resolve_precision() == "int8"
+
+
+class _Decoder(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.config = SimpleNamespace(num_quantizers=2)
+        self.calls = []
+
+    def forward(self, codes):
+        self.calls.append(tuple(codes.shape))
+        return codes.float()
+
+
+def _model_with_decoder():
+    decoder = _Decoder()
+    tokenizer = SimpleNamespace(model=SimpleNamespace(decoder=decoder))
+    return SimpleNamespace(model=SimpleNamespace(speech_tokenizer=tokenizer)), decoder
+
+
+def test_compiled_decoder_is_warmed_up(monkeypatch):
+    compiled_calls = []
+
+    def fake_compile(fn, **kwargs):
+        assert kwargs == {"dynamic": True}
+        return lambda codes: compiled_calls.append(codes.shape) or fn(codes)
+
+    monkeypatch.setattr(torch, "compile", fake_compile)
+    model, decoder = _model_with_decoder()
+    assert compile_speech_decoder(model, "cpu") == "on"
+    assert len(compiled_calls) == len(decoder.calls) == 2
+    assert decoder(torch.zeros((1, 2, 3), dtype=torch.long)).shape == (1, 2, 3)
+    assert len(compiled_calls) == 3
+
+
+def test_compile_failures_fall_back_to_eager(monkeypatch):
+    def broken(fn, **kwargs):
+        def run(codes):
+            raise RuntimeError("no C++ compiler")
+
+        return run
+
+    monkeypatch.setattr(torch, "compile", broken)
+    model, decoder = _model_with_decoder()
+    assert compile_speech_decoder(model, "cpu") == "failed"
+    assert decoder(torch.zeros((1, 2, 3), dtype=torch.long)).shape == (1, 2, 3)
+
+    monkeypatch.setattr(torch, "compile", lambda fn, **kwargs: 1 / 0)
+    model, decoder = _model_with_decoder()
+    assert compile_speech_decoder(model, "cpu") == "unsupported"
+    assert compile_speech_decoder(SimpleNamespace(model=SimpleNamespace()), "cpu") == "unsupported"
+
+
+def test_generate_methods_run_in_inference_mode():
+    import tts_engine
+
+    class Model:
+        def generate_custom_voice(self, text, instruct=None):
+            return torch.is_inference_mode_enabled()
+
+    model = Model()
+    tts_engine._use_inference_mode(model)
+    assert model.generate_custom_voice("hi")
+    assert not torch.is_inference_mode_enabled()
+    assert "instruct" in inspect.signature(model.generate_custom_voice).parameters
+
+
+def test_concurrent_requests_load_a_model_once(tmp_path, monkeypatch):
+    import tts_engine
+
+    loads = []
+
+    def slow_load(local_dir, device, dtype, cache, quantize):
+        loads.append(device)
+        time.sleep(0.1)
+        return SimpleNamespace(), SimpleNamespace(to_dict=dict)
+
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    manager = SimpleNamespace(root=tmp_path, _local_dir_for=lambda model_id: model_dir)
+    monkeypatch.setattr(tts_engine, "load_model", slow_load)
+    engine = tts_engine.TtsEngine(manager)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(engine._get_model_for_device("m", "cpu")))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert loads == ["cpu"]
+    assert len(results) == 3 and all(model is results[0] for model in results)
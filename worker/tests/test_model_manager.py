@@ -0,0 +1,239 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from model_manager import MANIFEST_NAME, ModelManager
+
+MODEL_ID = "Qwen/Qwen3-TTS-12Hz-0.6B-Base"
+FILES = {
+    "config.json": b"x" * 10,
+    "model.safetensors": bytes(range(256)) + b"w" * 44,
+    "speech_tokenizer/model.safetensors": b"t" * 90,
+}
+TOTAL_BYTES = sum(len(data) for data in FILES.values())
+
+
+class FakeHfApi:
+    def __init__(self):
+        self.calls = 0
+
+    def model_info(self, model_id, **kwargs):
+        self.calls += 1
+        siblings = [
+            SimpleNamespace(
+                rfilename=name,
+                size=len(data),
+                lfs=SimpleNamespace(sha256=hashlib.sha256(data).hexdigest())
+                if name.endswith(".safetensors")
+                else None,
+            )
+            for name, data in FILES.items()
+        ]
+        return SimpleNamespace(sha="abc123", siblings=siblings)
+
+
+class OfflineHfApi:
+    def model_info(self, model_id, **kwargs):
+        raise AssertionError("status must not reach the hub")
+
+
+class FakeHub(BaseHTTPRequestHandler):
+    files = FILES
+    ranges = []
+
+    def do_GET(self):
+        name = self.path.split("/resolve/abc123/", 1)[1]
+        data = self.files[name]
+        start = 0
+        if self.headers.get("Range"):
+            self.ranges.append((name, self.headers["Range"]))
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hub():
+    FakeHub.files = dict(FILES)
+    FakeHub.ranges = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeHub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager(tmp_path, hub):
+    manager = ModelManager(tmp_path, download_workers=2)
+    manager._hf_api = FakeHfApi()
+    manager.endpoint = f"http://127.0.0.1:{hub.server_address[1]}"
+    return manager
+
+
+def test_download_counts_bytes_without_walking_the_model_dir(manager, monkeypatch):
+    def no_walk(model_id):
+        raise AssertionError("downloaded bytes must come from the download itself")
+
+    local_dir = manager._local_dir_for(MODEL_ID)
+    local_dir.mkdir(parents=True)
+    (local_dir / "config.json").write_bytes(FILES["config.json"])
+    monkeypatch.setattr(manager, "get_downloaded_bytes", no_walk)
+    state = manager.download(MODEL_ID)
+    assert state.status == "completed", state.error
+    assert state.total_bytes == state.downloaded_bytes == TOTAL_BYTES
+    assert state.transferred_bytes == TOTAL_BYTES - 10
+    assert {file.status for file in state.files.values()} == {"completed"}
+    for name, data in FILES.items():
+        assert (local_dir / name).read_bytes() == data
+    manager.update_progress(MODEL_ID)
+    assert manager._hf_api.calls == 1
+
+
+def test_sizes_persist_and_status_stays_offline(manager, tmp_path):
+    manager.download(MODEL_ID)
+    restarted = ModelManager(tmp_path)
+    restarted._hf_api = OfflineHfApi()
+    assert restarted.get_total_bytes(MODEL_ID) == TOTAL_BYTES
+    for entry in restarted.list_required_models():
+        state = restarted.ensure_download_state(entry["model_id"])
+        restarted.update_progress(entry["model_id"])
+        expected = "completed" if entry["model_id"] == MODEL_ID else "pending"
+        assert state.status == expected
+
+
+def test_legacy_folder_size_is_not_remembered_as_total(tmp_path):
+    manager = ModelManager(tmp_path)
+    manager._hf_api = OfflineHfApi()
+    local_dir = manager._local_dir_for(MODEL_ID)
+    local_dir.mkdir(parents=True)
+    (local_dir / "config.json").write_bytes(FILES["config.json"])
+    state = manager.ensure_download_state(MODEL_ID)
+    assert state.total_bytes == state.downloaded_bytes == 10
+
+    restarted = ModelManager(tmp_path)
+    assert MODEL_ID not in restarted._total_bytes
+
+
+def test_download_writes_manifest_used_for_offline_status(manager, tmp_path):
+    manager.download(MODEL_ID)
+    manifest = manager.read_manifest(MODEL_ID)
+    assert manifest["files"]["config.json"] == {
+        "size": 10,
+        "sha256": hashlib.sha256(FILES["config.json"]).hexdigest(),
+    }
+
+    restarted = ModelManager(tmp_path)
+    restarted._hf_api = OfflineHfApi()
+    assert restarted.is_downloaded(MODEL_ID)
+    (restarted._local_dir_for(MODEL_ID) / "model.safetensors").unlink()
+    assert not restarted.is_downloaded(MODEL_ID)
+    state = restarted.ensure_download_state(MODEL_ID)
+    assert (state.status, state.downloaded_bytes) == ("pending", 100)
+
+
+def test_download_resumes_partial_files(manager):
+    local_dir = manager._local_dir_for(MODEL_ID)
+    local_dir.mkdir(parents=True)
+    (local_dir / "model.safetensors.part").write_bytes(FILES["model.safetensors"][:120])
+    state = manager.download(MODEL_ID)
+    assert state.status == "completed", state.error
+    assert FakeHub.ranges == [("model.safetensors", "bytes=120-")]
+    assert state.files["model.safetensors"].resumed_from == 120
+    assert (local_dir / "model.safetensors").read_bytes() == FILES["model.safetensors"]
+    assert not (local_dir / "model.safetensors.part").exists()
+
+
+def test_download_rejects_corrupt_files(manager):
+    FakeHub.files["model.safetensors"] = b"?" * len(FILES["model.safetensors"])
+    state = manager.download(MODEL_ID)
+    assert state.status == "error"
+    assert "SHA-256 mismatch" in state.error
+    assert state.files["model.safetensors"].status == "error"
+    local_dir = manager._local_dir_for(MODEL_ID)
+    assert not (local_dir / "model.safetensors").exists()
+    assert not (local_dir / "model.safetensors.part").exists()
+    assert manager.read_manifest(MODEL_ID) is None
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, manager):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "model_manager", manager)
+    return TestClient(app_module.app)
+
+
+def test_models_status_endpoint_without_network(client, manager):
+    manager.download(MODEL_ID)
+    manager.downloads.clear()
+    manager._hf_api = OfflineHfApi()
+    models = {model["modelId"]: model for model in client.get("/models/status").json()["models"]}
+    assert models[MODEL_ID]["status"] == "completed"
+    assert models[MODEL_ID]["totalBytes"] == TOTAL_BYTES
+    assert models["Qwen/Qwen3-TTS-12Hz-1.7B-Base"]["status"] == "pending"
+    response = client.post("/models/download", json={"model_id": MODEL_ID})
+    assert response.json()["ok"]
+
+
+def test_models_refresh_runs_in_background(client, manager):
+    response = client.post("/models/refresh")
+    assert response.status_code == 202
+    job_id = response.json()["jobId"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] == "completed":
+            break
+        time.sleep(0.02)
+    assert job["result"][MODEL_ID] == {"ok": True, "total_bytes": TOTAL_BYTES}
+    assert manager._hf_api.calls == len(manager.list_required_models())
+    assert not (manager._local_dir_for(MODEL_ID) / MANIFEST_NAME).exists()
+
+
+def test_download_events_report_per_file_progress(client, manager):
+    manager.download(MODEL_ID)
+    body = client.get("/models/download/events", params={"model_id": MODEL_ID}).text
+    event = json.loads(body.removeprefix("data: ").strip())
+    assert event["stage"] == "completed"
+    assert event["pct"] == 100
+    assert {file["name"]: file["downloaded"] for file in event["files"]} == {
+        name: len(data) for name, data in FILES.items()
+    }
+
+
+def test_models_preload_loads_in_background(client, manager, monkeypatch):
+    import app as app_module
+    from model_loading import LoadTimings
+
+    class FakeEngine:
+        load_timings = {}
+
+        def get_model_for_backend(self, model_id, backend):
+            self.load_timings[(model_id, "cpu")] = LoadTimings(device="cpu", dtype="float32")
+            return object(), "cpu", None
+
+    monkeypatch.setattr(app_module, "engine", FakeEngine())
+    assert client.post("/models/preload", json={"model_id": MODEL_ID}).status_code == 409
+
+    manager.download(MODEL_ID)
+    response = client.post("/models/preload", json={"model_id": MODEL_ID})
+    assert response.status_code == 202
+    job_id = response.json()["jobId"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] == "completed":
+            break
+        time.sleep(0.02)
+    assert job["result"]["models"][MODEL_ID]["device"] == "cpu"
+    assert app_module._preload_model_ids("base:0.6b, nope:1b") == [MODEL_ID]
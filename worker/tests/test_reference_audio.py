@@ -0,0 +1,83 @@
+import io
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+from reference_audio import ReferenceAudioTooLarge, decode_reference_audio
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def _encoded(seconds: float, sample_rate: int, fmt: str, channels: int = 1) -> io.BytesIO:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = 0.5 * np.sin(2 * np.pi * 220 * t)
+    audio = np.stack([tone] * channels, axis=1).astype(np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format=fmt)
+    buffer.seek(0)
+    return buffer
+
+
+def test_wav_is_downmixed_resampled_and_truncated():
+    upload = _encoded(3.0, 48000, "WAV", channels=2)
+    audio = decode_reference_audio(upload, "ref.WAV", 24000, max_seconds=2.0)
+    assert audio.dtype == np.float32
+    assert audio.ndim == 1
+    assert len(audio) == 48000
+    assert 0.45 < np.abs(audio[1000:-1000]).max() < 0.55
+
+
+def test_undecodable_wav_is_rejected():
+    with pytest.raises(ValueError):
+        decode_reference_audio(io.BytesIO(b"not audio"), "ref.wav", 24000)
+
+
+@needs_ffmpeg
+def test_ffmpeg_pipe_decodes_first_seconds():
+    upload = _encoded(5.0, 44100, "OGG")
+    audio = decode_reference_audio(upload, "ref.ogg", 24000, max_seconds=1.5)
+    assert len(audio) == 36000
+    assert 0.4 < np.abs(audio[1000:]).max() < 0.6
+
+
+@needs_ffmpeg
+def test_ffmpeg_pipe_enforces_size_limit():
+    upload = _encoded(5.0, 44100, "WAV")
+    with pytest.raises(ReferenceAudioTooLarge):
+        decode_reference_audio(upload, "ref.m4a", 24000, max_bytes=64 * 1024)
+
+
+@needs_ffmpeg
+def test_ffmpeg_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_reference_audio(io.BytesIO(b"\x00" * 4096), "ref.mp3", 24000)
+
+
+def _m4a_with_index_at_end(tmp_path, seconds: float) -> io.BytesIO:
+    source = tmp_path / "source.wav"
+    target = tmp_path / "clip.m4a"
+    source.write_bytes(_encoded(seconds, 44100, "WAV").read())
+    # The default mp4 muxer writes the moov atom after the media data, like phone recordings.
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", str(source), "-c:a", "aac", str(target)],
+        check=True,
+    )
+    data = target.read_bytes()
+    assert data.index(b"moov") > data.index(b"mdat")
+    return io.BytesIO(data)
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("filename", ["ref.m4a", "ref.bin"])
+def test_ffmpeg_decodes_m4a_with_index_at_end(tmp_path, monkeypatch, filename):
+    upload = _m4a_with_index_at_end(tmp_path, 2.0)
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spool))
+    audio = decode_reference_audio(upload, filename, 24000)
+    assert abs(len(audio) - 48000) < 2400
+    assert 0.4 < np.abs(audio[2000:-2000]).max() < 0.6
+    assert list(spool.iterdir()) == []
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_utils import resolve_audio_format
+from render_pipeline import StreamingRenderWriter
+from text_pipeline import StreamingStitcher, stitch_audio
+
+
+def _chunks(sample_rate):
+    rng = np.random.default_rng(0)
+    lengths = [sample_rate, 20, sample_rate // 2, 0, sample_rate // 3]
+    return [rng.uniform(-0.5, 0.5, size=length).astype(np.float32) for length in lengths]
+
+
+def test_streaming_stitcher_matches_stitch_audio():
+    sample_rate = 1000
+    chunks = _chunks(sample_rate)
+    stitcher = StreamingStitcher(sample_rate, crossfade_ms=50)
+    streamed = np.concatenate([stitcher.push(chunk) for chunk in chunks] + [stitcher.flush()])
+    expected = stitch_audio(chunks, sample_rate, crossfade_ms=50)
+    np.testing.assert_allclose(streamed, expected, atol=1e-6)
+
+
+def test_render_writer_writes_stitched_audio(tmp_path):
+    sample_rate = 24000
+    chunks = _chunks(sample_rate)
+    path = tmp_path / "out.wav"
+    with StreamingRenderWriter(path, resolve_audio_format("wav", sample_rate), sample_rate) as w:
+        for chunk in chunks:
+            w.add(chunk, sample_rate)
+    written, sr = sf.read(str(path), dtype="float32")
+    expected = stitch_audio(chunks, sample_rate)
+    assert sr == sample_rate
+    assert w.frames == len(expected) == len(written)
+    np.testing.assert_allclose(written, expected, atol=1.0 / 32767 + 1e-6)
+    assert not (tmp_path / "out.wav.part").exists()
+
+
+def test_render_writer_discards_partial_file_on_error(tmp_path):
+    path = tmp_path / "out.flac"
+    with pytest.raises(RuntimeError):
+        with StreamingRenderWriter(path, resolve_audio_format("flac", 24000), 24000) as writer:
+            writer.add(np.zeros(24000, dtype=np.float32), 24000)
+            raise RuntimeError("model failed")
+    assert list(tmp_path.iterdir()) == []
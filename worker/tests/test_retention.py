@@ -0,0 +1,119 @@
+import os
+from datetime import datetime, timedelta
+
+from retention import OutputJanitor, RetentionPolicy
+from storage import Database, clear_directory
+
+
+def _add_output(db, outputs, job_id, created_at, size, project_id=None):
+    path = outputs / f"{job_id}.wav"
+    path.write_bytes(b"\x00" * size)
+    db.add_history(
+        {
+            "job_id": job_id,
+            "text": job_id,
+            "voice_id": "preset::a",
+            "output_path": str(path),
+            "created_at": created_at.isoformat() + "Z",
+            "project_id": project_id,
+        }
+    )
+    return path
+
+
+def _setup(tmp_path, policy):
+    db = Database(tmp_path / "history.db")
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    janitor = OutputJanitor(db, tmp_path / "retention.json")
+    janitor.update_policy(policy)
+    return db, outputs, janitor
+
+
+def test_sweep_evicts_oldest_until_under_budget(tmp_path):
+    db, outputs, janitor = _setup(tmp_path, RetentionPolicy(max_bytes=250))
+    now = datetime(2026, 1, 10)
+    old = _add_output(db, outputs, "old", now - timedelta(hours=3), 100)
+    mid = _add_output(db, outputs, "mid", now - timedelta(hours=2), 100)
+    new = _add_output(db, outputs, "new", now - timedelta(hours=1), 100)
+
+    result = janitor.sweep(now)
+
+    assert result.evicted == 1
+    assert result.freed_bytes == 100
+    assert result.retained_bytes == 200
+    assert not old.exists()
+    assert mid.exists() and new.exists()
+    assert db.get_history("old")["evicted_at"] is not None
+    assert db.get_history("mid")["evicted_at"] is None
+
+
+def test_sweep_keeps_pinned_projects_and_marks_missing_files(tmp_path):
+    db, outputs, janitor = _setup(tmp_path, RetentionPolicy(max_age_days=1))
+    now = datetime(2026, 1, 10)
+    db.create_project("p1", "Book", now.isoformat() + "Z")
+    db.set_project_pinned("p1", True)
+    pinned = _add_output(db, outputs, "pinned", now - timedelta(days=5), 10, project_id="p1")
+    stale = _add_output(db, outputs, "stale", now - timedelta(days=5), 10)
+    gone = _add_output(db, outputs, "gone", now, 10)
+    gone.unlink()
+
+    result = janitor.sweep(now)
+
+    assert result.evicted == 2
+    assert pinned.exists()
+    assert not stale.exists()
+    assert db.get_history("gone")["evicted_at"] is not None
+    assert janitor.sweep(now).evicted == 0
+
+
+def test_zero_max_age_expires_everything(tmp_path):
+    db, outputs, janitor = _setup(tmp_path, RetentionPolicy(max_age_days=0))
+    now = datetime(2026, 1, 10)
+    recent = _add_output(db, outputs, "recent", now - timedelta(minutes=1), 10)
+
+    assert janitor.sweep(now).evicted == 1
+    assert not recent.exists()
+
+
+def test_batch_archives_count_toward_the_budget_and_age_out(tmp_path):
+    db = Database(tmp_path / "history.db")
+    outputs = tmp_path / "outputs"
+    archives = outputs / "batches"
+    archives.mkdir(parents=True)
+    janitor = OutputJanitor(db, tmp_path / "retention.json", archives)
+    janitor.update_policy(RetentionPolicy(max_bytes=250))
+    now = datetime(2026, 1, 10)
+    old_archive = archives / "old.zip"
+    old_archive.write_bytes(b"\x00" * 100)
+    stamp = (now - timedelta(hours=4) - datetime(1970, 1, 1)).total_seconds()
+    os.utime(old_archive, (stamp, stamp))
+    mid = _add_output(db, outputs, "mid", now - timedelta(hours=2), 100)
+    new = _add_output(db, outputs, "new", now - timedelta(hours=1), 100)
+
+    result = janitor.sweep(now)
+
+    assert (result.evicted, result.freed_bytes, result.retained_bytes) == (1, 100, 200)
+    assert not old_archive.exists()
+    assert mid.exists() and new.exists()
+
+    recent_archive = archives / "recent.zip"
+    recent_archive.write_bytes(b"\x00" * 10)
+    janitor.update_policy(RetentionPolicy(max_age_days=0))
+    assert janitor.sweep(datetime.utcnow() + timedelta(seconds=1)).evicted == 3
+    assert not recent_archive.exists()
+
+
+def test_policy_round_trips_through_disk(tmp_path):
+    _, _, janitor = _setup(tmp_path, RetentionPolicy(max_bytes=1024, keep_pinned_projects=False))
+    reloaded = OutputJanitor(janitor.db, tmp_path / "retention.json")
+    assert reloaded.policy == RetentionPolicy(max_bytes=1024, keep_pinned_projects=False)
+
+
+def test_clear_directory_keeps_root(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "c.wav").write_bytes(b"x")
+    (tmp_path / "d.wav").write_bytes(b"x")
+    clear_directory(tmp_path)
+    assert tmp_path.exists()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+from router import (
+    SPILL_MARGIN,
+    WorkerPool,
+    WorkerProcess,
+    affinity_key,
+    create_router_app,
+    pick_worker,
+    worker_command,
+)
+
+
+class FakeWorker(BaseHTTPRequestHandler):
+    def _reply(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply({"ok": True, "version": "1.0.0"})
+            return
+        if self.path == "/memory":
+            self._reply({"rssBytes": 300, "pssBytes": 200, "privateBytes": 50, "models": []})
+            return
+        if self.path == "/scheduler":
+            self._reply({"lanes": {"interactive": {"waiting": self.server.index}}})
+            return
+        self._reply({"worker": self.server.index, "path": self.path})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply({"worker": self.server.index, "path": self.path, "body": body.decode()}, 201)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servers():
+    started = []
+    for index in range(2):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWorker)
+        server.index = index
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append(server)
+    yield started
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def pool(servers):
+    pool = WorkerPool(len(servers))
+    pool.workers = [
+        WorkerProcess(index=server.index, port=server.server_address[1]) for server in servers
+    ]
+    return pool
+
+
+def _voice_for(workers, index):
+    return next(
+        f"preset::voice-{n}"
+        for n in range(100)
+        if pick_worker(workers, f"preset::voice-{n}|0.6b").index == index
+    )
+
+
+def test_stateful_requests_go_to_the_primary(pool):
+    with TestClient(create_router_app(pool, asyncio.Event())) as client:
+        response = client.get("/jobs/abc", params={"kind": "tts"})
+        assert response.json() == {"worker": 0, "path": "/jobs/abc?kind=tts"}
+        response = client.post("/voices/design", json={"name": "x"})
+        assert response.status_code == 201
+        assert response.json()["worker"] == 0
+        assert json.loads(response.json()["body"]) == {"name": "x"}
+
+
+def test_synthesis_is_routed_by_voice_affinity(pool):
+    with TestClient(create_router_app(pool, asyncio.Event())) as client:
+        for index in (0, 1):
+            payload = {"voiceId": _voice_for(pool.workers, index), "modelSize": "0.6b"}
+            for _ in range(3):
+                response = client.post("/tts", json=payload)
+                assert response.json()["worker"] == index
+    assert [worker.in_flight for worker in pool.workers] == [0, 0]
+
+
+def test_busy_workers_spill_over(pool):
+    key = affinity_key(json.dumps({"voice_id": "preset::a", "model_size": "1.7b"}).encode())
+    assert key == "preset::a|1.7b"
+    preferred = pick_worker(pool.workers, key)
+    # Steady load keeps the voice on its warm worker.
+    preferred.in_flight = SPILL_MARGIN
+    assert pick_worker(pool.workers, key) is preferred
+    preferred.in_flight = SPILL_MARGIN + 1
+    assert pick_worker(pool.workers, key) is not preferred
+    assert pick_worker(pool.workers, key, margin=0) is not preferred
+    assert affinity_key(b"not json") == ""
+
+
+def test_health_is_aggregated(pool, servers):
+    with TestClient(create_router_app(pool, asyncio.Event())) as client:
+        response = client.get("/health")
+        assert response.status_code == 200
+        assert response.json()["ok"] and response.json()["version"] == "1.0.0"
+        servers[1].shutdown()
+        servers[1].server_close()
+        response = client.get("/health")
+        assert response.status_code == 503
+        assert [worker["ok"] for worker in response.json()["workers"]] == [True, False]
+
+
+def test_memory_is_totalled_across_workers(pool):
+    with TestClient(create_router_app(pool, asyncio.Event())) as client:
+        data = client.get("/memory").json()
+    assert data["totalRssBytes"] == 600
+    assert data["totalPssBytes"] == 400
+    assert data["totalPrivateBytes"] == 100
+    assert [worker["index"] for worker in data["workers"]] == [0, 1]
+
+
+def test_scheduler_stats_are_listed_per_worker(pool):
+    with TestClient(create_router_app(pool, asyncio.Event())) as client:
+        workers = client.get("/scheduler").json()["workers"]
+    assert [worker["lanes"]["interactive"]["waiting"] for worker in workers] == [0, 1]
+
+
+def test_shutdown_is_local_only(pool):
+    event = asyncio.Event()
+    with TestClient(create_router_app(pool, event)) as client:
+        assert client.post("/shutdown").status_code == 403
+    assert not event.is_set()
+
+
+def test_worker_command_runs_single_process_workers(monkeypatch):
+    assert worker_command("info")[1].endswith("worker_main.py")
+    assert worker_command("info")[-2:] == ["--workers", "1"]
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    assert worker_command("debug")[:2] == [sys.executable, "--host"]
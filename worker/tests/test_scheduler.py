@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+from scheduler import BULK, INTERACTIVE, InferenceScheduler
+
+
+def _run_in_slot(scheduler, lane, started, release, order):
+    with scheduler.slot(lane):
+        order.append(lane)
+        started.set()
+        release.wait(5)
+
+
+def test_bulk_yields_to_queued_interactive_work_between_chunks():
+    scheduler = InferenceScheduler(interactive_slots=1, bulk_slots=1)
+    order = []
+    bulk_started, bulk_release = threading.Event(), threading.Event()
+    preview_started, preview_release = threading.Event(), threading.Event()
+    bulk = threading.Thread(
+        target=_run_in_slot, args=(scheduler, BULK, bulk_started, bulk_release, order)
+    )
+    bulk.start()
+    assert bulk_started.wait(5)
+
+    # Previews do not wait for the bulk chunk already running.
+    preview = threading.Thread(
+        target=_run_in_slot,
+        args=(scheduler, INTERACTIVE, preview_started, preview_release, order),
+    )
+    preview.start()
+    assert preview_started.wait(5)
+
+    # The render's next chunk waits until the preview is done.
+    next_started, next_release = threading.Event(), threading.Event()
+    next_chunk = threading.Thread(
+        target=_run_in_slot, args=(scheduler, BULK, next_started, next_release, order)
+    )
+    bulk_release.set()
+    bulk.join(5)
+    next_chunk.start()
+    assert not next_started.wait(0.2)
+    assert scheduler.stats()[BULK]["waiting"] == 1
+    preview_release.set()
+    assert next_started.wait(5)
+    next_release.set()
+    for thread in (preview, next_chunk):
+        thread.join(5)
+    assert order == [BULK, INTERACTIVE, BULK]
+
+
+def test_lane_limits_and_wait_metrics():
+    scheduler = InferenceScheduler(interactive_slots=2, bulk_slots=1)
+    release = threading.Event()
+    threads = []
+    for _ in range(3):
+        thread = threading.Thread(
+            target=_run_in_slot,
+            args=(scheduler, INTERACTIVE, threading.Event(), release, []),
+        )
+        thread.start()
+        threads.append(thread)
+    deadline = time.monotonic() + 5
+    while scheduler.stats()[INTERACTIVE]["waiting"] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = scheduler.stats()[INTERACTIVE]
+    assert (stats["running"], stats["waiting"], stats["limit"]) == (2, 1, 2)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    stats = scheduler.stats()[INTERACTIVE]
+    assert (stats["running"], stats["waiting"], stats["admitted"]) == (0, 0, 3)
+    assert stats["wait_max_ms"] >= 50
+    assert stats["wait_p50_ms"] < stats["wait_max_ms"]
+
+
+def test_unknown_lane_and_invalid_limits_are_rejected(monkeypatch):
+    with pytest.raises(ValueError):
+        InferenceScheduler(bulk_slots=0)
+    with pytest.raises(ValueError):
+        with InferenceScheduler().slot("urgent"):
+            pass
+    monkeypatch.setenv("OPENVOICELAB_BULK_SLOTS", "3")
+    assert InferenceScheduler.from_env().stats()[BULK]["limit"] == 3
+
+
+def test_lanes_have_their_own_threads():
+    scheduler = InferenceScheduler(interactive_slots=1, bulk_slots=1, lane_threads=2)
+    release = threading.Event()
+    # More bulk renders than bulk threads: the extra ones queue for a bulk thread.
+    renders = [scheduler.executor(BULK).submit(release.wait, 5) for _ in range(4)]
+    # Threads are not tied to slots, so a request between model calls does not hold up the next.
+    held = scheduler.executor(INTERACTIVE).submit(release.wait, 5)
+    preview = scheduler.executor(INTERACTIVE).submit(lambda: "preview")
+    assert preview.result(timeout=1) == "preview"
+    release.set()
+    assert held.result(timeout=5)
+    assert all(render.result(timeout=5) for render in renders)
+    with pytest.raises(ValueError):
+        scheduler.executor("urgent")
+    with pytest.raises(ValueError):
+        InferenceScheduler(lane_threads=0)
@@ -1,4 +1,8 @@
+import tracemalloc
+
+import numpy as np
 from app import _iter_pcm_frames
+from audio_utils import PcmConverter
 
 
 def test_iter_pcm_frames_handles_partial_frame():
@@ -9,3 +13,33 @@ def test_iter_pcm_frames_handles_partial_frame():
     assert frames
     assert len(frames[0]) == int(sample_rate * 0.02) * 2
     assert len(frames[-1]) < len(frames[0])
+
+
+def test_pcm_converter_matches_int16_conversion():
+    audio = np.linspace(-1.5, 1.5, 4801).astype(np.float32)
+    expected = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+    converter = PcmConverter()
+    assert bytes(converter.convert(audio)) == expected
+    assert bytes(converter.convert(audio[:10])) == expected[:20]
+
+
+def test_pcm_streaming_path_does_not_allocate_per_second():
+    sample_rate = 24000
+    chunks = [
+        np.random.default_rng(seed).uniform(-1, 1, sample_rate).astype(np.float32)
+        for seed in range(10)
+    ]
+    converter = PcmConverter()
+    for _ in _iter_pcm_frames(converter.convert(chunks[0]), sample_rate):
+        pass
+
+    tracemalloc.start()
+    try:
+        for chunk in chunks:
+            for frame in _iter_pcm_frames(converter.convert(chunk), sample_rate):
+                assert len(frame) == sample_rate // 50 * 2
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Ten seconds of audio; the old path held ~5 copies of each chunk (~100 KB per second).
+    assert peak < 4096
@@ -1,14 +1,17 @@
 import numpy as np
 from text_pipeline import (
     BreakSegment,
+    ChunkProfile,
     TextSegment,
     apply_pronunciation,
     break_to_seconds,
     chunk_text,
     hints_to_style,
+    load_chunk_profiles,
     parse_break_sentinels,
     parse_ssml_lite,
     parse_ssml_lite_segments,
+    plan_chunks,
     stitch_audio,
 )
 
@@ -47,6 +50,44 @@ def test_chunking_and_stitching():
     assert stitched.shape[0] > 0
 
 
+def test_chunk_text_balances_and_caps_lengths():
+    text = "First sentence here. " * 30 + "Short end."
+    chunks = chunk_text(text, max_chars=400, target_chars=300)
+    lengths = [len(chunk) for chunk in chunks]
+    assert len(chunks) == 3
+    assert max(lengths) - min(lengths) < 30
+    assert " ".join(chunks) == text.strip()
+
+    run_on = "and then it went on, " * 40
+    assert all(len(chunk) <= 100 for chunk in chunk_text(run_on, max_chars=100))
+    assert chunk_text("x" * 25, max_chars=10) == ["x" * 9, "x" * 9, "x" * 7]
+
+
+def test_chunk_text_splits_cjk_terminators():
+    chunks = chunk_text("今日は晴れです。明日は雨でしょう！本当？はい。", max_chars=10)
+    assert chunks == ["今日は晴れです。", "明日は雨でしょう！", "本当？はい。"]
+    assert chunk_text("It costs 3.5 dollars.") == ["It costs 3.5 dollars."]
+
+
+def test_plan_chunks_short_first_chunk(tmp_path):
+    profile = ChunkProfile(max_chars=300, target_chars=200, first_chunk_chars=40)
+    text = "A fairly short opening line. " * 12
+    leading = plan_chunks(text, profile, leading=True)
+    assert len(leading[0]) <= 40
+    assert len(plan_chunks(text, profile)[0]) > 40
+
+    opening = "This opening sentence, which runs on for quite a while, keeps going " * 2 + "end."
+    chunks = chunk_text(opening + " Second one. Third sentence here.", 240, 160, 80)
+    assert len(chunks[0]) <= 80
+    assert " ".join(chunks) == opening + " Second one. Third sentence here."
+
+    path = tmp_path / "chunk_profiles.json"
+    path.write_text('{"0.6b": {"stream": {"max_chars": 120, "target_chars": 90}}}')
+    profiles = load_chunk_profiles(path)
+    assert profiles[("0.6b", "stream")] == ChunkProfile(max_chars=120, target_chars=90)
+    assert profiles[("1.7b", "stream")].first_chunk_chars
+
+
 def test_parse_break_sentinels():
     text, _ = parse_ssml_lite('Hello <break time="300ms"/> world')
     segments = parse_break_sentinels(text)
@@ -76,3 +117,27 @@ def test_parse_ssml_lite_segments_breaks():
     assert isinstance(segments[1], BreakSegment)
     assert isinstance(segments[2], TextSegment)
     assert segments[1].seconds == 0.3
+
+
+def test_parse_ssml_lite_segments_sub_say_as_and_voice():
+    segments = parse_ssml_lite_segments(
+        'Call <say-as interpret-as="telephone">555-1234</say-as> about '
+        '<sub alias="World Wide Web Consortium">W3C</sub>. '
+        '<voice name="Ryan">Hi <emphasis level="strong">there</emphasis></voice>'
+        '<bogus>ok</bogus><prosody rate="medium">!</prosody>'
+    )
+    assert segments[0].text == "Call 5 5 5, 1 2 3 4 about World Wide Web Consortium. "
+    assert (segments[1].text, segments[1].voice, segments[1].emphasis) == ("Hi ", "Ryan", None)
+    assert (segments[2].text, segments[2].voice, segments[2].emphasis) == (
+        "there",
+        "Ryan",
+        "strong",
+    )
+    assert (segments[3].text, segments[3].voice, segments[3].rate) == ("ok!", None, None)
+
+
+def test_parse_ssml_lite_segments_merges_many_runs():
+    text = "".join(f"word{i} <bogus/>" for i in range(5000))
+    segments = parse_ssml_lite_segments(text)
+    assert len(segments) == 1
+    assert segments[0].text.count("word") == 5000
@@ -0,0 +1,322 @@
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+from storage import Database
+
+
+class FakeCustomVoiceModel:
+    def __init__(self):
+        self.calls = []
+        self.speakers = []
+
+    def generate_custom_voice(self, text, speaker, language, instruct, non_streaming_mode):
+        texts = text if isinstance(text, list) else [text]
+        self.calls.append(texts)
+        self.speakers.append(speaker)
+        if any("boom" in item for item in texts):
+            raise ValueError("model rejected text")
+        silence = np.zeros(4800, dtype=np.float32)
+        wavs = [
+            np.concatenate([silence, np.full(len(item) * 100, 0.25, dtype=np.float32), silence])
+            for item in texts
+        ]
+        return wavs, 24000
+
+
+@pytest.fixture
+def fake_model():
+    return FakeCustomVoiceModel()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, fake_model):
+    import app as app_module
+
+    monkeypatch.setattr(app_module.paths, "outputs", tmp_path / "outputs")
+    monkeypatch.setattr(app_module, "db", Database(tmp_path / "history.db"))
+    monkeypatch.setattr(
+        app_module.engine,
+        "_get_model_for_device",
+        lambda model_id, device: fake_model,
+    )
+    return TestClient(app_module.app)
+
+
+def _payload(**overrides):
+    payload = {
+        "voiceId": "preset::female-1",
+        "text": 'Hello there. <break time="100ms"/> General Kenobi.',
+        "language": "Auto",
+        "modelSize": "0.6b",
+        "backend": "cpu",
+        "sampleRate": 16000,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_tts_renders_file_at_requested_rate(client):
+    response = client.post("/tts", json=_payload(outputFormat="flac"))
+    assert response.status_code == 200
+    data = response.json()
+    assert data["outputPath"].endswith(".flac")
+    audio, sr = sf.read(data["outputPath"], dtype="float32")
+    assert sr == 16000
+    assert abs(len(audio) / sr * 1000 - data["durationMs"]) <= 1
+
+    history = client.get(f"/history/{data['jobId']}").json()
+    assert history["outputPath"] == data["outputPath"]
+
+
+def test_tts_stream_pcm(client):
+    with client.stream("POST", "/tts/stream", json=_payload()) as response:
+        assert response.status_code == 200
+        assert response.headers["X-Audio-Format"] == "pcm_s16le"
+        body = b"".join(response.iter_bytes())
+    assert len(body) % 2 == 0
+    assert len(body) > 0
+
+
+def test_tts_rejects_unknown_output_format(client):
+    response = client.post("/tts", json=_payload(outputFormat="aiff"))
+    assert response.status_code == 400
+
+
+def test_tts_batch_reports_partial_failures_and_archives(client, fake_model):
+    payload = _payload(
+        items=[
+            {"text": "One.", "itemId": "a"},
+            {"text": 'Bad <break time="soon"/> break.', "itemId": "b"},
+            {"text": "Two words.", "itemId": "c"},
+            {"text": "boom", "itemId": "d"},
+        ],
+        archive="zip",
+    )
+    del payload["text"]
+    response = client.post("/tts/batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert data["failed"] == 2
+    results = {result["itemId"]: result for result in data["results"]}
+    assert results["a"]["ok"] and results["c"]["ok"]
+    assert not results["b"]["ok"] and results["b"]["error"]
+    assert results["d"]["error"] == "model rejected text"
+    assert len(fake_model.calls[0]) == 3
+
+    with zipfile.ZipFile(data["archivePath"]) as archive:
+        assert sorted(archive.namelist()) == ["00000_a.wav", "00002_c.wav"]
+    for item_id in ("a", "c"):
+        history = client.get(f"/history/{results[item_id]['jobId']}").json()
+        assert history["outputPath"] == results[item_id]["outputPath"]
+
+
+def test_tts_loudness_options(client):
+    response = client.post("/tts", json=_payload(loudnessLufs=-18.0, truePeakDb=-1.5))
+    assert response.status_code == 200
+    audio, _ = sf.read(response.json()["outputPath"], dtype="float32")
+    assert np.abs(audio).max() <= 10 ** (-1.5 / 20) + 1e-3
+
+    response = client.post("/tts", json=_payload(loudnessLufs=2.0))
+    assert response.status_code == 400
+
+
+def test_tts_trims_chunk_silence_and_inserts_sentence_gap(client):
+    text = "First sentence here. " * 30 + "Second chunk starts."
+    untrimmed = client.post("/tts", json=_payload(text=text, trimSilence=False)).json()
+    trimmed = client.post("/tts", json=_payload(text=text, sentenceGapMs=100)).json()
+    # Two model chunks, each padded with 200 ms of silence either side.
+    assert untrimmed["durationMs"] - trimmed["durationMs"] > 500
+    bad = client.post("/tts", json=_payload(sentenceGapMs=-1))
+    assert bad.status_code == 400
+
+
+def test_tts_groups_voice_tags_by_voice(client, fake_model):
+    text = 'Narrator one. <voice name="Ryan">Ryan speaks.</voice> Narrator two.'
+    response = client.post("/tts", json=_payload(text=text, trimSilence=False, sentenceGapMs=0))
+    assert response.status_code == 200
+    assert sorted(zip(fake_model.speakers, fake_model.calls)) == [
+        ("Ryan", ["Ryan speaks."]),
+        ("female-1", ["Narrator one.", "Narrator two."]),
+    ]
+    # 38 chars at 100 samples each, 0.4 s of padding per chunk, two 50 ms crossfades.
+    assert abs(response.json()["durationMs"] - (3800 / 24 + 3 * 400 - 2 * 50)) <= 2
+
+
+def test_tts_stream_switches_voices_in_document_order(client, fake_model):
+    text = 'One. <voice name="preset::Ryan">Two.</voice> Three.'
+    with client.stream("POST", "/tts/stream", json=_payload(text=text)) as response:
+        assert response.status_code == 200
+        body = b"".join(response.iter_bytes())
+    assert body
+    assert fake_model.speakers == ["female-1", "Ryan", "female-1"]
+
+
+def test_tts_priority_selects_scheduler_lane(client, monkeypatch):
+    import app as app_module
+    from scheduler import InferenceScheduler
+
+    monkeypatch.setattr(app_module, "scheduler", InferenceScheduler())
+    assert client.post("/tts", json=_payload()).status_code == 200
+    response = client.post("/tts/batch", json=_payload(items=[{"text": "One."}, {"text": "Two."}]))
+    assert response.status_code == 200
+    assert client.post("/tts", json=_payload(priority="urgent")).status_code == 400
+
+    lanes = client.get("/scheduler").json()["lanes"]
+    assert lanes["interactive"]["admitted"] == 2
+    assert lanes["bulk"]["admitted"] == 1
+    assert lanes["bulk"]["limit"] == 1
+    assert {"waiting", "running", "waitP50Ms", "waitP95Ms", "waitMaxMs"} <= set(lanes["bulk"])
+
+
+def test_previews_and_streams_run_between_chunks_of_a_long_render(client, monkeypatch):
+    import render_pipeline
+
+    paused, resume = threading.Event(), threading.Event()
+    add = render_pipeline.StreamingRenderWriter.add
+
+    def pausing_add(writer, audio, source_rate):
+        # The render stops after its first chunk, outside the model slot.
+        if not paused.is_set():
+            paused.set()
+            resume.wait(10)
+        return add(writer, audio, source_rate)
+
+    monkeypatch.setattr(render_pipeline.StreamingRenderWriter, "add", pausing_add)
+    text = ' <break time="10ms"/> '.join(f"Sentence number {index}." for index in range(5))
+    responses = []
+    render = threading.Thread(
+        target=lambda: responses.append(client.post("/tts", json=_payload(text=text)))
+    )
+    render.start()
+    try:
+        assert paused.wait(5)
+        assert client.post("/tts", json=_payload(text="Preview.")).status_code == 200
+        with client.stream("POST", "/tts/stream", json=_payload(text="Live.")) as response:
+            assert response.status_code == 200
+            assert b"".join(response.iter_bytes())
+        assert render.is_alive()
+    finally:
+        resume.set()
+        render.join(10)
+    assert responses[0].status_code == 200
+
+
+def test_tts_sheds_load_over_client_limit(client, monkeypatch):
+    import app as app_module
+    from admission import AdmissionController, AdmissionPolicy
+
+    policy = AdmissionPolicy.from_dict({"clients": {"render": {"queue_limit": 0}}})
+    controller = AdmissionController(policy)
+    monkeypatch.setattr(app_module, "admission", controller)
+    assert client.post("/tts", json=_payload(), headers={"X-API-Key": "render"}).status_code == 200
+
+    # Hold both of the client's slots, so the next request would have to queue.
+    controller._running["render"] = 2
+    response = client.post("/tts", json=_payload(), headers={"X-API-Key": "render"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.post("/tts", json=_payload()).status_code == 200
+
+    stats = client.get("/admission").json()
+    assert (stats["admitted"], stats["shed"], stats["queued"]) == (2, 1, 0)
+    assert "waitP95Ms" in stats and "inFlightCost" in stats
+    assert stats["lanes"]["interactive"]["running"] == 0
+    assert "inFlightCost" in stats["lanes"]["bulk"]
+
+
+def test_tts_writes_each_chunk_before_generating_the_next(client, fake_model, monkeypatch):
+    import render_pipeline
+
+    events = []
+    generate = fake_model.generate_custom_voice
+    add = render_pipeline.StreamingRenderWriter.add
+
+    def recording_generate(*args, **kwargs):
+        events.append("generate")
+        return generate(*args, **kwargs)
+
+    def recording_add(writer, audio, source_rate):
+        events.append("write")
+        return add(writer, audio, source_rate)
+
+    monkeypatch.setattr(fake_model, "generate_custom_voice", recording_generate)
+    monkeypatch.setattr(render_pipeline.StreamingRenderWriter, "add", recording_add)
+    text = ' <break time="10ms"/> '.join(f"Sentence number {index}." for index in range(20))
+    assert client.post("/tts", json=_payload(text=text)).status_code == 200
+
+    assert events.count("generate") == 20
+    # No chunk is held back: every model call after the first follows a write.
+    for position, event in enumerate(events):
+        if event == "generate" and position:
+            assert events[position - 1] == "write"
+
+
+def test_tts_batch_writes_files_off_the_event_loop(client, monkeypatch):
+    import app as app_module
+
+    threads = []
+    write_audio = app_module.write_audio
+
+    def recording_write_audio(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return write_audio(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "write_audio", recording_write_audio)
+    payload = _payload(items=[{"text": "One."}, {"text": "Two."}], archive="zip")
+    del payload["text"]
+    assert client.post("/tts/batch", json=payload).json()["succeeded"] == 2
+    assert len(threads) == 2 and all(name.startswith("bulk") for name in threads)
+
+
+def test_tts_batch_archive_names_stay_inside_the_archive(client):
+    items = [
+        {"text": "One.", "itemId": "../../evil"},
+        {"text": "Two.", "itemId": "/abs/path\\name"},
+        {"text": "Three.", "itemId": ".."},
+    ]
+    payload = _payload(items=items, archive="tar")
+    del payload["text"]
+    data = client.post("/tts/batch", json=payload).json()
+    job_id = data["results"][2]["jobId"]
+
+    with tarfile.open(data["archivePath"]) as archive:
+        names = sorted(archive.getnames())
+    assert names == ["00000_evil.wav", "00001_abs_path_name.wav", f"00002_{job_id}.wav"]
+
+
+def test_voice_ids_cannot_name_paths(client, fake_model):
+    response = client.post("/tts", json=_payload(voiceId="../../outputs"))
+    assert response.status_code == 404
+    assert client.delete("/voices/..%2F..%2Fmodels").status_code == 404
+
+    text = 'Narrator. <voice name="../../models">Hidden.</voice>'
+    response = client.post("/tts", json=_payload(text=text))
+    assert response.status_code == 200
+    assert "../../models" in fake_model.speakers
+
+
+def test_tts_voice_groups_spill_units_to_disk(client, tmp_path, monkeypatch):
+    import app as app_module
+
+    stored = []
+    setitem = app_module._SpilledResults.__setitem__
+
+    def recording_setitem(results, index, result):
+        setitem(results, index, result)
+        stored.append(sorted(path.name for path in results.directory.iterdir()))
+
+    monkeypatch.setattr(app_module._SpilledResults, "__setitem__", recording_setitem)
+    text = 'One. <voice name="Ryan">Two.</voice> Three. <voice name="Ryan">Four.</voice>'
+    response = client.post("/tts", json=_payload(text=text))
+    assert response.status_code == 200
+    assert stored[-1] == ["0.f32", "1.f32", "2.f32", "3.f32"]
+    assert [path.name for path in (tmp_path / "outputs").iterdir()] == [
+        Path(response.json()["outputPath"]).name
+    ]
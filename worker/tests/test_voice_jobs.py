@@ -0,0 +1,99 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def voice_app(tmp_path, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module.paths, "voices", tmp_path / "voices")
+    monkeypatch.setattr(
+        app_module.engine,
+        "synthesize_voice_design",
+        lambda description, seed_text, backend: SimpleNamespace(
+            audio=np.zeros(2400, dtype=np.float32), sample_rate=24000
+        ),
+    )
+    monkeypatch.setattr(
+        app_module,
+        "save_clone_prompt_safe",
+        lambda path, prompt: (path / "clone_prompt.json").write_text("{}"),
+    )
+    return app_module
+
+
+def _design(client, name="Narrator"):
+    payload = {
+        "name": name,
+        "description": "warm",
+        "seedText": "Hello.",
+        "modelSize": "1.7b",
+        "backend": "cpu",
+    }
+    response = client.post("/voices/design", json=payload)
+    assert response.status_code == 202
+    return response.json()
+
+
+def _wait(client, job_id):
+    deadline = time.monotonic() + 5
+    while True:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in {"completed", "failed", "cancelled"}:
+            return job
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _user_voice_ids(client):
+    return [
+        voice["voiceId"]
+        for voice in client.get("/voices").json()["voices"]
+        if "::" not in voice["voiceId"]
+    ]
+
+
+def test_design_job_publishes_voice(voice_app, monkeypatch):
+    monkeypatch.setattr(voice_app.engine, "create_clone_prompt", lambda *args: ["prompt"])
+    client = TestClient(voice_app.app)
+    created = _design(client)
+    job = _wait(client, created["jobId"])
+    assert job["status"] == "completed"
+    assert job["result"] == {"voiceId": created["voiceId"]}
+    voice_dir = voice_app.paths.voices / "user" / created["voiceId"]
+    assert (voice_dir / "meta.json").exists()
+    assert (voice_dir / "preview.wav").exists()
+
+
+def test_failed_and_cancelled_jobs_leave_no_voice(voice_app, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def create_clone_prompt(audio, ref_text, model_size, backend):
+        if ref_text == "Hello." and not started.is_set():
+            started.set()
+            release.wait(5)
+            return ["prompt"]
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(voice_app.engine, "create_clone_prompt", create_clone_prompt)
+    client = TestClient(voice_app.app)
+    cancelled = _design(client, "Cancelled")
+    assert started.wait(5)
+    assert client.delete(f"/jobs/{cancelled['jobId']}").json()["cancelRequested"]
+    release.set()
+    assert _wait(client, cancelled["jobId"])["status"] == "cancelled"
+
+    failed = _design(client, "Failed")
+    job = _wait(client, failed["jobId"])
+    assert job["status"] == "failed"
+    assert job["error"] == "out of memory"
+
+    assert _user_voice_ids(client) == []
+    assert not any((voice_app.paths.voices / "staging").iterdir())
+    assert client.get("/jobs/missing").status_code == 404
@@ -1,6 +1,10 @@
+import json
+import math
 import re
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Tuple, Union
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -16,6 +20,7 @@ class TextSegment:
     text: str
     rate: Optional[str]
     emphasis: Optional[str]
+    voice: Optional[str] = None
 
 
 @dataclass
@@ -30,108 +35,174 @@ BREAK_SENTINEL_PREFIX = "[[BREAK:"
 BREAK_SENTINEL_SUFFIX = "]]"
 
 
-def parse_ssml_lite(text: str) -> Tuple[str, List[SsmlHint]]:
-    hints: List[SsmlHint] = []
+_TAG_SPLIT = re.compile(r"(<[^>]*>)")
+_TAG = re.compile(r"<\s*(/?)\s*([A-Za-z][\w:-]*)((?:\s+[\w:-]+\s*=\s*\"[^\"]*\")*)\s*(/?)\s*>")
+_ATTRIBUTE = re.compile(r"([\w:-]+)\s*=\s*\"([^\"]*)\"")
+_BREAK_SENTINEL = re.compile(r"\[\[BREAK:(.*?)\]\]")
+_DIGIT_GROUPS = re.compile(r"\d+")
+PROSODY_RATES = {"slow", "fast"}
+EMPHASIS_LEVELS = {"moderate", "strong"}
+
+
+@dataclass(frozen=True)
+class _Tag:
+    name: str
+    closing: bool
+    self_closing: bool
+    attrs: Dict[str, str]
+
+
+@lru_cache(maxsize=1024)
+def _parse_tag(raw: str) -> _Tag:
+    # Documents repeat a handful of distinct tags, so each one is parsed once. Malformed markup
+    # becomes an unnamed tag that callers drop.
+    match = _TAG.fullmatch(raw)
+    if match is None:
+        return _Tag("", False, True, {})
+    attrs = {key.lower(): value for key, value in _ATTRIBUTE.findall(match.group(3))}
+    return _Tag(match.group(2).lower(), bool(match.group(1)), bool(match.group(4)), attrs)
+
+
+def _scan(text: str) -> Iterator[Union[str, _Tag]]:
+    # One C-level split; odd positions are tags, even positions the text between them.
+    for index, token in enumerate(_TAG_SPLIT.split(text)):
+        if index % 2:
+            yield _parse_tag(token)
+        elif token:
+            yield token
+
+
+def say_as(text: str, interpret_as: str) -> str:
+    interpret_as = interpret_as.lower()
+    if interpret_as in ("characters", "spell-out"):
+        return " ".join(char for char in text if not char.isspace())
+    if interpret_as == "digits":
+        return " ".join(char for char in text if char.isdigit())
+    if interpret_as == "telephone":
+        return ", ".join(" ".join(group) for group in _DIGIT_GROUPS.findall(text))
+    return text
 
-    def _break(match: re.Match) -> str:
-        time_value = match.group(1)
-        hints.append(SsmlHint(kind="break", value=time_value))
-        return f" {BREAK_SENTINEL_PREFIX}{time_value}{BREAK_SENTINEL_SUFFIX} "
-
-    def _prosody(match: re.Match) -> str:
-        rate = match.group(1)
-        content = match.group(2)
-        hints.append(SsmlHint(kind="prosody", value=rate))
-        return content
-
-    def _emphasis(match: re.Match) -> str:
-        level = match.group(1)
-        content = match.group(2)
-        hints.append(SsmlHint(kind="emphasis", value=level))
-        return content
-
-    text = re.sub(r"<break\s+time=\"(.*?)\"\s*/>", _break, text)
-    text = re.sub(
-        r"<prosody\s+rate=\"(slow|fast)\">(.*?)</prosody>",
-        _prosody,
-        text,
-        flags=re.DOTALL,
-    )
-    text = re.sub(
-        r"<emphasis\s+level=\"(strong|moderate)\">(.*?)</emphasis>",
-        _emphasis,
-        text,
-        flags=re.DOTALL,
-    )
-    text = re.sub(r"<[^>]+>", "", text)
-    return text.strip(), hints
 
+class _SsmlState:
+    # Open-tag stacks shared by both parsers. Closing tags pop only their own stack, so a stray
+    # close never unbalances the others.
+    def __init__(self) -> None:
+        self.stacks: Dict[str, List[Optional[str]]] = {
+            "prosody": [],
+            "emphasis": [],
+            "voice": [],
+            "say-as": [],
+            "sub": [],
+        }
+        self.key: Tuple[Optional[str], Optional[str], Optional[str]] = (None, None, None)
+
+    def top(self, name: str) -> Optional[str]:
+        stack = self.stacks[name]
+        return stack[-1] if stack else None
+
+    def apply(self, tag: _Tag) -> Optional[str]:
+        # Returns replacement text emitted by the tag itself (``<sub alias>``).
+        stack = self.stacks.get(tag.name)
+        if stack is None or tag.self_closing:
+            return None
+        if tag.closing:
+            if stack:
+                stack.pop()
+                self._refresh()
+            return None
+        if tag.name == "prosody":
+            rate = tag.attrs.get("rate", "").lower()
+            stack.append(rate if rate in PROSODY_RATES else self.top("prosody"))
+        elif tag.name == "emphasis":
+            level = tag.attrs.get("level", "").lower()
+            stack.append(level if level in EMPHASIS_LEVELS else self.top("emphasis"))
+        elif tag.name == "voice":
+            stack.append(tag.attrs.get("name") or self.top("voice"))
+        elif tag.name == "say-as":
+            stack.append(tag.attrs.get("interpret-as", ""))
+        else:
+            stack.append(tag.attrs.get("alias"))
+            return tag.attrs.get("alias")
+        self._refresh()
+        return None
 
-def parse_ssml_lite_segments(text: str) -> List[Segment]:
-    tokens = re.split(r"(<[^>]+>)", text)
-    rate_stack: List[Optional[str]] = []
-    emphasis_stack: List[Optional[str]] = []
-    segments: List[Segment] = []
+    def _refresh(self) -> None:
+        self.key = (self.top("prosody"), self.top("emphasis"), self.top("voice"))
 
-    def current_rate() -> Optional[str]:
-        return rate_stack[-1] if rate_stack else None
+    def content(self, text: str) -> str:
+        # Text inside <sub> is replaced by its alias, which apply() already emitted.
+        if self.stacks["sub"]:
+            return ""
+        interpret_as = self.top("say-as")
+        return say_as(text, interpret_as) if interpret_as else text
 
-    def current_emphasis() -> Optional[str]:
-        return emphasis_stack[-1] if emphasis_stack else None
 
-    for token in tokens:
-        if not token:
+def parse_ssml_lite(text: str) -> Tuple[str, List[SsmlHint]]:
+    hints: List[SsmlHint] = []
+    parts: List[str] = []
+    state = _SsmlState()
+    for token in _scan(text):
+        if isinstance(token, str):
+            parts.append(state.content(token))
             continue
-        if token.startswith("<") and token.endswith(">"):
-            tag = token.strip()
-            lower = tag.lower()
-            break_match = re.match(r"^<\s*break\s+time\s*=\s*\"(.*?)\"\s*/\s*>$", lower)
-            if break_match:
-                seconds = break_to_seconds(break_match.group(1))
-                segments.append(BreakSegment(seconds=seconds))
-                continue
-            prosody_open = re.match(r"^<\s*prosody\s+rate\s*=\s*\"(slow|fast)\"\s*>$", lower)
-            if prosody_open:
-                rate_stack.append(prosody_open.group(1))
-                continue
-            if re.match(r"^<\s*/\s*prosody\s*>$", lower):
-                if rate_stack:
-                    rate_stack.pop()
-                continue
-            emphasis_open = re.match(
-                r"^<\s*emphasis\s+level\s*=\s*\"(moderate|strong)\"\s*>$",
-                lower,
-            )
-            if emphasis_open:
-                emphasis_stack.append(emphasis_open.group(1))
+        if token.name == "break":
+            if "time" in token.attrs:
+                time_value = token.attrs["time"]
+                hints.append(SsmlHint(kind="break", value=time_value))
+                parts.append(f"{BREAK_SENTINEL_PREFIX}{time_value}{BREAK_SENTINEL_SUFFIX}")
+            continue
+        alias = state.apply(token)
+        if alias:
+            parts.append(alias)
+        if token.closing or token.self_closing:
+            continue
+        if token.name == "prosody" and token.attrs.get("rate", "").lower() in PROSODY_RATES:
+            hints.append(SsmlHint(kind="prosody", value=state.top("prosody") or ""))
+        elif token.name == "emphasis" and token.attrs.get("level", "").lower() in EMPHASIS_LEVELS:
+            hints.append(SsmlHint(kind="emphasis", value=state.top("emphasis") or ""))
+    return "".join(parts).strip(), hints
+
+
+def parse_ssml_lite_segments(text: str) -> List[Segment]:
+    segments: List[Segment] = []
+    state = _SsmlState()
+    pending: List[str] = []
+    pending_key: Optional[Tuple[Optional[str], ...]] = None
+
+    def flush() -> None:
+        # Adjacent runs with the same prosody/emphasis/voice are joined once, here.
+        if pending and pending_key is not None:
+            rate, emphasis, voice = pending_key
+            segments.append(TextSegment("".join(pending), rate, emphasis, voice))
+        pending.clear()
+
+    for token in _scan(text):
+        if isinstance(token, _Tag):
+            if token.name == "break":
+                if "time" in token.attrs:
+                    flush()
+                    pending_key = None
+                    segments.append(BreakSegment(seconds=break_to_seconds(token.attrs["time"])))
                 continue
-            if re.match(r"^<\s*/\s*emphasis\s*>$", lower):
-                if emphasis_stack:
-                    emphasis_stack.pop()
+            token = state.apply(token)
+            if not token:
                 continue
-            continue
-        segments.append(TextSegment(text=token, rate=current_rate(), emphasis=current_emphasis()))
-
-    merged: List[Segment] = []
-    for segment in segments:
-        if (
-            merged
-            and isinstance(segment, TextSegment)
-            and isinstance(merged[-1], TextSegment)
-            and merged[-1].rate == segment.rate
-            and merged[-1].emphasis == segment.emphasis
-        ):
-            merged[-1].text += segment.text
         else:
-            merged.append(segment)
-    return merged
+            token = state.content(token)
+            if not token:
+                continue
+        if state.key != pending_key:
+            flush()
+            pending_key = state.key
+        pending.append(token)
+    flush()
+    return segments
 
 
 def parse_break_sentinels(text: str) -> List[Tuple[str, str]]:
-    pattern = re.compile(r"\[\[BREAK:(.*?)\]\]")
     results: List[Tuple[str, str]] = []
     last_end = 0
-    for match in pattern.finditer(text):
+    for match in _BREAK_SENTINEL.finditer(text):
         if match.start() > last_end:
             results.append(("text", text[last_end : match.start()]))
         results.append(("break", match.group(1)))
@@ -182,21 +253,143 @@ def apply_pronunciation(text: str, entries: Iterable[Tuple[str, str]]) -> str:
     return text
 
 
-def chunk_text(text: str, max_chars: int = 400) -> List[str]:
-    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+# Sentence ends: Latin terminators need trailing whitespace (so "3.5" and "a.m." stay intact),
+# full-width and other script terminators do not.
+_SENTENCE_END = re.compile(
+    r"[.!?\u2026]+[\"'\u201d\u2019)\]]*\s+|[\u3002\uff01\uff1f\u061f\u0964\u0965]+[\"'\u201d\u2019\u300d\u300f\uff09)\]]*\s*"
+)
+_CLAUSE_END = re.compile(r"[,;:\uff0c\u3001\uff1b\uff1a\u060c]\s*|\s+[\u2014\u2013-]\s+")
+_WORD_END = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class ChunkProfile:
+    max_chars: int
+    target_chars: int
+    first_chunk_chars: Optional[int] = None
+
+
+CHUNK_MODES = ("render", "stream", "batch")
+# Starting points for the 0.6B/1.7B models; benchmarks/bench_chunking.py measures the real
+# per-device numbers and writes overrides that load_chunk_profiles() picks up.
+DEFAULT_CHUNK_PROFILES: Dict[Tuple[str, str], ChunkProfile] = {
+    ("0.6b", "render"): ChunkProfile(max_chars=400, target_chars=300),
+    ("0.6b", "stream"): ChunkProfile(max_chars=300, target_chars=200, first_chunk_chars=80),
+    ("0.6b", "batch"): ChunkProfile(max_chars=400, target_chars=350),
+    ("1.7b", "render"): ChunkProfile(max_chars=320, target_chars=240),
+    ("1.7b", "stream"): ChunkProfile(max_chars=240, target_chars=160, first_chunk_chars=60),
+    ("1.7b", "batch"): ChunkProfile(max_chars=320, target_chars=280),
+}
+FALLBACK_CHUNK_PROFILE = ChunkProfile(max_chars=400, target_chars=300)
+
+
+def load_chunk_profiles(path: Optional[Path] = None) -> Dict[Tuple[str, str], ChunkProfile]:
+    profiles = dict(DEFAULT_CHUNK_PROFILES)
+    if path is None or not path.exists():
+        return profiles
+    data = json.loads(path.read_text(encoding="utf-8"))
+    for model_size, modes in data.items():
+        for mode, values in modes.items():
+            if mode not in CHUNK_MODES:
+                raise ValueError(f"Unknown chunk profile mode {mode}")
+            profiles[(model_size, mode)] = ChunkProfile(**values)
+    return profiles
+
+
+def chunk_profile(
+    profiles: Dict[Tuple[str, str], ChunkProfile],
+    model_size: str,
+    mode: str,
+) -> ChunkProfile:
+    return profiles.get((model_size.lower(), mode), FALLBACK_CHUNK_PROFILE)
+
+
+def _split_after(text: str, pattern: re.Pattern) -> List[str]:
+    pieces: List[str] = []
+    start = 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start : match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _split_long(piece: str, max_chars: int, patterns: Tuple[re.Pattern, ...]) -> List[str]:
+    if len(piece) <= max_chars:
+        return [piece]
+    if not patterns:
+        # No boundary left (e.g. unspaced CJK): hard cut.
+        size = math.ceil(len(piece) / math.ceil(len(piece) / max_chars))
+        return [piece[i : i + size] for i in range(0, len(piece), size)]
+    pieces: List[str] = []
+    for part in _split_after(piece, patterns[0]):
+        pieces.extend(_split_long(part, max_chars, patterns[1:]))
+    return pieces
+
+
+def _balanced_budget(remaining: int, target_chars: int, max_chars: int) -> int:
+    count = max(1, math.ceil(remaining / target_chars))
+    return min(max_chars, math.ceil(remaining / count))
+
+
+def chunk_text(
+    text: str,
+    max_chars: int = 400,
+    target_chars: Optional[int] = None,
+    first_chunk_chars: Optional[int] = None,
+) -> List[str]:
+    target_chars = min(target_chars or max_chars, max_chars)
+    pieces: List[str] = []
+    for sentence in _split_after(text.strip(), _SENTENCE_END):
+        pieces.extend(_split_long(sentence, max_chars, (_CLAUSE_END, _WORD_END)))
+    if first_chunk_chars and pieces:
+        # A long opening sentence is split too, or it would become the first chunk whole.
+        pieces[:1] = _split_long(pieces[0], first_chunk_chars, (_CLAUSE_END, _WORD_END))
+
+    # Pack pieces towards an even per-chunk budget so the last chunk is not a stub and chunks
+    # cost roughly the same to synthesize; the budget is recomputed from what is left.
     chunks: List[str] = []
+    remaining = sum(len(piece) for piece in pieces)
+    budget = first_chunk_chars or _balanced_budget(remaining, target_chars, max_chars)
+    # The first chunk's budget is a hard limit, since it sets the time to first audio.
+    limit = min(first_chunk_chars or max_chars, max_chars)
     current = ""
-    for sentence in filter(None, sentences):
-        if len(current) + len(sentence) + 1 > max_chars and current:
+
+    def close() -> None:
+        nonlocal current, remaining, budget, limit
+        if current.strip():
             chunks.append(current.strip())
-            current = sentence
-        else:
-            current = f"{current} {sentence}".strip()
-    if current:
-        chunks.append(current.strip())
+        remaining -= len(current)
+        current = ""
+        budget = _balanced_budget(remaining, target_chars, max_chars)
+        limit = max_chars
+
+    for piece in pieces:
+        size = len(current) + len(piece)
+        if current and size > limit:
+            close()
+        elif current and size > budget:
+            if size - budget < budget - len(current):
+                current += piece
+                close()
+                continue
+            close()
+        current += piece
+    close()
     return chunks
 
 
+def plan_chunks(text: str, profile: ChunkProfile, leading: bool = False) -> List[str]:
+    return chunk_text(
+        text,
+        profile.max_chars,
+        profile.target_chars,
+        profile.first_chunk_chars if leading else None,
+    )
+
+
 def stitch_audio(chunks: List[np.ndarray], sample_rate: int, crossfade_ms: int = 50) -> np.ndarray:
     if not chunks:
         return np.array([], dtype=np.float32)
@@ -219,3 +412,37 @@ def stitch_audio(chunks: List[np.ndarray], sample_rate: int, crossfade_ms: int =
         blended = tail * fade_out + head * fade_in
         output = np.concatenate([output[:-fade_samples], blended, chunk[fade_samples:]])
     return output
+
+
+class StreamingStitcher:
+    def __init__(self, sample_rate: int, crossfade_ms: int = 50) -> None:
+        self.sample_rate = sample_rate
+        self.fade_samples = int(sample_rate * crossfade_ms / 1000)
+        self._tail: Optional[np.ndarray] = None
+        if self.fade_samples:
+            self._fade_out = np.linspace(1.0, 0.0, self.fade_samples, dtype=np.float32)
+            self._fade_in = np.linspace(0.0, 1.0, self.fade_samples, dtype=np.float32)
+
+    def push(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = chunk.astype(np.float32, copy=False)
+        if self.fade_samples == 0:
+            return chunk
+        tail = self._tail
+        if tail is None:
+            combined = chunk
+        elif len(chunk) < self.fade_samples or len(tail) < self.fade_samples:
+            combined = np.concatenate([tail, chunk])
+        else:
+            blended = tail * self._fade_out + chunk[: self.fade_samples] * self._fade_in
+            combined = np.concatenate([blended, chunk[self.fade_samples :]])
+        # Hold back the last crossfade window so the next chunk can blend into it.
+        split = max(0, len(combined) - self.fade_samples)
+        self._tail = combined[split:]
+        return combined[:split]
+
+    def flush(self) -> np.ndarray:
+        tail = self._tail
+        self._tail = None
+        if tail is None:
+            return np.array([], dtype=np.float32)
+        return tail
@@ -1,17 +1,80 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
+import time
 from dataclasses import dataclass
 from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 
 import numpy as np
 import torch
+from model_loading import (
+    LoadTimings,
+    WeightCache,
+    compile_speech_decoder,
+    configure_compile_cache,
+    load_model,
+)
 from model_manager import ModelManager
 from qwen_tts import Qwen3TTSModel, VoiceClonePromptItem
 
 logger = logging.getLogger("openvoice")
 T = TypeVar("T")
 
+INFERENCE_METHODS = ("generate_custom_voice", "generate_voice_clone", "generate_voice_design")
+
+CPU_PRECISIONS = ("auto", "float32", "bfloat16", "int8")
+
+
+def cpu_supports_bf16() -> bool:
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+@dataclass(frozen=True)
+class CpuProfile:
+    precision: str = "float32"
+    threads: Optional[int] = None
+    interop_threads: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "CpuProfile":
+        precision = os.getenv("OPENVOICELAB_CPU_PRECISION", "float32").lower()
+        if precision not in CPU_PRECISIONS:
+            logger.warning("Unknown OPENVOICELAB_CPU_PRECISION %r; using float32", precision)
+            precision = "float32"
+        # Each concurrent CPU request gets its own share of the cores instead of every
+        # request spinning up a full-size thread pool.
+        parallel = max(1, int(os.getenv("OPENVOICELAB_CPU_PARALLEL_REQUESTS", "1")))
+        threads = int(os.getenv("OPENVOICELAB_CPU_THREADS", "0"))
+        interop = int(os.getenv("OPENVOICELAB_CPU_INTEROP_THREADS", "0"))
+        return cls(
+            precision=precision,
+            threads=threads or max(1, torch.get_num_threads() // parallel),
+            interop_threads=interop or parallel,
+        )
+
+    def resolve_precision(self) -> str:
+        if self.precision == "auto":
+            return "bfloat16" if cpu_supports_bf16() else "float32"
+        if self.precision == "bfloat16" and not cpu_supports_bf16():
+            logger.warning("CPU has no native bfloat16 support; using float32")
+            return "float32"
+        return self.precision
+
+    def apply_threads(self) -> None:
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.interop_threads and torch.get_num_interop_threads() != self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as exc:
+                # Only allowed before the first inter-op parallel work in the process.
+                logger.warning("Could not set inter-op threads: %s", exc)
+
 
 @dataclass
 class SynthesisResult:
@@ -19,11 +82,37 @@ class SynthesisResult:
     sample_rate: int
 
 
+def _use_inference_mode(model: Qwen3TTSModel) -> None:
+    # Wrapping the bound methods covers every caller, including the app's chunk loops.
+    for name in INFERENCE_METHODS:
+        method = getattr(model, name, None)
+        if method is not None:
+            setattr(model, name, torch.inference_mode()(method))
+
+
 class TtsEngine:
-    def __init__(self, model_manager: ModelManager) -> None:
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        cpu_profile: Optional[CpuProfile] = None,
+        compile_decoder: bool = False,
+    ) -> None:
         self.model_manager = model_manager
+        self.compile_decoder = compile_decoder
+        self.cpu_profile = cpu_profile or CpuProfile()
+        self.cpu_profile.apply_threads()
+        self.cpu_precision = self.cpu_profile.resolve_precision()
         self._model_cache: Dict[Tuple[str, str], Qwen3TTSModel] = {}
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
         self._preset_cache: Optional[List[Dict[str, str]]] = None
+        self.weight_cache = WeightCache(
+            model_manager.root / ".load_cache",
+            enabled=os.getenv("OPENVOICELAB_LOAD_CACHE", "1") != "0",
+        )
+        self.load_timings: Dict[Tuple[str, str], LoadTimings] = {}
+        if compile_decoder:
+            configure_compile_cache(self.weight_cache.root / "inductor")
 
     def _resolve_device(self, backend: str) -> Tuple[str, Optional[str]]:
         backend = backend.lower()
@@ -35,7 +124,7 @@ class TtsEngine:
             return "cpu", "CUDA not available; fell back to CPU."
         return backend, None
 
-    def _is_cuda_failure(self, exc: Exception) -> bool:
+    def is_cuda_failure(self, exc: Exception) -> bool:
         message = str(exc).lower()
         return any(
             needle in message
@@ -52,22 +141,39 @@ class TtsEngine:
     def _resolve_dtype(self, device: str) -> torch.dtype:
         if device.startswith("cuda"):
             return torch.bfloat16 if torch.cuda.is_available() else torch.float16
-        return torch.float32
+        # int8 quantizes a float32 model, so it loads as float32 first.
+        return torch.bfloat16 if self.cpu_precision == "bfloat16" else torch.float32
+
+    def _load_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        # Per-model locks: a preload and a request for the same model load it once, while
+        # other models load alongside.
+        with self._locks_guard:
+            return self._load_locks.setdefault(key, threading.Lock())
 
     def _get_model_for_device(self, model_id: str, device: str) -> Qwen3TTSModel:
         key = (model_id, device)
         if key in self._model_cache:
             return self._model_cache[key]
+        with self._load_lock(key):
+            if key in self._model_cache:
+                return self._model_cache[key]
+            return self._load_model(key)
+
+    def _load_model(self, key: Tuple[str, str]) -> Qwen3TTSModel:
+        model_id, device = key
         local_dir = self.model_manager._local_dir_for(model_id)
         if not local_dir.exists():
             raise RuntimeError(f"Model {model_id} is not downloaded")
         dtype = self._resolve_dtype(device)
-        device_map = device
-        model = Qwen3TTSModel.from_pretrained(
-            str(local_dir),
-            device_map=device_map,
-            torch_dtype=dtype,
-        )
+        quantize = device == "cpu" and self.cpu_precision == "int8"
+        model, timings = load_model(local_dir, device, dtype, self.weight_cache, quantize)
+        _use_inference_mode(model)
+        if self.compile_decoder:
+            start = time.perf_counter()
+            timings.compiled = compile_speech_decoder(model, device)
+            timings.warmup_seconds = time.perf_counter() - start
+        logger.info("Loaded %s on %s: %s", model_id, device, timings.to_dict())
+        self.load_timings[key] = timings
         self._model_cache[key] = model
         return model
 
@@ -78,7 +184,7 @@ class TtsEngine:
         try:
             return self._get_model_for_device(model_id, device), device, warning
         except Exception as exc:  # noqa: BLE001
-            if device.startswith("cuda") and self._is_cuda_failure(exc):
+            if device.startswith("cuda") and self.is_cuda_failure(exc):
                 logger.warning("CUDA backend failed, falling back to CPU: %s", exc)
                 fallback_warning = "CUDA backend failed; fell back to CPU."
                 model = self._get_model_for_device(model_id, "cpu")
@@ -95,7 +201,7 @@ class TtsEngine:
         try:
             return action(model), device, warning
         except Exception as exc:  # noqa: BLE001
-            if device.startswith("cuda") and self._is_cuda_failure(exc):
+            if device.startswith("cuda") and self.is_cuda_failure(exc):
                 logger.warning("CUDA backend failed during inference, falling back to CPU: %s", exc)
                 fallback_warning = "CUDA backend failed during inference; fell back to CPU."
                 model = self._get_model_for_device(model_id, "cpu")
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import os
 import socket
 
 import uvicorn
@@ -21,8 +22,19 @@ async def _run_server(host: str, port: int, log_level: str) -> None:
     from app import app as fastapi_app
 
     fastapi_app.state.shutdown_event = shutdown_event
+    await _serve("app:app", host, port, log_level, shutdown_event)
+
+
+async def _run_router(host: str, port: int, log_level: str, pool) -> None:
+    from router import create_router_app
+
+    shutdown_event = asyncio.Event()
+    await _serve(create_router_app(pool, shutdown_event), host, port, log_level, shutdown_event)
+
+
+async def _serve(app, host: str, port: int, log_level: str, shutdown_event: asyncio.Event) -> None:
     config = uvicorn.Config(
-        "app:app",
+        app,
         host=host,
         port=port,
         log_level=log_level,
@@ -46,14 +58,32 @@ def main() -> None:
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=0)
     parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("OPENVOICELAB_WORKERS", "1")),
+        help="inference processes behind a router; 1 serves directly",
+    )
     args = parser.parse_args()
 
     if args.host in {"0.0.0.0", "::"}:
         raise ValueError("Worker must bind to 127.0.0.1 only.")
 
     port = _pick_port(args.host, args.port)
-    print(f"WORKER_PORT={port}", flush=True)
-    asyncio.run(_run_server(args.host, port, args.log_level))
+    if args.workers <= 1:
+        print(f"WORKER_PORT={port}", flush=True)
+        asyncio.run(_run_server(args.host, port, args.log_level))
+        return
+
+    from router import WorkerPool
+
+    pool = WorkerPool(args.workers, args.log_level)
+    try:
+        pool.start()
+        print(f"WORKER_PORT={port}", flush=True)
+        asyncio.run(_run_router(args.host, port, args.log_level, pool))
+    finally:
+        pool.stop()
 
 
 if __name__ == "__main__":